@@ -0,0 +1,109 @@
+import sys
+import json
+import subprocess
+from pathlib import Path
+from typing import List
+import typer
+from loguru import logger
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+"""
+Enforce the import time budget of the project's modules.
+
+Every module is imported in a fresh interpreter with `python -X importtime`,
+`repeat` times, and the fastest cumulative import time is compared with its
+budget. Importing a module must also not load pandas, numpy or matplotlib;
+those are imported lazily on first use (see scripts/lazy.py). The command
+exits with status 1 if any module is over budget or imports a heavy
+dependency eagerly.
+"""
+
+# Module: budget in milliseconds. The command line tools import typer, which loads rich.
+IMPORT_BUDGETS_MS = {
+    "scripts.metrics": 100,
+    "scripts.panel": 100,
+    "scripts.result_cache": 150,
+    "scripts.depreciation": 150,
+    "scripts.volatility": 150,
+    "scripts.value_at_risk": 150,
+    "scripts.maximum_drawdown": 150,
+    "scripts.rolling": 100,
+    "scripts.correlation": 150,
+    "scripts.simulation": 150,
+    "scripts.result_store": 150,
+    "scripts.resample": 100,
+    "scripts.downsample": 100,
+    "scripts.cross_rates": 150,
+    "scripts.backends": 100,
+    "scripts.series": 150,
+    "figures.exchange_rates": 150,
+    "figures.depreciation_bar_chart": 200,
+    "figures.volatility_bar_chart": 200,
+    "figures.var_bar_chart": 200,
+    "figures.maximum_drawdown_bar_chart": 200,
+    "scripts.clean_data": 800,
+    "figures.batch_report": 800,
+}
+
+HEAVY_MODULES = ["pandas", "numpy", "matplotlib"]
+
+
+def measure_import(module):
+    """
+    Import a module in a fresh interpreter.
+
+    Args:
+        module (str): The module to import.
+
+    Returns:
+        tuple: (cumulative import time in ms, heavy modules that were loaded).
+    """
+    code = f"import sys, json, {module}; print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))"
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    # The line of the module itself holds the cumulative time of everything it imported
+    for line in process.stderr.splitlines():
+        fields = [field.strip() for field in line.removeprefix("import time:").split("|")]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1]) / 1000, json.loads(process.stdout)
+    raise RuntimeError(f"No import time reported for {module}")
+
+
+app = typer.Typer()
+
+
+@app.command()
+def main(
+    module: List[str] = typer.Option(list(IMPORT_BUDGETS_MS), help="Module to check, can be repeated."),
+    repeat: int = typer.Option(3, min=1, help="Imports per module, the fastest is compared with the budget."),
+):
+    failures = 0
+    print(f"{'module':<36} {'ms':>8} {'budget':>8}")
+    for name in module:
+        measurements = [measure_import(name) for _ in range(repeat)]
+        milliseconds = min(ms for ms, _ in measurements)
+        heavy = measurements[0][1]
+        budget = IMPORT_BUDGETS_MS.get(name)
+        print(f"{name:<36} {milliseconds:>8.1f} {budget if budget else '-':>8}")
+
+        if budget and milliseconds > budget:
+            failures += 1
+            logger.error(f"{name} takes {milliseconds:.1f} ms to import, the budget is {budget} ms.")
+        if heavy:
+            failures += 1
+            logger.error(f"{name} imports {', '.join(heavy)} eagerly.")
+
+    if failures:
+        raise typer.Exit(1)
+    logger.success("All modules within their import budget.")
+
+
+if __name__ == "__main__":
+    app()
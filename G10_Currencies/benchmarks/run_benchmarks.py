@@ -0,0 +1,199 @@
+import os
+import sys
+import json
+import shutil
+import statistics
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import List
+import typer
+from loguru import logger
+
+# Add the project root to sys.path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from benchmarks.synthetic_data import generate_dataset
+from benchmarks.stages import STAGES
+
+"""
+Benchmark the ingest, metric and plotting paths on synthetic datasets.
+
+For every scenario a synthetic raw dataset is generated, then every stage
+(clean_data, the calculate_* functions and the figure builders) runs in its
+own interpreter against it, `repeat` times. The report shows the median wall
+time, the throughput in raw rows per second and the peak RSS per stage.
+
+With --save-baseline the results are stored as the baseline. Later runs are
+compared against it and stages that got slower or use more memory than the
+tolerance allows are flagged; the command then exits with status 1.
+"""
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+BASELINE_PATH = BENCHMARKS_DIR / "baseline.json"
+
+# name: (pairs, rows per pair, pandas frequency)
+SCENARIOS = {
+    "shipped": (9, 300, "MS"),  # Size of data/raw
+    "wide": (500, 300, "MS"),
+    "g5000": (5000, 300, "MS"),
+    "daily": (9, 6500, "B"),  # 25 years of business days
+    "minute": (9, 100_000, "min"),
+}
+
+DEFAULT_SCENARIOS = ["shipped", "wide"]
+
+
+def run_stage(stage, data_dir, START, END, output_dir):
+    """
+    Run one stage in a fresh interpreter against a dataset.
+
+    Returns:
+        dict: Wall time and peak RSS, None if the stage failed.
+    """
+    env = dict(os.environ, G10_DATA_DIR=str(data_dir), MPLBACKEND="Agg")
+    process = subprocess.run(
+        [sys.executable, str(BENCHMARKS_DIR / "stages.py"), stage, str(START), str(END), str(output_dir)],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode != 0:
+        logger.error(f"{stage} failed:\n{process.stderr.strip()[-2000:]}")
+        return None
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def run_scenario(name, stages, repeat, work_dir):
+    """
+    Generate the dataset of a scenario and benchmark every stage on it.
+
+    Returns:
+        dict: Per stage the median seconds, rows per second and peak RSS in MB.
+    """
+    pairs, periods, frequency = SCENARIOS[name]
+    data_dir = work_dir / name
+    output_dir = data_dir / "figures"
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    logger.info(f"Generating {name}: {pairs} pairs x {periods} rows ({frequency})")
+    dates = generate_dataset(data_dir / "raw", pairs, periods, frequency)
+    START, END = dates[-1].year, dates[0].year
+    rows = pairs * periods
+
+    results = {}
+    for stage in stages:
+        runs = []
+        for _ in range(repeat):
+            # Start every run without stored results, so it times the computation and not the result store
+            if stage != "clean_data":
+                shutil.rmtree(data_dir / "results", ignore_errors=True)
+            runs.append(run_stage(stage, data_dir, START, END, output_dir))
+        if any(run is None for run in runs):
+            results[stage] = None
+            # Without processed data the remaining stages cannot run
+            if stage == "clean_data":
+                break
+            continue
+
+        seconds = statistics.median(run["seconds"] for run in runs)
+        results[stage] = {
+            "seconds": seconds,
+            "rows_per_second": rows / seconds if seconds else None,
+            "peak_rss_mb": max(run["peak_rss_mb"] for run in runs),
+        }
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Find the stages that got slower or use more memory than the baseline.
+
+    Args:
+        results (dict): Current results per scenario and stage.
+        baseline (dict): Stored results in the same layout.
+        tolerance (float): Allowed relative increase, e.g. 0.25 for 25%.
+
+    Returns:
+        list: (scenario, stage, measure, baseline value, current value) of every regression.
+    """
+    regressions = []
+    for scenario, stages in results.items():
+        for stage, current in stages.items():
+            previous = baseline.get(scenario, {}).get(stage)
+            if previous is None:
+                continue
+            if current is None:
+                regressions.append((scenario, stage, "status", "ok", "failed"))
+                continue
+            for measure in ("seconds", "peak_rss_mb"):
+                if current[measure] > previous[measure] * (1 + tolerance):
+                    regressions.append((scenario, stage, measure, round(previous[measure], 3), round(current[measure], 3)))
+    return regressions
+
+
+def print_report(results):
+    print(f"{'scenario':<10} {'stage':<28} {'seconds':>9} {'rows/s':>12} {'peak RSS MB':>12}")
+    for scenario, stages in results.items():
+        for stage, result in stages.items():
+            if result is None:
+                print(f"{scenario:<10} {stage:<28} {'failed':>9}")
+            else:
+                print(
+                    f"{scenario:<10} {stage:<28} {result['seconds']:>9.3f} "
+                    f"{result['rows_per_second']:>12,.0f} {result['peak_rss_mb']:>12.1f}"
+                )
+
+
+app = typer.Typer()
+
+
+@app.command()
+def main(
+    scenario: List[str] = typer.Option(DEFAULT_SCENARIOS, help=f"Scenario to run, one of {', '.join(SCENARIOS)}. Can be repeated."),
+    stage: List[str] = typer.Option(list(STAGES), help="Stage to run, can be repeated."),
+    repeat: int = typer.Option(3, min=1, help="Runs per stage, the median time is reported."),
+    baseline: Path = BASELINE_PATH,  # Baseline to compare against
+    save_baseline: bool = typer.Option(False, help="Store the results as the new baseline."),
+    tolerance: float = typer.Option(0.25, help="Allowed relative slowdown or memory growth."),
+    keep_data: bool = typer.Option(False, help="Keep the generated datasets in benchmarks/data."),
+):
+    unknown = (set(scenario) - set(SCENARIOS)) | (set(stage) - set(STAGES))
+    if unknown:
+        logger.error(f"Unknown scenarios or stages: {', '.join(sorted(unknown))}")
+        raise typer.Exit(1)
+
+    # Keep clean_data first, the other stages read what it writes
+    stages = [name for name in STAGES if name in stage or name == "clean_data"]
+
+    work_dir = BENCHMARKS_DIR / "data" if keep_data else Path(tempfile.mkdtemp(prefix="g10_benchmarks_"))
+    try:
+        results = {name: run_scenario(name, stages, repeat, work_dir) for name in scenario}
+    finally:
+        if not keep_data:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_report(results)
+
+    if save_baseline:
+        stored = json.loads(baseline.read_text()) if baseline.exists() else {}
+        stored.update(results)
+        baseline.write_text(json.dumps(stored, indent=2))
+        logger.success(f"Baseline saved to: {baseline}")
+        return
+
+    if not baseline.exists():
+        logger.info("No baseline found, run with --save-baseline to store one.")
+        return
+
+    regressions = compare(results, json.loads(baseline.read_text()), tolerance)
+    for scenario_name, stage_name, measure, previous, current in regressions:
+        logger.warning(f"Regression in {scenario_name}/{stage_name}: {measure} {previous} -> {current}")
+    if regressions:
+        raise typer.Exit(1)
+    logger.success("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    app()
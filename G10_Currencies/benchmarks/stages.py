@@ -0,0 +1,122 @@
+import io
+import sys
+import json
+import time
+import resource
+import importlib
+import warnings
+from pathlib import Path
+from contextlib import redirect_stdout
+
+# Add the project root to sys.path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+"""
+Run and measure a single benchmark stage.
+
+Every stage runs in a fresh interpreter started by run_benchmarks.py, with
+G10_DATA_DIR pointing at a synthetic dataset. The stage prints one JSON line
+with its wall time and the peak resident set size of the process, so stages
+neither share caches nor inflate each other's memory peak. A stage that
+produces nothing (no processed data, no results, no figure) fails.
+
+Usage: python stages.py <stage> <START> <END> <output_dir>
+"""
+
+
+def _call(module_name, function_name, *args, **kwargs):
+    # Import inside the stage, so the import time is part of the measurement
+    module = importlib.import_module(module_name)
+    return getattr(module, function_name)(*args, **kwargs)
+
+
+def run_clean_data(START, END, output_dir):
+    from config import INTERIM_DATA_DIR, PROCESSED_DATA_DIR
+
+    # Pass every option, the typer defaults are OptionInfo objects when main is called directly
+    _call("scripts.clean_data", "main", output_path=INTERIM_DATA_DIR / "merged_dataset.csv", incremental=False, workers=1, chunksize=0)
+    if not any(PROCESSED_DATA_DIR.glob("*.csv")):
+        raise RuntimeError(f"clean_data wrote no processed datasets to {PROCESSED_DATA_DIR}")
+
+
+def _metric(module_name, function_name):
+    def run(START, END, output_dir):
+        if _call(module_name, function_name, START, END) is None:
+            raise RuntimeError(f"{function_name} returned no results")
+    return run
+
+
+def _figure(output_path):
+    # Figures return nothing, a missing file means nothing was drawn
+    if not output_path.exists():
+        raise RuntimeError(f"No figure was saved to {output_path}")
+
+
+def run_exchange_rates(START, END, output_dir):
+    import matplotlib.pyplot as plt
+
+    output_path = Path(output_dir) / "exchange_rates.png"
+    output_path.unlink(missing_ok=True)
+    _call("figures.exchange_rates", "plot_currency_chart", "CHF_AUD Historical Data")
+    plt.savefig(output_path)
+    plt.close()
+    _figure(output_path)
+
+
+def _bar_chart(name):
+    def run(START, END, output_dir):
+        output_path = Path(output_dir) / f"{name}.png"
+        output_path.unlink(missing_ok=True)
+        _call(f"figures.{name}_bar_chart", f"plot_{name}_bar_chart", START, END, output_path=output_path)
+        _figure(output_path)
+    return run
+
+
+# Stages in the order they run, clean_data writes the processed data the others read
+STAGES = {
+    "clean_data": run_clean_data,
+    "calculate_depreciation": _metric("scripts.depreciation", "calculate_depreciation"),
+    "calculate_volatility": _metric("scripts.volatility", "calculate_volatility"),
+    "calculate_var": _metric("scripts.value_at_risk", "calculate_var"),
+    "calculate_maximum_drawdown": _metric("scripts.maximum_drawdown", "calculate_maximum_drawdown"),
+    "depreciation_bar_chart": _bar_chart("depreciation"),
+    "volatility_bar_chart": _bar_chart("volatility"),
+    "var_bar_chart": _bar_chart("var"),
+    "maximum_drawdown_bar_chart": _bar_chart("maximum_drawdown"),
+    "exchange_rates": run_exchange_rates,
+}
+
+
+def measure(stage, START, END, output_dir):
+    """
+    Run a stage and measure it.
+
+    Args:
+        stage (str): One of STAGES.
+        START (int): Start year passed to the metrics.
+        END (int): End year passed to the metrics.
+        output_dir (Path): Directory for figures.
+
+    Returns:
+        dict: Wall time in seconds and peak RSS in MB.
+    """
+    # Draw figures without a display
+    import matplotlib
+    matplotlib.use("Agg")
+
+    # Keep printed results and plt.show() warnings out of the measurement output
+    with redirect_stdout(io.StringIO()), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        start = time.perf_counter()
+        STAGES[stage](START, END, output_dir)
+        seconds = time.perf_counter() - start
+
+    # ru_maxrss is in kilobytes on Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {"seconds": seconds, "peak_rss_mb": peak_rss_mb}
+
+
+if __name__ == "__main__":
+    stage, START, END, output_dir = sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), sys.argv[4]
+    print(json.dumps(measure(stage, START, END, output_dir)))
@@ -0,0 +1,132 @@
+import sys
+import string
+from itertools import product
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+"""
+Synthetic exchange rate files in the Investing.com export format.
+
+The files look exactly like the ones in data/raw: a byte order mark, every
+field quoted, dates as "MM/DD/YYYY", empty volumes, the change as a "-0.92%"
+string, rows sorted newest first and no trailing newline. The prices are
+geometric random walks, so every metric has something to compute.
+"""
+
+# The currencies in data/raw, synthetic codes are added after these
+G10_CODES = ["AUD", "CAD", "EUR", "GBP", "JPY", "NOK", "NZD", "SEK", "USD"]
+
+HEADER = '"Date","Price","Open","High","Low","Vol.","Change %"'
+
+# Last date of the shipped datasets
+DEFAULT_END = "2024-11-01"
+
+
+def currency_codes(pairs):
+    """
+    Return `pairs` distinct currency codes, starting with the G10 currencies.
+
+    Args:
+        pairs (int): Number of codes.
+
+    Returns:
+        list: Three letter codes.
+    """
+    codes = G10_CODES[:pairs]
+    for letters in product(string.ascii_uppercase, repeat=3):
+        if len(codes) >= pairs:
+            break
+        code = "".join(letters)
+        if code != "CHF" and code not in G10_CODES:
+            codes.append(code)
+    return codes
+
+
+def synthetic_dates(periods, frequency="MS", end=DEFAULT_END):
+    """
+    Dates of a synthetic series, newest first.
+
+    Args:
+        periods (int): Number of rows.
+        frequency (str): Pandas frequency, "MS" for monthly up to "min" for minute bars.
+        end (str): Date of the newest row.
+
+    Returns:
+        pd.DatetimeIndex: The dates.
+    """
+    return pd.date_range(end=end, periods=periods, freq=frequency)[::-1]
+
+
+def synthetic_prices(periods, rng, volatility=0.03):
+    """
+    A geometric random walk of closing prices, oldest first.
+    """
+    start = np.exp(rng.uniform(np.log(0.05), np.log(200.0)))
+    steps = rng.normal(0.0, volatility, periods)
+    return start * np.exp(np.cumsum(steps))
+
+
+def format_rows(dates, prices, rng):
+    """
+    Format the rows of one file in the raw export format.
+
+    Args:
+        dates (pd.DatetimeIndex): Dates, newest first.
+        prices (np.ndarray): Closing prices, oldest first.
+        rng (np.random.Generator): Random numbers for the open, high and low prices.
+
+    Returns:
+        str: The rows, without the header.
+    """
+    # Intraday bars keep their time of day
+    intraday = (dates.normalize() != dates).any()
+    date_strings = dates.strftime("%m/%d/%Y %H:%M" if intraday else "%m/%d/%Y")
+
+    close = prices[::-1]
+    open_ = np.append(close[1:], close[-1])
+    spread = np.abs(rng.normal(0.0, 0.01, len(close)))
+    high = np.maximum(open_, close) * (1 + spread)
+    low = np.minimum(open_, close) * (1 - spread)
+    change = (close / open_ - 1) * 100
+
+    return "\n".join(
+        f'"{date}","{c:.4f}","{o:.4f}","{h:.4f}","{l:.4f}","","{ch:.2f}%"'
+        for date, c, o, h, l, ch in zip(date_strings, close, open_, high, low, change)
+    )
+
+
+def generate_dataset(raw_dir, pairs=9, periods=300, frequency="MS", seed=0):
+    """
+    Write a synthetic raw dataset of CHF_* files.
+
+    Args:
+        raw_dir (Path): Directory to write the files to.
+        pairs (int): Number of currency pairs.
+        periods (int): Number of rows per file.
+        frequency (str): Pandas frequency of the rows.
+        seed (int): Seed of the random walks, the same seed writes the same files.
+
+    Returns:
+        pd.DatetimeIndex: The dates of the files, newest first.
+    """
+    raw_dir = Path(raw_dir)
+    raw_dir.mkdir(parents=True, exist_ok=True)
+
+    dates = synthetic_dates(periods, frequency)
+    rng = np.random.default_rng(seed)
+    for code in currency_codes(pairs):
+        rows = format_rows(dates, synthetic_prices(periods, rng), rng)
+        content = "\ufeff" + HEADER + "\n" + rows
+        (raw_dir / f"CHF_{code} Historical Data.csv").write_text(content, encoding="utf-8")
+
+    return dates
+
+
+if __name__ == "__main__":
+    # Usage: python synthetic_data.py <raw_dir> [pairs] [periods] [frequency]
+    raw_dir = Path(sys.argv[1])
+    pairs = int(sys.argv[2]) if len(sys.argv) > 2 else 9
+    periods = int(sys.argv[3]) if len(sys.argv) > 3 else 300
+    frequency = sys.argv[4] if len(sys.argv) > 4 else "MS"
+    generate_dataset(raw_dir, pairs, periods, frequency)
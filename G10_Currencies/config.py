@@ -1,12 +1,15 @@
+import os
 from pathlib import Path
 
 # Paths
 PROJ_ROOT = Path(__file__).resolve().parent
 
-DATA_DIR = PROJ_ROOT / "data"
+# G10_DATA_DIR points the whole project at another data directory, e.g. a synthetic benchmark dataset
+DATA_DIR = Path(os.environ.get("G10_DATA_DIR", PROJ_ROOT / "data"))
 RAW_DATA_DIR = DATA_DIR / "raw"
 INTERIM_DATA_DIR = DATA_DIR / "interim"
 PROCESSED_DATA_DIR = DATA_DIR / "processed"
+RESULTS_DIR = DATA_DIR / "results"
 
 REPORTS_DIR = PROJ_ROOT / "reports"
 FIGURES_DIR = REPORTS_DIR / "figures"
@@ -0,0 +1,226 @@
+import sys
+import json
+import hashlib
+from pathlib import Path
+from typing import List
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import typer
+from loguru import logger
+
+# Add the project root to sys.path when run as a script
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if __package__ in (None, ""):
+    sys.path.append(str(PROJECT_ROOT))
+
+from config import FIGURES_DIR
+from scripts.panel import load_panel
+from scripts.metrics import METRICS, compute_metrics, date_window
+from scripts.result_store import data_version, metric_params, result_store
+from figures.depreciation_bar_chart import draw_depreciation_bar_chart
+from figures.volatility_bar_chart import draw_volatility_bar_chart
+from figures.var_bar_chart import draw_var_bar_chart
+from figures.maximum_drawdown_bar_chart import draw_maximum_drawdown_bar_chart
+from scripts.lazy import lazy_import
+
+plt = lazy_import("matplotlib.pyplot")
+
+"""
+Render the bar charts of every metric for a list of periods in one go.
+
+The metrics of a period are read from the result store, those missing are
+computed together from the shared price panel and stored. The charts are
+drawn headless (Agg) in a pool of worker processes and saved as
+<metric>_<START>_<END>.<format>, matching the file names of the paper's
+figures. A manifest in the output directory stores a hash of every chart's
+inputs, charts whose inputs did not change are not drawn again.
+"""
+
+# The periods shown in the paper
+DEFAULT_PERIODS = ["2000-2024", "2000-2007", "2007-2009", "2009-2024"]
+
+MANIFEST_NAME = "figures.json"
+
+# Bump when the look of the charts changes, forces all charts to be redrawn
+RENDER_VERSION = 1
+
+_DRAW_FUNCTIONS = {
+    "depreciation": draw_depreciation_bar_chart,
+    "volatility": draw_volatility_bar_chart,
+    "var": draw_var_bar_chart,
+    "maximum_drawdown": draw_maximum_drawdown_bar_chart,
+}
+
+
+def parse_period(period):
+    """
+    Parse a period written as "START-END", e.g. "2007-2009".
+
+    Args:
+        period (str): The period.
+
+    Returns:
+        tuple: (START, END) as integers.
+    """
+    START, END = (int(year) for year in period.split("-"))
+    if START > END:
+        raise ValueError(f"Period starts after it ends: {period}")
+    return START, END
+
+
+def figure_hash(metric, START, END, confidence_level, results, image_format):
+    """
+    Hash everything a chart depends on.
+
+    Args:
+        metric (str): One of METRICS.
+        START (int): Start year.
+        END (int): End year.
+        confidence_level (float): The confidence level for VaR calculation.
+        results (dict): Currencies and their metric values.
+        image_format (str): File format of the chart.
+
+    Returns:
+        str: Hex digest of the chart's inputs.
+    """
+    payload = {
+        "version": RENDER_VERSION,
+        "metric": metric,
+        "period": [START, END],
+        "confidence_level": confidence_level if metric == "var" else None,
+        "format": image_format,
+        "results": sorted(results.items()),
+    }
+    return hashlib.sha256(json.dumps(payload).encode()).hexdigest()
+
+
+def render_figure(metric, results, confidence_level, output_path):
+    """
+    Draw one chart without a display and save it.
+
+    Args:
+        metric (str): One of METRICS.
+        results (dict): Currencies and their metric values.
+        confidence_level (float): The confidence level for VaR calculation.
+        output_path (Path): File to save the chart to.
+
+    Returns:
+        Path: The saved file, None if there was no data to plot.
+    """
+    plt.switch_backend("Agg")
+    if metric == "var":
+        drawn = draw_var_bar_chart(results, confidence_level, output_path)
+    else:
+        drawn = _DRAW_FUNCTIONS[metric](results, output_path)
+    return output_path if drawn else None
+
+
+def build_report(periods, metrics=METRICS, output_dir=FIGURES_DIR, formats=("pdf",),
+                 confidence_level=0.95, workers=1, force=False):
+    """
+    Compute the metrics of every period and render the charts that changed.
+
+    Args:
+        periods (list): (START, END) year pairs.
+        metrics (list): Metrics to chart.
+        output_dir (Path): Directory to save the charts to.
+        formats (list): File formats, e.g. "pdf" or "png".
+        confidence_level (float): The confidence level for VaR calculation.
+        workers (int): Number of worker processes drawing charts.
+        force (bool): Redraw every chart, even if its inputs did not change.
+
+    Returns:
+        tuple: (rendered, skipped) numbers of charts.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest_path = output_dir / MANIFEST_NAME
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except (OSError, ValueError):
+        manifest = {}
+
+    # Read or compute the metrics of every period and collect the charts to draw
+    version = data_version()
+    store = result_store()
+    panel = None
+    jobs = []
+    skipped = 0
+    for START, END in periods:
+        params = {metric: metric_params(metric, confidence_level) for metric in metrics}
+        results = {metric: store.get(metric, START, END, params[metric], version) for metric in metrics}
+        missing = [metric for metric in metrics if results[metric] is None]
+        if missing:
+            if panel is None:
+                panel = load_panel()
+            computed = compute_metrics(date_window(panel, START, END), confidence_level, missing)
+            for metric in missing:
+                results[metric] = computed[metric].dropna().to_dict()
+                store.put(metric, START, END, results[metric], params[metric], version, flush=False)
+
+        for metric in metrics:
+            metric_results = results[metric]
+            for image_format in formats:
+                output_path = output_dir / f"{metric}_{START}_{END}.{image_format}"
+                digest = figure_hash(metric, START, END, confidence_level, metric_results, image_format)
+                if not force and output_path.exists() and manifest.get(output_path.name) == digest:
+                    skipped += 1
+                    continue
+                jobs.append((digest, metric, metric_results, confidence_level, output_path))
+    store.flush()
+
+    logger.info(f"{len(jobs)} charts to draw, {skipped} unchanged.")
+
+    rendered = 0
+    if workers <= 1:
+        for digest, *task in jobs:
+            try:
+                output_path = render_figure(*task)
+            except Exception as e:
+                logger.error(f"Error drawing chart: {e}")
+                continue
+            if output_path is not None:
+                manifest[output_path.name] = digest
+                rendered += 1
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(render_figure, *task): digest for digest, *task in jobs}
+            for future in as_completed(futures):
+                try:
+                    output_path = future.result()
+                except Exception as e:
+                    logger.error(f"Error drawing chart: {e}")
+                    continue
+                if output_path is not None:
+                    manifest[output_path.name] = futures[future]
+                    rendered += 1
+
+    manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    return rendered, skipped
+
+
+app = typer.Typer()
+
+
+@app.command()
+def main(
+    period: List[str] = typer.Option(DEFAULT_PERIODS, help="Period as START-END, can be repeated."),
+    metric: List[str] = typer.Option(METRICS, help="Metric to chart, can be repeated."),
+    image_format: List[str] = typer.Option(["pdf"], "--format", help="File format, e.g. pdf or png, can be repeated."),
+    output_dir: Path = FIGURES_DIR,  # Directory to save the charts to
+    confidence_level: float = typer.Option(0.95, help="Confidence level for VaR."),
+    workers: int = typer.Option(1, min=1, help="Number of worker processes drawing charts."),
+    force: bool = typer.Option(False, help="Redraw all charts, even if their inputs did not change."),
+):
+    unknown = set(metric) - set(METRICS)
+    if unknown:
+        logger.error(f"Unknown metrics: {', '.join(sorted(unknown))}")
+        raise typer.Exit(1)
+
+    periods = [parse_period(p) for p in period]
+    rendered, skipped = build_report(periods, metric, output_dir, image_format, confidence_level, workers, force)
+    logger.success(f"Drew {rendered} charts to {output_dir}, {skipped} were up to date.")
+
+
+if __name__ == "__main__":
+    app()
@@ -1,29 +1,47 @@
-import pandas as pd
-import matplotlib.pyplot as plt
 import sys
 from pathlib import Path
-from datetime import datetime
 
 
-# Add the project root to sys.path
+# Add the project root to sys.path when run as a script
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
-sys.path.append(str(PROJECT_ROOT))
+if __package__ in (None, ""):
+    sys.path.append(str(PROJECT_ROOT))
 
 from scripts.depreciation import calculate_depreciation  
-from config import PROCESSED_DATA_DIR, FIGURES_DIR
+from scripts.instrumentation import stage, timed
+from scripts.lazy import lazy_import
 
+pd = lazy_import("pandas")
+plt = lazy_import("matplotlib.pyplot")
 
 
-def plot_depreciation_bar_chart(START, END):
+
+@timed
+def plot_depreciation_bar_chart(START, END, output_path=None):
     """
     Calculate depreciation and plot a histogram of the results.
     """
     # Calculate depreciation
-    depreciation_results = calculate_depreciation(START, END)
+    with stage("compute"):
+        depreciation_results = calculate_depreciation(START, END)
+    with stage("render", rows=len(depreciation_results or ())):
+        draw_depreciation_bar_chart(depreciation_results, output_path)
+
+
+def draw_depreciation_bar_chart(depreciation_results, output_path=None):
+    """
+    Plot a bar chart of depreciation results.
+
+    Args:
+        depreciation_results (dict): Currencies and their depreciation in percent.
+        output_path (Path): Save the chart to this file instead of showing it.
 
+    Returns:
+        bool: Whether there was data to plot.
+    """
     if not depreciation_results:
         print("No depreciation data available to plot.")
-        return
+        return False
 
     # Convert results to a DataFrame
     df = pd.DataFrame(list(depreciation_results.items()), columns=["Currency", "Depreciation (%)"])
@@ -51,9 +69,14 @@ def plot_depreciation_bar_chart(START, END):
     # Add grid for easier reading
     plt.grid(axis="y", linestyle="--", alpha=0.7)
 
-    # Show the plot
+    # Show the plot, or save it if an output path is given
     plt.tight_layout()
-    plt.show()
+    if output_path is None:
+        plt.show()
+    else:
+        plt.savefig(output_path)
+        plt.close()
+    return True
 
 
 if __name__ == "__main__":
@@ -1,45 +1,183 @@
-import pandas as pd
-import matplotlib.pyplot as plt
 import sys
 from pathlib import Path
 
-# Add the project root to sys.path
+# Add the project root to sys.path when run as a script
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
-sys.path.append(str(PROJECT_ROOT))
+if __package__ in (None, ""):
+    sys.path.append(str(PROJECT_ROOT))
+
+from scripts.panel import load_panel
+from scripts.downsample import downsample
+from scripts.instrumentation import stage, timed
+from scripts.lazy import lazy_import
+
+np = lazy_import("numpy")
+plt = lazy_import("matplotlib.pyplot")
+mdates = lazy_import("matplotlib.dates")
+
+"""
+Exchange rate charts of one or more currencies.
+
+The chart is drawn once and updated in place: choosing another currency
+replaces the data of its lines with set_data instead of creating a new
+figure. Lines are never drawn with more points than the axes have pixels;
+whenever the visible date range changes, e.g. when zooming or panning, the
+visible part of every series is downsampled again to the width of the axes
+(see scripts/downsample.py), so 20 years of minute bars stay responsive.
+"""
+
+# Visible series with at most this many points are drawn with markers
+MARKER_LIMIT = 500
+
+# Currency series as (matplotlib date numbers, prices), for the panel they were taken from
+_SERIES_CACHE = [None, {}]
+
+
+def currency_series(currency):
+    """
+    Return the dates and prices of a currency, cached until the panel changes.
+
+    Args:
+        currency (str): Column of the price panel, e.g. "CHF_AUD Historical Data".
+
+    Returns:
+        tuple: (dates as matplotlib date numbers, prices) without missing prices, or None if unknown.
+    """
+    panel = load_panel()
+    if _SERIES_CACHE[0] is not panel:
+        _SERIES_CACHE[:] = [panel, {}]
+    series = _SERIES_CACHE[1]
+
+    if currency not in series:
+        if currency not in panel.columns:
+            return None
+        prices = panel[currency].dropna()
+        series[currency] = (mdates.date2num(prices.index), prices.to_numpy(dtype="float64"))
+    return series[currency]
+
+
+class CurrencyChart:
+    """
+    A persistent exchange rate chart, see the module docstring.
+    """
+
+    def __init__(self, method="minmax", figsize=(12, 6)):
+        self.method = method
+        self.figsize = figsize
+        self.figure = None
+        self.ax = None
+        self.lines = {}
+        self.series = {}
+
+    def _ensure_figure(self):
+        # Reuse the figure unless it was closed, e.g. by plt.show() of an inline backend
+        if self.figure is not None and plt.fignum_exists(self.figure.number):
+            plt.figure(self.figure.number)
+            return
+
+        self.figure, self.ax = plt.subplots(figsize=self.figsize)
+        self.lines = {}
+        self.ax.xaxis_date()
+        self.ax.set_xlabel("Date")
+        self.ax.grid()
+        self.ax.callbacks.connect("xlim_changed", lambda ax: self._update())
+
+    def _update(self):
+        """
+        Downsample the visible part of every series to the width of the axes.
+        """
+        if not self.series:
+            return
+        left, right = self.ax.get_xlim()
+        width = self.ax.bbox.width
+
+        for currency, (x, y) in self.series.items():
+            # One point beyond each edge, so the line runs up to the border
+            first = max(np.searchsorted(x, left) - 1, 0)
+            last = np.searchsorted(x, right, side="right") + 1
+            visible_x, visible_y = downsample(x[first:last], y[first:last], width, self.method)
+
+            line = self.lines[currency]
+            line.set_data(visible_x, visible_y)
+            line.set_marker("o" if last - first <= MARKER_LIMIT else "")
+
+    def plot(self, currencies, rebase=False):
+        """
+        Show the exchange rates of some currencies on the chart.
+
+        Args:
+            currencies (list): Columns of the price panel, a ValueError is raised for any other.
+            rebase (bool): Rebase every series to 100 at its first date, to compare currencies of different scales.
+        """
+        self._ensure_figure()
+        self.series = {}
+        for currency in currencies:
+            series = currency_series(currency)
+            if series is None:
+                raise ValueError(f"Unknown currency: {currency}")
+            x, y = series
+            self.series[currency] = (x, y / y[0] * 100 if rebase else y)
+
+        # Remove the lines of currencies no longer shown, add the new ones
+        for currency in list(self.lines):
+            if currency not in self.series:
+                self.lines.pop(currency).remove()
+        single = len(self.series) == 1
+        for currency in self.series:
+            if currency not in self.lines:
+                (self.lines[currency],) = self.ax.plot([], [], linestyle="-", color="blue" if single else None)
+            self.lines[currency].set_label("Closing Price" if single else currency)
+
+        # Show the full history, then fit the y axis to the downsampled lines, which keep every extreme
+        start = min(x[0] for x, _ in self.series.values())
+        end = max(x[-1] for x, _ in self.series.values())
+        self.ax.set_xlim(start, end, emit=False)
+        self._update()
+        self.ax.relim()
+        self.ax.autoscale_view(scalex=False)
+
+        self.ax.set_ylabel("Exchange Rate (rebased to 100)" if rebase else "Exchange Rate")
+        self.ax.set_title(currencies[0] if single else "Exchange Rates")
+        self.ax.legend()
+        self.figure.canvas.draw_idle()
+
+
+# The chart reused by plot_currency_chart
+_CHART = CurrencyChart()
 
-from config import PROCESSED_DATA_DIR
 
 # Function to load and plot data for a selected currency
-def plot_currency_chart(currency):
+@timed
+def plot_currency_chart(currency, rebase=False):
     """
     Plot the exchange rate chart for the selected currency.
+
+    Args:
+        currency (str or list): Currency column, or several to overlay them.
+        rebase (bool): Rebase every series to 100 at its first date.
     """
-    # Path to the currency file
-    csv_file_path = PROCESSED_DATA_DIR / f"{currency}.csv"
-
-    try:
-        # Load the CSV file into a DataFrame
-        df = pd.read_csv(csv_file_path)  
-        
-        # Clean and parse the Date column
-        df["Date"] = df["Date"].str.strip()  # Remove any extra spaces
-        df["Date"] = pd.to_datetime(df["Date"], format="%Y-%d-%m")  # Parse dates explicitly
-
-        # Sort by Date
-        df = df.sort_values("Date")
-
-        # Plot Exchange Rates
-        plt.figure(figsize=(12, 6))
-        plt.plot(df["Date"], df["Price"], label="Closing Price", marker="o", linestyle="-", color="blue")
-        plt.xlabel("Date")
-        plt.ylabel("Exchange Rate")
-        plt.title(f"{currency}")
-        plt.grid()
-        plt.legend()
-        plt.show()
+    currencies = [currency] if isinstance(currency, str) else list(currency)
+
+    # Load the shared price panel and the cached series
+    with stage("load") as record:
+        panel = load_panel()
+        record.rows = len(panel)
 
-    except FileNotFoundError:
-        print(f"No data found for currency: {currency}")
+    with stage("filter") as record:
+        found = []
+        for name in currencies:
+            if currency_series(name) is None:
+                print(f"No data found for currency: {name}")
+            else:
+                found.append(name)
+        record.rows = sum(len(currency_series(name)[1]) for name in found)
+    if not found:
+        return
+
+    # Plot Exchange Rates
+    with stage("render", rows=record.rows):
+        _CHART.plot(found, rebase)
+        plt.show()
 
 
 if __name__ == "__main__":
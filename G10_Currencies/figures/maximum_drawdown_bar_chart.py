@@ -1,30 +1,49 @@
-import pandas as pd
-import matplotlib.pyplot as plt
 import sys
 from pathlib import Path
-from datetime import datetime
 
-# Add the project root to sys.path
+# Add the project root to sys.path when run as a script
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
-sys.path.append(str(PROJECT_ROOT))
+if __package__ in (None, ""):
+    sys.path.append(str(PROJECT_ROOT))
 
 from scripts.maximum_drawdown import calculate_maximum_drawdown
-from config import PROCESSED_DATA_DIR, FIGURES_DIR
+from scripts.instrumentation import stage, timed
+from scripts.lazy import lazy_import
 
-def plot_maximum_drawdown_bar_chart(START, END):
+pd = lazy_import("pandas")
+plt = lazy_import("matplotlib.pyplot")
+
+@timed
+def plot_maximum_drawdown_bar_chart(START, END, output_path=None):
     """
     Calculate maximum drawdown and plot a bar chart of the results.
 
     Args:
         START (int): Start year for filtering the data.
         END (int): End year for filtering the data.
+        output_path (Path): Save the chart to this file instead of showing it.
     """
     # Calculate maximum drawdown results
-    mdd_results = calculate_maximum_drawdown(START, END)
+    with stage("compute"):
+        mdd_results = calculate_maximum_drawdown(START, END)
+    with stage("render", rows=len(mdd_results or ())):
+        draw_maximum_drawdown_bar_chart(mdd_results, output_path)
+
+
+def draw_maximum_drawdown_bar_chart(mdd_results, output_path=None):
+    """
+    Plot a bar chart of maximum drawdown results.
 
+    Args:
+        mdd_results (dict): Currencies and their maximum drawdown in percent.
+        output_path (Path): Save the chart to this file instead of showing it.
+
+    Returns:
+        bool: Whether there was data to plot.
+    """
     if not mdd_results:
         print("No maximum drawdown data available to plot.")
-        return
+        return False
 
     # Convert results to a DataFrame
     df = pd.DataFrame(list(mdd_results.items()), columns=["Currency", "Maximum Drawdown (%)"])
@@ -52,9 +71,14 @@ def plot_maximum_drawdown_bar_chart(START, END):
     # Add grid for easier reading
     plt.grid(axis="y", linestyle="--", alpha=0.7)
 
-    # Show the plot
+    # Show the plot, or save it if an output path is given
     plt.tight_layout()
-    plt.show()
+    if output_path is None:
+        plt.show()
+    else:
+        plt.savefig(output_path)
+        plt.close()
+    return True
 
 
 if __name__ == "__main__":
@@ -1,16 +1,20 @@
-import pandas as pd
-import matplotlib.pyplot as plt
 import sys
 from pathlib import Path
 
-# Add the project root to sys.path
+# Add the project root to sys.path when run as a script
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
-sys.path.append(str(PROJECT_ROOT))
+if __package__ in (None, ""):
+    sys.path.append(str(PROJECT_ROOT))
 
 from scripts.value_at_risk import calculate_var
-from config import PROCESSED_DATA_DIR, FIGURES_DIR
+from scripts.instrumentation import stage, timed
+from scripts.lazy import lazy_import
 
-def plot_var_bar_chart(START, END, confidence_level=0.95):
+pd = lazy_import("pandas")
+plt = lazy_import("matplotlib.pyplot")
+
+@timed
+def plot_var_bar_chart(START, END, confidence_level=0.95, output_path=None):
     """
     Calculate VaR and plot a bar chart of the results.
 
@@ -18,12 +22,29 @@ def plot_var_bar_chart(START, END, confidence_level=0.95):
         START (int): Start year for analysis.
         END (int): End year for analysis.
         confidence_level (float): The confidence level for VaR calculation (default is 0.95).
+        output_path (Path): Save the chart to this file instead of showing it.
+    """
+    with stage("compute"):
+        var_results = calculate_var(START, END, confidence_level)
+    with stage("render", rows=len(var_results or ())):
+        draw_var_bar_chart(var_results, confidence_level, output_path)
+
+
+def draw_var_bar_chart(var_results, confidence_level=0.95, output_path=None):
     """
-    var_results = calculate_var(START, END, confidence_level)
+    Plot a bar chart of VaR results.
 
+    Args:
+        var_results (dict): Currencies and their VaR in percent.
+        confidence_level (float): The confidence level the VaR was calculated at.
+        output_path (Path): Save the chart to this file instead of showing it.
+
+    Returns:
+        bool: Whether there was data to plot.
+    """
     if not var_results:
         print("No VaR data available to plot.")
-        return
+        return False
 
     # Convert results to a DataFrame
     df = pd.DataFrame(list(var_results.items()), columns=["Currency", "VaR (%)"])
@@ -51,9 +72,15 @@ def plot_var_bar_chart(START, END, confidence_level=0.95):
     # Add grid for better readability
     plt.grid(axis="y", linestyle="--", alpha=0.7)
 
-    # Show the plot
+    # Show the plot, or save it if an output path is given
     plt.tight_layout()
-    plt.show()
+    if output_path is None:
+        plt.show()
+    else:
+        plt.savefig(output_path)
+        plt.close()
+    return True
+
 
 if __name__ == "__main__":
     plot_var_bar_chart(2000, 2024, confidence_level=0.95)
@@ -1,28 +1,46 @@
-import pandas as pd
-import matplotlib.pyplot as plt
 import sys
 from pathlib import Path
-from datetime import datetime
 
 
-# Add the project root to sys.path
+# Add the project root to sys.path when run as a script
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
-sys.path.append(str(PROJECT_ROOT))
+if __package__ in (None, ""):
+    sys.path.append(str(PROJECT_ROOT))
 
 from scripts.volatility import calculate_volatility
-from config import PROCESSED_DATA_DIR, FIGURES_DIR
+from scripts.instrumentation import stage, timed
+from scripts.lazy import lazy_import
 
+pd = lazy_import("pandas")
+plt = lazy_import("matplotlib.pyplot")
 
 
-def plot_volatility_bar_chart(START, END):
+
+@timed
+def plot_volatility_bar_chart(START, END, output_path=None):
     """
     Calculate volatility and plot a histogram of the results.
     """
-    volatility_results = calculate_volatility(START, END)
+    with stage("compute"):
+        volatility_results = calculate_volatility(START, END)
+    with stage("render", rows=len(volatility_results or ())):
+        draw_volatility_bar_chart(volatility_results, output_path)
+
+
+def draw_volatility_bar_chart(volatility_results, output_path=None):
+    """
+    Plot a bar chart of volatility results.
+
+    Args:
+        volatility_results (dict): Currencies and their annualized volatility.
+        output_path (Path): Save the chart to this file instead of showing it.
 
+    Returns:
+        bool: Whether there was data to plot.
+    """
     if not volatility_results:
         print("No depreciation data available to plot.")
-        return
+        return False
 
     # Convert results to a DataFrame
     df = pd.DataFrame(list(volatility_results.items()), columns=["Currency", "Standard Deviation"])
@@ -50,9 +68,14 @@ def plot_volatility_bar_chart(START, END):
     # Add grid for easier reading
     plt.grid(axis="y", linestyle="--", alpha=0.7)
 
-    # Show the plot
+    # Show the plot, or save it if an output path is given
     plt.tight_layout()
-    plt.show()
+    if output_path is None:
+        plt.show()
+    else:
+        plt.savefig(output_path)
+        plt.close()
+    return True
 
 
 if __name__ == "__main__":
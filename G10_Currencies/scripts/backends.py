@@ -0,0 +1,176 @@
+import mmap
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+from scripts.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+"""
+Execution backends for block-wise array computations.
+
+A backend runs func(array[rows, cols], *args) for a list of (rows, cols,
+args) tasks, where rows and cols are slices of a shared 2-D array, and
+returns the results in task order. Every backend hands the same block to the
+same function, so results do not depend on the backend:
+
+- "serial": one task after another in the calling process.
+- "thread": a thread pool, blocks are views of the array. NumPy releases the
+  GIL in most of its loops.
+- "process": a process pool. A memory-mapped array, e.g. the prices.npy of
+  panel.load_panel_arrays, is mapped from its file by every worker, which
+  reads only the pages of its blocks, so the array need not fit in memory.
+  Other arrays are copied once into shared memory, which every worker maps at
+  startup. Either way blocks are views, nothing is pickled per task but the
+  slices.
+- "dask": a dask.distributed cluster, a local one or the scheduler at
+  `address` for several machines. Every column block is sent once to the
+  cluster and the tasks of a block are scheduled where it lives. Needs
+  dask[distributed], which is optional.
+"""
+
+BACKENDS = ["serial", "thread", "process", "dask"]
+
+
+class SerialBackend:
+    """
+    Run the tasks one after another in the calling process.
+    """
+
+    def __init__(self, workers=1):
+        self.workers = 1
+
+    def run(self, func, array, tasks):
+        return [func(array[rows, cols], *args) for rows, cols, args in tasks]
+
+
+class ThreadBackend:
+    """
+    Run the tasks in a thread pool on views of the array.
+    """
+
+    def __init__(self, workers=1):
+        self.workers = workers
+
+    def run(self, func, array, tasks):
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return list(executor.map(lambda task: func(array[task[0], task[1]], *task[2]), tasks))
+
+
+# The shared array mapped by a worker process of ProcessBackend
+_SHARED = {}
+
+
+def _attach_shared(name, shape, dtype):
+    memory = shared_memory.SharedMemory(name=name)
+    _SHARED["memory"] = memory
+    _SHARED["array"] = np.ndarray(shape, dtype=dtype, buffer=memory.buf, order="F")
+
+
+def _attach_memmap(filename, offset, shape, dtype, order):
+    _SHARED["array"] = np.memmap(filename, dtype=dtype, mode="r", offset=offset, shape=shape, order=order)
+
+
+def _run_shared(func, rows, cols, args):
+    return func(_SHARED["array"][rows, cols], *args)
+
+
+class ProcessBackend:
+    """
+    Run the tasks in a process pool on the array's file or a shared memory copy of it.
+    """
+
+    def __init__(self, workers=1):
+        self.workers = workers
+
+    def _run(self, func, tasks, initializer, initargs):
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=initializer, initargs=initargs) as executor:
+            futures = [executor.submit(_run_shared, func, rows, cols, args) for rows, cols, args in tasks]
+            return [future.result() for future in futures]
+
+    def run(self, func, array, tasks):
+        # A whole file mapping, not a view of one whose offset and shape no longer describe the file
+        if isinstance(array, np.memmap) and isinstance(array.base, mmap.mmap):
+            order = "F" if array.flags.f_contiguous else "C"
+            return self._run(func, tasks, _attach_memmap,
+                             (array.filename, array.offset, array.shape, array.dtype.str, order))
+
+        array = np.asarray(array)
+
+        # Column-major, so the columns of a currency block are contiguous
+        memory = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        shared = np.ndarray(array.shape, dtype=array.dtype, buffer=memory.buf, order="F")
+        try:
+            shared[:] = array
+            return self._run(func, tasks, _attach_shared, (memory.name, array.shape, array.dtype.str))
+        finally:
+            del shared
+            memory.close()
+            memory.unlink()
+
+
+def _run_block(block, rows, func, args):
+    return func(block[rows], *args)
+
+
+class DaskBackend:
+    """
+    Run the tasks on a dask.distributed cluster.
+    """
+
+    def __init__(self, workers=1, address=None):
+        self.workers = workers
+        self.address = address
+
+    def run(self, func, array, tasks):
+        try:
+            from dask.distributed import Client, LocalCluster
+        except ImportError:
+            raise ImportError("The dask backend needs dask[distributed], which is not installed.") from None
+
+        cluster = None
+        if self.address is None:
+            cluster = LocalCluster(n_workers=self.workers, threads_per_worker=1, processes=True)
+        try:
+            with Client(self.address or cluster) as client:
+                # Send every column block once, its tasks only carry the rows
+                blocks = {}
+                for _, cols, _ in tasks:
+                    key = (cols.start, cols.stop, cols.step)
+                    if key not in blocks:
+                        blocks[key] = client.scatter(np.asarray(array[:, cols]))
+                futures = [
+                    client.submit(_run_block, blocks[(cols.start, cols.stop, cols.step)], rows, func, args, pure=False)
+                    for rows, cols, args in tasks
+                ]
+                return client.gather(futures)
+        finally:
+            if cluster is not None:
+                cluster.close()
+
+
+_BACKEND_CLASSES = {
+    "serial": SerialBackend,
+    "thread": ThreadBackend,
+    "process": ProcessBackend,
+    "dask": DaskBackend,
+}
+
+
+def get_backend(name="serial", workers=1, address=None):
+    """
+    Create an execution backend.
+
+    Args:
+        name (str): One of BACKENDS.
+        workers (int): Number of threads, processes or local dask workers.
+        address (str): Scheduler of an existing dask cluster, e.g. "tcp://10.0.0.1:8786", a local cluster if None.
+
+    Returns:
+        object: A backend with a run(func, array, tasks) method.
+    """
+    if name not in _BACKEND_CLASSES:
+        raise ValueError(f"Unknown backend: {name}")
+    if name == "dask":
+        return DaskBackend(workers, address)
+    return _BACKEND_CLASSES[name](workers)
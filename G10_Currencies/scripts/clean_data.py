@@ -2,132 +2,533 @@ from pathlib import Path
 import typer
 from loguru import logger
 from tqdm import tqdm
-import pandas as pd 
+import hashlib
+import json
+import io
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-# Add the project root to sys.path
+# Add the project root to sys.path when run as a script
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
-sys.path.append(str(PROJECT_ROOT))
+if __package__ in (None, ""):
+    sys.path.append(str(PROJECT_ROOT))
 
-from config import PROCESSED_DATA_DIR, RAW_DATA_DIR
+from config import INTERIM_DATA_DIR, PROCESSED_DATA_DIR, RAW_DATA_DIR
+from scripts.panel import ARRAYS_DIRNAME, write_panel_arrays
+from scripts.result_store import result_store
+from scripts.schema import read_raw
+from scripts.instrumentation import stage, timed
+from scripts.lazy import lazy_import
+
+pd = lazy_import("pandas")
 
 """
 1. Find the dataset with the shortest time span, take this as a reference
 2. Shorten all other datasets so that they are all the same length
 3. Copy the datasets to processed folder
+   and remove the processed datasets whose raw file was deleted
+4. Store the processed prices as memory-mappable arrays for fast loading
+5. Drop the stored results of older processed data
+6. Write all prices side by side into a merged dataset
+
+Raw files are parsed and processed files written in a pool of worker processes
+when more than one worker is requested. Workers only return results; all
+logging and the progress bar stay in the main process.
+
+In incremental mode a manifest remembers, for every raw file, how many bytes
+were ingested, their hash and the covered dates. Rows added to the top (newest
+first, as exported by Investing.com) or the bottom of a raw file are parsed on
+their own, and only the processed files whose content changes are rewritten.
+Added rows that overlap the dates already ingested cause a full rewrite of
+their file.
+
+With --chunksize raw files are streamed in chunks and filtered on the fly, so
+files larger than memory can be ingested.
+
+Raw files are parsed with the explicit schema of scripts/schema.py (MM/DD/YYYY
+dates, numeric Change % and Vol.) and processed files are written with ISO
+dates (YYYY-MM-DD).
 """
 
-def find_shortest_time_span():
+MANIFEST_PATH = INTERIM_DATA_DIR / "ingest_manifest.json"
+
+# Bump when the layout of the processed files changes, forces a full rebuild
+MANIFEST_FORMAT = 2
+
+def _sha256(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def _split_header(content):
+    """
+    Split the raw bytes of a CSV file into its header line and its body.
+    """
+    newline = content.find(b"\n") + 1
+    if newline == 0:
+        return content, b""
+    return content[:newline], content[newline:]
+
+
+def load_manifest():
+    """
+    Load the ingest manifest, or an empty one if it is missing or outdated.
+
+    Returns:
+        dict: The manifest with its "window" and per-file "files" entries.
+    """
+    try:
+        manifest = json.loads(MANIFEST_PATH.read_text())
+    except (OSError, ValueError):
+        manifest = {}
+
+    if manifest.get("format") != MANIFEST_FORMAT:
+        return {"format": MANIFEST_FORMAT, "window": None, "files": {}}
+    return manifest
+
+
+def save_manifest(manifest):
+    """
+    Save the ingest manifest to MANIFEST_PATH.
+
+    Args:
+        manifest (dict): The manifest to save.
+    """
+    MANIFEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+    MANIFEST_PATH.write_text(json.dumps(manifest, indent=2))
+
+
+def scan_raw_file(csv_file, entry=None):
+    """
+    Compare a raw file with its manifest entry and parse only what is new.
+
+    Args:
+        csv_file (Path): The raw CSV file.
+        entry (dict): The manifest entry of the previous run, if any.
+
+    Returns:
+        tuple: (mode, entry, df) where mode is "unchanged", "prepended", "appended"
+            or "full", entry is the updated manifest entry and df holds the parsed
+            new rows (all rows for "full", None for "unchanged").
+    """
+    stat = csv_file.stat()
+    if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+        return "unchanged", entry, None
+
+    content = csv_file.read_bytes()
+    header, body = _split_header(content)
+    body_sha256 = _sha256(body)
+
+    new_entry = {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "header_sha256": _sha256(header),
+        "body_size": len(body),
+        "body_sha256": body_sha256,
+    }
+
+    mode, new_body = "full", body
+    if entry and entry["header_sha256"] == new_entry["header_sha256"]:
+        old_size = entry["body_size"]
+        if body_sha256 == entry["body_sha256"]:
+            # Only the timestamp changed
+            new_entry.update(start=entry["start"], end=entry["end"], rows=entry["rows"])
+            return "unchanged", new_entry, None
+        if 0 < old_size < len(body) and _sha256(body[-old_size:]) == entry["body_sha256"]:
+            mode, new_body = "prepended", body[:-old_size]
+        elif 0 < old_size < len(body) and _sha256(body[:old_size]) == entry["body_sha256"]:
+            mode, new_body = "appended", body[old_size:]
+
+    df = read_raw(io.BytesIO(header + new_body), name=csv_file.name)
+
+    # New rows must lie outside the ingested dates, newer at the top and older at the bottom,
+    # anything else (e.g. a re-sent row) is parsed and checked with the whole file
+    if mode == "prepended" and df["Date"].min() <= pd.Timestamp(entry["end"]) or (
+        mode == "appended" and df["Date"].max() >= pd.Timestamp(entry["start"])
+    ):
+        mode, df = "full", read_raw(io.BytesIO(content), name=csv_file.name)
+
+    # Extend the covered dates by the new rows
+    start, end, rows = df["Date"].min(), df["Date"].max(), len(df)
+    if mode != "full":
+        start = min(start, pd.Timestamp(entry["start"]))
+        end = max(end, pd.Timestamp(entry["end"]))
+        rows += entry["rows"]
+    new_entry.update(start=start.isoformat(), end=end.isoformat(), rows=rows)
+
+    return mode, new_entry, df
+
+
+def _hash_raw_file(csv_file, block_size=1 << 20):
+    """
+    Hash the header and the body of a raw file without reading it into memory at once.
+    """
+    body = hashlib.sha256()
+    body_size = 0
+    with open(csv_file, "rb") as f:
+        header, block = _split_header(f.read(block_size))
+        header_sha256 = _sha256(header)
+        while block:
+            body.update(block)
+            body_size += len(block)
+            block = f.read(block_size)
+    return {"header_sha256": header_sha256, "body_size": body_size, "body_sha256": body.hexdigest()}
+
+
+def scan_raw_file_chunked(csv_file, entry=None, chunksize=200_000):
+    """
+    Like scan_raw_file, but reads the file in chunks so it never has to fit into memory.
+
+    Changed files are always reprocessed in full, no rows are kept.
+
+    Args:
+        csv_file (Path): The raw CSV file.
+        entry (dict): The manifest entry of the previous run, if any.
+        chunksize (int): Rows per chunk.
+
+    Returns:
+        tuple: (mode, entry, None) where mode is "unchanged" or "full".
+    """
+    stat = csv_file.stat()
+    if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+        return "unchanged", entry, None
+
+    new_entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, **_hash_raw_file(csv_file)}
+    if entry and entry["header_sha256"] == new_entry["header_sha256"] and entry["body_sha256"] == new_entry["body_sha256"]:
+        # Only the timestamp changed
+        new_entry.update(start=entry["start"], end=entry["end"], rows=entry["rows"])
+        return "unchanged", new_entry, None
+
+    # Covered dates, one chunk at a time
+    start, end, rows = None, None, 0
+    for chunk in read_raw(csv_file, chunksize=chunksize):
+        if chunk.empty:
+            continue
+        start = chunk["Date"].min() if start is None else min(start, chunk["Date"].min())
+        end = chunk["Date"].max() if end is None else max(end, chunk["Date"].max())
+        rows += len(chunk)
+    if start is None:
+        raise ValueError("The file contains no rows.")
+    new_entry.update(start=start.isoformat(), end=end.isoformat(), rows=rows)
+
+    return "full", new_entry, None
+
+
+def find_shortest_time_span(entries):
     """
-    Finds the dataset with the shortest time span in the RAW_DATA_DIR.
-    
+    Finds the dataset with the shortest time span.
+
+    Args:
+        entries (dict): Manifest entries of the raw files, keyed by filename.
+
     Returns:
         str: The filename of the dataset with the shortest time span.
     """
     shortest_time_span = None
     reference_filename = None
 
-    # Iterate over all CSV files in the raw data directory
-    for csv_file in RAW_DATA_DIR.glob("*.csv"):
-        logger.info(f"Processing file: {csv_file}")
-        try:
-            # Load the dataset
-            df = pd.read_csv(csv_file, parse_dates=["Date"], dayfirst=True, quotechar='"')
-            
-            # Calculate the time span of the dataset
-            start_date = df["Date"].min()
-            end_date = df["Date"].max()
-            time_span = (end_date - start_date).days
-            
-            logger.info(f"Dataset: {csv_file.name}, Start: {start_date}, End: {end_date}, Time Span: {time_span} days")
-            
-            # Update the reference dataset if this dataset has the shortest time span
-            if shortest_time_span is None or time_span < shortest_time_span:
-                shortest_time_span = time_span
-                reference_filename = csv_file.name
-
-        except Exception as e:
-            logger.error(f"Error processing file {csv_file}: {e}")
+    for filename, entry in sorted(entries.items()):
+        start_date = pd.Timestamp(entry["start"])
+        end_date = pd.Timestamp(entry["end"])
+        time_span = (end_date - start_date).days
+
+        logger.info(f"Dataset: {filename}, Start: {start_date}, End: {end_date}, Time Span: {time_span} days")
+
+        # Update the reference dataset if this dataset has the shortest time span
+        if shortest_time_span is None or time_span < shortest_time_span:
+            shortest_time_span = time_span
+            reference_filename = filename
 
     if reference_filename:
         logger.success(f"Reference dataset selected: {reference_filename} with a time span of {shortest_time_span} days")
     else:
         logger.error("No valid datasets found.")
-    
+
     return reference_filename
 
-def shorten_datasets_to_reference(reference_filename: str):
+
+def write_processed_dataset(csv_file, df, start_date, end_date, chunksize=None):
     """
-    Shortens all datasets in RAW_DATA_DIR to match the time range of the reference dataset.
-    The shortened datasets are saved to the PROCESSED_DATA_DIR.
-    
+    Shorten a dataset to the reference time range and save it to PROCESSED_DATA_DIR.
+
     Args:
-        reference_filename (str): The filename of the reference dataset.
+        csv_file (Path): The raw CSV file.
+        df (pd.DataFrame): The parsed raw dataset, read from csv_file if None.
+        start_date (pd.Timestamp): Start of the reference time range.
+        end_date (pd.Timestamp): End of the reference time range.
+        chunksize (int): Read csv_file in chunks of this many rows, filtering each on the fly.
+
+    Returns:
+        int: Number of rows written.
     """
-    logger.info(f"Using {reference_filename} as the reference dataset.")
+    if df is None and chunksize:
+        return write_processed_dataset_chunked(csv_file, start_date, end_date, chunksize)
+    if df is None:
+        df = read_raw(csv_file)
 
-    # Load the reference dataset to determine its time range
-    reference_path = RAW_DATA_DIR / reference_filename
-    try:
-        reference_df = pd.read_csv(reference_path, parse_dates=["Date"], dayfirst=True, quotechar='"')
-        reference_start_date = reference_df["Date"].min()
-        reference_end_date = reference_df["Date"].max()
-        logger.info(f"Reference dataset time range: {reference_start_date} to {reference_end_date}")
-    except Exception as e:
-        logger.error(f"Error loading reference dataset {reference_filename}: {e}")
-        return
+    # Filter the dataset to match the reference time range
+    shortened_df = df[(df["Date"] >= start_date) & (df["Date"] <= end_date)]
+
+    # Save the shortened dataset to the processed directory
+    processed_path = PROCESSED_DATA_DIR / csv_file.name
+    shortened_df.to_csv(processed_path, index=False)
+    return len(shortened_df)
+
+
+def write_processed_dataset_chunked(csv_file, start_date, end_date, chunksize):
+    """
+    Shorten a raw file to the reference time range chunk by chunk and save it to PROCESSED_DATA_DIR.
+
+    Args:
+        csv_file (Path): The raw CSV file.
+        start_date (pd.Timestamp): Start of the reference time range.
+        end_date (pd.Timestamp): End of the reference time range.
+        chunksize (int): Rows per chunk.
+
+    Returns:
+        int: Number of rows written.
+    """
+    processed_path = PROCESSED_DATA_DIR / csv_file.name
+    rows = 0
+    with open(processed_path, "w", newline="") as f:
+        for i, chunk in enumerate(read_raw(csv_file, chunksize=chunksize)):
+            # Filter every chunk to the reference time range, writing the header once
+            shortened_chunk = chunk[(chunk["Date"] >= start_date) & (chunk["Date"] <= end_date)]
+            shortened_chunk.to_csv(f, index=False, header=i == 0)
+            rows += len(shortened_chunk)
+    return rows
+
+
+def extend_processed_dataset(csv_file, mode, new_rows, start_date, end_date):
+    """
+    Add newly ingested rows to an existing processed dataset without re-reading it.
+
+    Args:
+        csv_file (Path): The raw CSV file.
+        mode (str): "prepended" or "appended", where the rows were added in the raw file.
+        new_rows (pd.DataFrame): The parsed new rows.
+        start_date (pd.Timestamp): Start of the reference time range.
+        end_date (pd.Timestamp): End of the reference time range.
+
+    Returns:
+        int: Number of rows added.
+    """
+    new_rows = new_rows[(new_rows["Date"] >= start_date) & (new_rows["Date"] <= end_date)]
+    if new_rows.empty:
+        return 0
+
+    processed_path = PROCESSED_DATA_DIR / csv_file.name
+    header, body = _split_header(processed_path.read_bytes())
+    rows = new_rows.to_csv(index=False, header=False).encode()
+
+    if mode == "prepended":
+        content = header + rows + body
+    else:
+        content = header + body + (b"" if body.endswith(b"\n") else b"\n") + rows
+
+    processed_path.write_bytes(content)
+    return len(new_rows)
+
+
+def update_processed_dataset(csv_file, mode, df, old_entry, old_window, start_date, end_date, chunksize=None):
+    """
+    Bring the processed dataset of one raw file up to date, rewriting it only if needed.
+
+    Args:
+        csv_file (Path): The raw CSV file.
+        mode (str): How the raw file changed, see scan_raw_file.
+        df (pd.DataFrame): The rows parsed by scan_raw_file.
+        old_entry (dict): The manifest entry of the previous run, if any.
+        old_window (list): The reference time range of the previous run, if any.
+        start_date (pd.Timestamp): Start of the reference time range.
+        end_date (pd.Timestamp): End of the reference time range.
+        chunksize (int): Rewrite the file in chunks of this many rows, see write_processed_dataset.
+
+    Returns:
+        tuple: (action, rows) where action is "unchanged", "extended" or "written".
+    """
+    # The processed file can be extended in place if the window kept its start,
+    # and any growth at the end does not uncover old rows cut off by the previous window
+    extendable = (
+        old_entry is not None
+        and old_window is not None
+        and (PROCESSED_DATA_DIR / csv_file.name).exists()
+        and pd.Timestamp(old_window[0]) == start_date
+        and (
+            pd.Timestamp(old_window[1]) == end_date
+            or pd.Timestamp(old_window[1]) < end_date
+            and pd.Timestamp(old_entry["end"]) <= pd.Timestamp(old_window[1])
+        )
+    )
+
+    if extendable and mode == "unchanged":
+        return "unchanged", 0
+    if extendable and mode in ("prepended", "appended"):
+        return "extended", extend_processed_dataset(csv_file, mode, df, start_date, end_date)
+    return "written", write_processed_dataset(csv_file, df if mode == "full" else None, start_date, end_date, chunksize)
+
+
+def _run_tasks(func, tasks, workers, desc):
+    """
+    Run func(*task) for every task, in a process pool if workers > 1.
+
+    Args:
+        func (callable): Module-level function to run.
+        tasks (list): Argument tuples, the first argument identifies the task.
+        workers (int): Number of worker processes.
+        desc (str): Label of the progress bar.
+
+    Yields:
+        tuple: (first argument, result or raised exception) in order of completion.
+    """
+    with tqdm(total=len(tasks), desc=desc, unit="file") as progress:
+        if workers <= 1:
+            for task in tasks:
+                try:
+                    result = func(*task)
+                except Exception as e:
+                    result = e
+                progress.update()
+                yield task[0], result
+            return
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(func, *task): task[0] for task in tasks}
+            for future in as_completed(futures):
+                progress.update()
+                yield futures[future], future.exception() or future.result()
+
+
+@timed
+def ingest(incremental=False, workers=1, chunksize=None):
+    """
+    Bring the processed datasets up to date with RAW_DATA_DIR.
+
+    Args:
+        incremental (bool): Reuse the manifest of the previous run and only parse
+            and rewrite what changed. Otherwise every file is processed.
+        workers (int): Number of worker processes used to parse and write files.
+        chunksize (int): Stream the raw files in chunks of this many rows instead
+            of loading them whole. Changed files are then always rewritten in full.
+
+    Returns:
+        bool: Whether a reference time range could be determined.
+    """
+    manifest = load_manifest() if incremental else {"format": MANIFEST_FORMAT, "window": None, "files": {}}
+    old_window = manifest["window"]
+    old_entries = manifest["files"]
+
+    # Scan all raw files in one pass, parsing only new content
+    tasks = [(csv_file, old_entries.get(csv_file.name)) for csv_file in sorted(RAW_DATA_DIR.glob("*.csv"))]
+    if chunksize:
+        scan, tasks = scan_raw_file_chunked, [task + (chunksize,) for task in tasks]
+    else:
+        scan = scan_raw_file
+    scans = {}
+    with stage("load") as record:
+        for csv_file, result in _run_tasks(scan, tasks, workers, "Reading"):
+            if isinstance(result, Exception):
+                logger.error(f"Error processing file {csv_file}: {result}")
+            else:
+                scans[csv_file.name] = result
+        changed = [(entry, df) for mode, entry, df in scans.values() if mode != "unchanged"]
+        record.rows = sum(entry["rows"] if df is None else len(df) for entry, df in changed)
+        record.bytes_read = sum(entry["size"] for entry, _ in changed)
+
+    # Reduce the per-file summaries to the reference time range
+    entries = {filename: scans[filename][1] for filename in sorted(scans)}
+    reference_filename = find_shortest_time_span(entries)
+    if not reference_filename:
+        return False
+
+    start_date = pd.Timestamp(entries[reference_filename]["start"])
+    end_date = pd.Timestamp(entries[reference_filename]["end"])
+    logger.info(f"Reference dataset time range: {start_date} to {end_date}")
 
     # Ensure the processed data directory exists
     PROCESSED_DATA_DIR.mkdir(parents=True, exist_ok=True)
 
-    # Iterate through all datasets
-    for csv_file in RAW_DATA_DIR.glob("*.csv"):
-        logger.info(f"Processing file: {csv_file}")
-        try:
-            # Load the dataset
-            df = pd.read_csv(csv_file, parse_dates=["Date"], dayfirst=True, quotechar='"')
-            
-            # Filter the dataset to match the reference time range
-            shortened_df = df[(df["Date"] >= reference_start_date) & (df["Date"] <= reference_end_date)]
-
-            # Save the shortened dataset to the processed directory
+    tasks = [
+        (RAW_DATA_DIR / filename, mode, df, old_entries.get(filename), old_window, start_date, end_date, chunksize)
+        for filename, (mode, entry, df) in scans.items()
+    ]
+    with stage("write") as record:
+        record.rows = 0
+        for csv_file, result in _run_tasks(update_processed_dataset, tasks, workers, "Writing"):
             processed_path = PROCESSED_DATA_DIR / csv_file.name
-            shortened_df.to_csv(processed_path, index=False)
-            logger.success(f"Shortened dataset saved to: {processed_path}")
-        except Exception as e:
-            logger.error(f"Error processing file {csv_file}: {e}")
+            if isinstance(result, Exception):
+                logger.error(f"Error processing file {csv_file}: {result}")
+                entries.pop(csv_file.name)
+                continue
+            record.rows += result[1]
+            if result[0] == "unchanged":
+                logger.info(f"Unchanged: {csv_file.name}")
+            elif result[0] == "written":
+                logger.success(f"Shortened dataset saved to: {processed_path}")
+            elif result[0] == "extended" and result[1]:
+                logger.success(f"Added {result[1]} rows to: {processed_path}")
+
+    # Processed files whose raw file was deleted would stay in the panel
+    for processed_path in sorted(PROCESSED_DATA_DIR.glob("*.csv")):
+        if not (RAW_DATA_DIR / processed_path.name).exists():
+            processed_path.unlink()
+            logger.info(f"Removed, its raw file is gone: {processed_path}")
+
+    manifest.update(window=[start_date.isoformat(), end_date.isoformat()], files=entries)
+    save_manifest(manifest)
+    return True
+
 
 app = typer.Typer()
 
 
 @app.command()
+@timed
 def main(
-    output_path: Path = PROCESSED_DATA_DIR / "merged_dataset.csv",  # Output path for the merged file
+    output_path: Path = INTERIM_DATA_DIR / "merged_dataset.csv",  # Output path for the merged file
+    incremental: bool = typer.Option(False, help="Only parse and rewrite what changed since the last run."),
+    workers: int = typer.Option(1, min=1, help="Number of worker processes for reading and writing files."),
+    chunksize: int = typer.Option(0, min=0, help="Stream raw files in chunks of this many rows, 0 reads them whole."),
 ):
-    logger.info("Starting dataset check...")
-    
-    # Ensure the raw data directory exists
-    if not RAW_DATA_DIR.exists():
-        logger.error(f"Raw data directory does not exist: {RAW_DATA_DIR}")
-        return
+    # Route log messages through tqdm so they do not break the progress bars,
+    # removing only this handler again so the sinks of a caller are left alone
+    handler_id = logger.add(lambda message: tqdm.write(message, end=""), colorize=True)
+    try:
+        logger.info("Starting dataset check...")
 
-    # List all CSV files in the raw data directory
-    csv_files = list(RAW_DATA_DIR.glob("*.csv"))
+        # Ensure the raw data directory exists
+        if not RAW_DATA_DIR.exists():
+            logger.error(f"Raw data directory does not exist: {RAW_DATA_DIR}")
+            return
 
-    if not csv_files:
-        logger.error("No CSV files found in the raw data directory.")
-        return
+        # List all CSV files in the raw data directory
+        csv_files = list(RAW_DATA_DIR.glob("*.csv"))
 
-    logger.info(f"Found {len(csv_files)} files to check.")
+        if not csv_files:
+            logger.error("No CSV files found in the raw data directory.")
+            return
 
-    reference_filename = find_shortest_time_span()
-    if reference_filename:
-        shorten_datasets_to_reference(reference_filename)
-    else:
-        print("No valid reference dataset found.")
+        logger.info(f"Found {len(csv_files)} files to check.")
+
+        if ingest(incremental, workers, chunksize or None):
+            with stage("panel") as record:
+                panel = write_panel_arrays(PROCESSED_DATA_DIR)
+                record.rows = len(panel)
+            logger.success(f"Binary price panel saved to: {PROCESSED_DATA_DIR / ARRAYS_DIRNAME}")
+
+            # Stored results of the previous processed data cannot be served any more
+            result_store().prune()
 
-    
+            # Save all prices side by side
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            panel.to_csv(output_path)
+            logger.success(f"Merged dataset saved to: {output_path}")
+        else:
+            print("No valid reference dataset found.")
+    finally:
+        logger.remove(handler_id)
 
 
 if __name__ == "__main__":
+    # Log through main's tqdm handler only, the default one would print every message twice
+    logger.remove()
     app()
@@ -0,0 +1,396 @@
+import sys
+from collections import deque
+from pathlib import Path
+from statistics import NormalDist
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Add the project root to sys.path when run as a script
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if __package__ in (None, ""):
+    sys.path.append(str(PROJECT_ROOT))
+
+from scripts.cross_rates import BASE_CURRENCY, base_panel
+from scripts.metrics import _returns, date_window
+from scripts.resample import ewma_decay, infer_frequency
+from scripts.instrumentation import stage, timed
+from scripts.lazy import lazy_import
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+"""
+Covariance and correlation of the CHF returns of all pairs at once.
+
+Returns are those of holding the foreign currency, valued in CHF (1 / Price),
+the same returns value_at_risk uses. Only dates on which every pair has a
+return are kept, so all entries of a matrix are estimated on the same rows.
+
+- covariance_matrix computes the full k x k matrix with one matrix product,
+- EWMACovariance and RollingCovariance update it in O(k²) per new
+  observation instead of recomputing it from the whole history,
+  covariance_series yields it date by date without keeping the history,
+- portfolio_var derives the parametric (normal) Value at Risk of a weighted
+  portfolio of the currencies from a covariance matrix.
+
+The decay of the exponential weighting defaults to the RiskMetrics factor of
+the frequency of the prices, see resample.ewma_decay. The risk service
+answers /correlation and /portfolio-var with this module.
+"""
+
+
+def aligned_returns(prices):
+    """
+    Returns of the CHF value (1 / Price) of every currency on their common dates.
+
+    Args:
+        prices (pd.DataFrame): Date-indexed price panel sorted by date.
+
+    Returns:
+        pd.DataFrame: One row per date on which every currency has a return, one column per currency.
+    """
+    values = prices.to_numpy(dtype="float64")
+    if len(values) < 2:
+        return pd.DataFrame(columns=prices.columns, dtype="float64")
+
+    returns = pd.DataFrame(_returns(1 / values), index=prices.index[1:], columns=prices.columns)
+    return returns.dropna()
+
+
+def covariance_matrix(returns, ddof=1):
+    """
+    Sample covariance matrix of the columns of a return matrix.
+
+    Args:
+        returns (np.ndarray): 2-D array of returns, one column per currency, without NaN.
+        ddof (int): Delta degrees of freedom.
+
+    Returns:
+        np.ndarray: The k x k covariance matrix.
+    """
+    returns = np.asarray(returns, dtype="float64")
+    centered = returns - returns.mean(axis=0)
+    return centered.T @ centered / (len(returns) - ddof)
+
+
+def window_decay(prices):
+    """
+    Decay factor for the frequency of a price panel, the monthly one if there are too few dates to tell.
+    """
+    return ewma_decay(infer_frequency(prices.index) if len(prices) > 1 else "MS")
+
+
+def ewma_covariance(returns, decay):
+    """
+    Exponentially weighted covariance matrix of zero-mean returns (RiskMetrics).
+
+    Equal to feeding every row to EWMACovariance, but computed with one matrix product.
+
+    Args:
+        returns (np.ndarray): 2-D array of chronologically sorted returns, without NaN.
+        decay (float): Weight of the previous estimate, between 0 and 1.
+
+    Returns:
+        np.ndarray: The k x k covariance matrix.
+    """
+    returns = np.asarray(returns, dtype="float64")
+    n = len(returns)
+
+    # The first row seeds the recursion, later rows get (1 - decay) * decay ** age
+    weights = (1 - decay) * decay ** np.arange(n - 1, -1, -1, dtype="float64")
+    weights[0] = decay ** (n - 1)
+    return (returns * weights[:, None]).T @ returns
+
+
+def correlation_from_covariance(covariance):
+    """
+    Scale a covariance matrix to a correlation matrix.
+
+    Args:
+        covariance (np.ndarray): A k x k covariance matrix.
+
+    Returns:
+        np.ndarray: The k x k correlation matrix, NaN where a variance is zero.
+    """
+    std_dev = np.sqrt(np.diag(covariance))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        correlation = covariance / np.outer(std_dev, std_dev)
+    np.fill_diagonal(correlation, np.where(std_dev > 0, 1.0, np.nan))
+    return correlation
+
+
+class EWMACovariance:
+    """
+    Exponentially weighted covariance matrix, updated in O(k²) per observation.
+    """
+
+    def __init__(self, size, decay):
+        self.decay = decay
+        self.count = 0
+        self.covariance = np.zeros((size, size))
+
+    def update(self, returns):
+        """
+        Add the returns of one date.
+
+        Args:
+            returns (np.ndarray): One return per currency.
+        """
+        returns = np.asarray(returns, dtype="float64")
+        if self.count == 0:
+            self.covariance = np.outer(returns, returns)
+        else:
+            # Rank-one update in place: C = decay * C + (1 - decay) * r r'
+            self.covariance *= self.decay
+            self.covariance += (1 - self.decay) * np.outer(returns, returns)
+        self.count += 1
+
+    def correlation(self):
+        return correlation_from_covariance(self.covariance)
+
+
+class RollingCovariance:
+    """
+    Sample covariance matrix of the last `window` observations, updated in O(k²) per observation.
+
+    Keeps the window's mean and co-moment matrix and adjusts them for the
+    added and the dropped row (Welford's update and its inverse), so no
+    window is ever summed again.
+    """
+
+    def __init__(self, size, window):
+        if window < 2:
+            raise ValueError("The window must contain at least two observations.")
+        self.window = window
+        self.rows = deque()
+        self.mean = np.zeros(size)
+        self.comoment = np.zeros((size, size))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _add(self, returns):
+        self.rows.append(returns)
+        delta = returns - self.mean
+        self.mean += delta / len(self.rows)
+        self.comoment += np.outer(delta, returns - self.mean)
+
+    def _remove(self):
+        returns = self.rows.popleft()
+        if not self.rows:
+            self.mean[:] = 0.0
+            self.comoment[:] = 0.0
+            return
+        delta = returns - self.mean
+        self.mean -= delta / len(self.rows)
+        self.comoment -= np.outer(delta, returns - self.mean)
+
+    def update(self, returns):
+        """
+        Add the returns of one date, dropping the oldest date once the window is full.
+
+        Args:
+            returns (np.ndarray): One return per currency.
+        """
+        self._add(np.array(returns, dtype="float64"))
+        if len(self.rows) > self.window:
+            self._remove()
+
+    @property
+    def covariance(self):
+        if len(self.rows) < 2:
+            return np.full(self.comoment.shape, np.nan)
+        return self.comoment / (len(self.rows) - 1)
+
+    def correlation(self):
+        return correlation_from_covariance(self.covariance)
+
+
+def covariance_series(returns, window=None, decay=None):
+    """
+    Covariance matrix after every date, rolling over `window` dates or exponentially weighted.
+
+    Only the current matrix is held, so the memory does not grow with the
+    number of dates.
+
+    Args:
+        returns (pd.DataFrame): Chronologically sorted returns, e.g. from aligned_returns.
+        window (int): Number of dates per window, None for exponential weighting.
+        decay (float): Decay factor of the exponential weighting, defaults to that of the returns' frequency.
+
+    Yields:
+        tuple: (date, k x k covariance matrix) for every date, from the first full rolling window on.
+    """
+    values = returns.to_numpy(dtype="float64")
+    size = values.shape[1]
+    if window is None:
+        estimator = EWMACovariance(size, window_decay(returns) if decay is None else decay)
+    else:
+        estimator = RollingCovariance(size, window)
+
+    for date, row in zip(returns.index, values):
+        estimator.update(row)
+        if window is None or len(estimator) == window:
+            # A copy, the estimator keeps updating its matrix in place
+            yield date, np.array(estimator.covariance)
+
+
+def portfolio_var(weights, covariance, confidence_level=0.95, mean=None):
+    """
+    Parametric Value at Risk of a portfolio with normally distributed returns.
+
+    Args:
+        weights (np.ndarray): Portfolio weight of every currency.
+        covariance (np.ndarray): The k x k covariance matrix of the returns.
+        confidence_level (float): The confidence level for VaR calculation.
+        mean (np.ndarray): Expected return of every currency, zero if None.
+
+    Returns:
+        tuple: (VaR in percent, contribution of every currency in percent). The
+            contributions add up to the VaR.
+    """
+    weights = np.asarray(weights, dtype="float64")
+    z = NormalDist().inv_cdf(1 - confidence_level)
+
+    marginal = covariance @ weights
+    std_dev = np.sqrt(max(float(weights @ marginal), 0.0))
+    expected = 0.0 if mean is None else float(weights @ mean)
+
+    # Euler allocation: every currency's share of the portfolio standard deviation,
+    # nothing to share without variance, e.g. for zero weights or constant prices
+    if std_dev > 0:
+        contributions = z * weights * marginal / std_dev
+    else:
+        contributions = np.zeros_like(weights)
+    if mean is not None:
+        contributions += weights * mean
+    return (expected + z * std_dev) * 100, contributions * 100
+
+
+@timed
+def calculate_correlation(START, END, method="sample", decay=None, panel=None, base=BASE_CURRENCY):
+    """
+    Calculate the correlation matrix of the returns of all currencies, valued in the base currency.
+
+    Args:
+        START (int or date-like): Start year or date.
+        END (int or date-like): End year or date.
+        method (str): "sample" or "ewma".
+        decay (float): Decay factor for the "ewma" method, defaults to that of the data's frequency.
+        panel (pd.DataFrame): Price panel, defaults to the shared processed panel.
+        base (str): Home currency of the resident, the pairs are triangulated to it (default is CHF).
+
+    Returns:
+        pd.DataFrame: The correlation matrix, labelled by currency.
+    """
+    with stage("load"):
+        panel = base_panel(base, panel)
+
+    with stage("filter") as record:
+        window = date_window(panel, START, END)
+        returns = aligned_returns(window)
+        record.rows = len(returns)
+
+    with stage("compute", rows=len(returns)):
+        if method == "sample":
+            covariance = covariance_matrix(returns.to_numpy())
+        elif method == "ewma":
+            covariance = ewma_covariance(returns.to_numpy(), window_decay(window) if decay is None else decay)
+        else:
+            raise ValueError(f"Unknown method: {method}")
+        correlation = correlation_from_covariance(covariance)
+
+    return pd.DataFrame(correlation, index=returns.columns, columns=returns.columns)
+
+
+def portfolio_risk(panel, START, END, weights=None, confidence_level=0.95, method="sample", decay=None):
+    """
+    Parametric VaR of a portfolio of the pairs of a price panel over a date range.
+
+    Args:
+        panel (pd.DataFrame): Price panel, e.g. from cross_rates.base_panel.
+        START (int or date-like): Start year or date.
+        END (int or date-like): End year or date.
+        weights (dict): Currencies and their portfolio weights, equal weights if None.
+        confidence_level (float): The confidence level for VaR calculation (default is 0.95).
+        method (str): "sample" or "ewma" covariance.
+        decay (float): Decay factor for the "ewma" method, defaults to that of the data's frequency.
+
+    Returns:
+        dict: The portfolio VaR under "Portfolio" and the contribution of every currency,
+            None if there are fewer than two common dates.
+    """
+    with stage("filter") as record:
+        window = date_window(panel, START, END)
+        returns = aligned_returns(window)
+        record.rows = len(returns)
+    if len(returns) < 2:
+        return None
+
+    if weights is None:
+        weights = {currency: 1 / len(returns.columns) for currency in returns.columns}
+    unknown = set(weights) - set(returns.columns)
+    if unknown:
+        raise ValueError(f"Unknown currencies: {', '.join(sorted(unknown))}")
+    weight_vector = np.array([weights.get(currency, 0.0) for currency in returns.columns])
+
+    with stage("compute", rows=len(returns)):
+        values = returns.to_numpy()
+        if method == "sample":
+            covariance = covariance_matrix(values)
+            mean = values.mean(axis=0)
+        elif method == "ewma":
+            covariance = ewma_covariance(values, window_decay(window) if decay is None else decay)
+            mean = None
+        else:
+            raise ValueError(f"Unknown method: {method}")
+        var, contributions = portfolio_var(weight_vector, covariance, confidence_level, mean)
+
+    results = {"Portfolio": var}
+    results.update(zip(returns.columns, contributions.tolist()))
+    return results
+
+
+@timed
+def calculate_portfolio_var(START, END, weights=None, confidence_level=0.95, method="sample", decay=None,
+                            base=BASE_CURRENCY):
+    """
+    Calculate the parametric VaR of a portfolio of the currencies, valued in the base currency.
+
+    Args:
+        START (int or date-like): Start year or date.
+        END (int or date-like): End year or date.
+        weights (dict): Currencies and their portfolio weights, equal weights if None.
+        confidence_level (float): The confidence level for VaR calculation (default is 0.95).
+        method (str): "sample" or "ewma" covariance.
+        decay (float): Decay factor for the "ewma" method, defaults to that of the data's frequency.
+        base (str): Home currency of the resident, the pairs are triangulated to it (default is CHF).
+
+    Returns:
+        dict: The portfolio VaR under "Portfolio" and the contribution of every currency.
+    """
+    # Load the shared price panel
+    with stage("load") as record:
+        panel = base_panel(base)
+        record.rows = len(panel)
+    if panel.empty:
+        logger.error("No processed datasets found.")
+        return
+
+    results = portfolio_risk(panel, START, END, weights, confidence_level, method, decay)
+    if results is None:
+        logger.error("Not enough common dates to estimate the covariance matrix.")
+        return
+
+    # Display results
+    print("\nPortfolio Value at Risk (VaR) Results:")
+    for name, value in results.items():
+        print(f"{name}: {value:.2f}%")
+    return results
+
+
+if __name__ == "__main__":
+    # Set up logging
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+    calculate_portfolio_var(2000, 2024)
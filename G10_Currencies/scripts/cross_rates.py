@@ -0,0 +1,235 @@
+import sys
+import threading
+from pathlib import Path
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Add the project root to sys.path when run as a script
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if __package__ in (None, ""):
+    sys.path.append(str(PROJECT_ROOT))
+
+from scripts.panel import load_panel
+from scripts.metrics import compute_metrics, date_positions
+from scripts.result_store import RISKIER_IS_HIGHER
+from scripts.instrumentation import stage, timed
+from scripts.lazy import lazy_import
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+"""
+Cross rates between all currencies, triangulated through the CHF pairs.
+
+Every processed file quotes a currency against CHF: the price of CHF_XXX is
+the number of XXX per CHF. With r[t, k] the units of currency k per CHF
+(1 for CHF itself), the units of j per unit of i are r[t, j] / r[t, i], so the
+full cross-rate matrix of every date is one broadcast division:
+
+    cross[t, i, j] = r[t, None, :] / r[t, :, None]
+
+The panel of a base currency B holds the pairs B_XXX quoted like the CHF
+files, as XXX per B, so every metric computed on the CHF panel can be
+computed for a resident of any base currency. Base panels are built from the
+T x N rates on first use and cached; the full T x N x N matrix is only built
+for the rows asked for, as it grows with the square of the currencies.
+"""
+
+BASE_CURRENCY = "CHF"
+
+# Suffix of the pair names, as in the Investing.com file names
+PAIR_SUFFIX = " Historical Data"
+
+
+def pair_column(base, quote):
+    """
+    Column name of a pair, e.g. pair_column("EUR", "USD") is "EUR_USD Historical Data".
+    """
+    return f"{base}_{quote}{PAIR_SUFFIX}"
+
+
+def split_pair(column):
+    """
+    Base and quote currency of a pair column, e.g. ("CHF", "USD").
+    """
+    base, quote = column.removesuffix(PAIR_SUFFIX).split("_")
+    return base, quote
+
+
+class CrossRates:
+    """
+    Cross rates of a CHF price panel, see the module docstring.
+    """
+
+    def __init__(self, panel):
+        pairs = [split_pair(column) for column in panel.columns]
+        if any(base != BASE_CURRENCY for base, _ in pairs):
+            raise ValueError(f"Cross rates need a panel of {BASE_CURRENCY} pairs.")
+
+        self.currencies = [BASE_CURRENCY] + [quote for _, quote in pairs]
+        self.dates = panel.index
+        values = panel.to_numpy(dtype="float64")
+
+        # Units of every currency per CHF, one column per currency
+        self.rates = np.column_stack([np.ones(len(values)), values])
+        self._panels = {BASE_CURRENCY: panel}
+
+    def _position(self, currency):
+        try:
+            return self.currencies.index(currency)
+        except ValueError:
+            raise ValueError(f"Unknown currency: {currency}") from None
+
+    def _rows(self, START=None, END=None):
+        if START is None and END is None:
+            return self.rates, self.dates
+        first, last = date_positions(self.dates.to_numpy(), START or 1900, END or 2200)
+        return self.rates[first:last + 1], self.dates[first:last + 1]
+
+    def matrix(self, START=None, END=None):
+        """
+        Cross-rate matrix of every date within a range.
+
+        Args:
+            START (int or date-like): Start year or date, from the first date if None.
+            END (int or date-like): End year or date, until the last date if None.
+
+        Returns:
+            np.ndarray: Array of shape (dates, currencies, currencies), [t, i, j] is the units of j per unit of i.
+        """
+        rates, _ = self._rows(START, END)
+        return rates[:, None, :] / rates[:, :, None]
+
+    def panel(self, base):
+        """
+        Price panel of the pairs of a base currency, e.g. EUR_USD, cached for the panel.
+
+        Args:
+            base (str): Base currency, e.g. "EUR".
+
+        Returns:
+            pd.DataFrame: Date-indexed panel, one column per other currency, as units of it per base.
+        """
+        if base not in self._panels:
+            i = self._position(base)
+            quotes = [j for j in range(len(self.currencies)) if j != i]
+            self._panels[base] = pd.DataFrame(
+                self.rates[:, quotes] / self.rates[:, [i]],
+                index=self.dates,
+                columns=[pair_column(base, self.currencies[j]) for j in quotes],
+            )
+        return self._panels[base]
+
+    def cross_panel(self, START=None, END=None):
+        """
+        Panel of every pair of every base currency within a range, N * (N - 1) columns.
+
+        Args:
+            START (int or date-like): Start year or date, from the first date if None.
+            END (int or date-like): End year or date, until the last date if None.
+
+        Returns:
+            pd.DataFrame: Date-indexed panel with the pairs of each base currency in turn.
+        """
+        rates, dates = self._rows(START, END)
+        n = len(self.currencies)
+        off_diagonal = ~np.eye(n, dtype=bool)
+        values = (rates[:, None, :] / rates[:, :, None])[:, off_diagonal]
+        columns = [pair_column(base, quote) for base in self.currencies for quote in self.currencies if base != quote]
+        return pd.DataFrame(values, index=dates, columns=columns)
+
+
+# Cross rates of the most recently used panel: (panel, cross rates)
+_CROSS_CACHE = [None, None]
+_CROSS_LOCK = threading.Lock()
+
+
+def cross_rates(panel=None):
+    """
+    Return the cross rates of a panel, building them on first use.
+
+    Args:
+        panel (pd.DataFrame): CHF price panel, defaults to the shared processed panel.
+
+    Returns:
+        CrossRates: The cross rates of the panel.
+    """
+    if panel is None:
+        panel = load_panel()
+    # Read and replace the pair under the lock, so a thread never gets the cross rates of another panel
+    with _CROSS_LOCK:
+        cached_panel, crosses = _CROSS_CACHE
+        if cached_panel is not panel:
+            crosses = CrossRates(panel)
+            _CROSS_CACHE[:] = [panel, crosses]
+    return crosses
+
+
+def base_panel(base=BASE_CURRENCY, panel=None):
+    """
+    Price panel of the pairs of a base currency.
+
+    Args:
+        base (str): Base currency, e.g. "CHF" or "EUR".
+        panel (pd.DataFrame): CHF price panel, defaults to the shared processed panel.
+
+    Returns:
+        pd.DataFrame: The CHF panel itself for CHF, otherwise the triangulated pairs of the base.
+    """
+    if panel is None:
+        panel = load_panel()
+    if base == BASE_CURRENCY:
+        return panel
+    return cross_rates(panel).panel(base)
+
+
+@timed
+def calculate_risk_by_base(START, END, metric="var", confidence_level=0.95):
+    """
+    Calculate a metric of every currency for a resident of every base currency.
+
+    All pairs are computed at once on the panel of every cross rate.
+
+    Args:
+        START (int or date-like): Start year or date.
+        END (int or date-like): End year or date.
+        metric (str): One of METRICS.
+        confidence_level (float): The confidence level for VaR calculation (default is 0.95).
+
+    Returns:
+        pd.DataFrame: One row per base currency, one column per held currency, NaN on the diagonal.
+    """
+    # Load the shared price panel
+    with stage("load") as record:
+        panel = load_panel()
+        record.rows = len(panel)
+    if panel.empty:
+        logger.error("No processed datasets found.")
+        return
+
+    with stage("filter") as record:
+        crosses = cross_rates(panel).cross_panel(START, END)
+        record.rows = len(crosses)
+
+    with stage("compute", rows=len(crosses)):
+        values = compute_metrics(crosses, confidence_level, [metric])[metric].to_numpy()
+
+    # Pairs come base by base, fill the off-diagonal of the base x currency table
+    currencies = cross_rates(panel).currencies
+    table = np.full((len(currencies), len(currencies)), np.nan)
+    table[~np.eye(len(currencies), dtype=bool)] = values
+    results = pd.DataFrame(table, index=pd.Index(currencies, name="Base"), columns=currencies)
+
+    # Display the riskiest currency for every base
+    print(f"\nRiskiest currency to hold by base currency ({metric}):")
+    riskiest = results.idxmax(axis=1) if RISKIER_IS_HIGHER[metric] else results.idxmin(axis=1)
+    for base, currency in riskiest.items():
+        print(f"{base}: {currency} ({results.loc[base, currency]:.2f})")
+    return results
+
+
+if __name__ == "__main__":
+    # Set up logging
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+    calculate_risk_by_base(2000, 2024)
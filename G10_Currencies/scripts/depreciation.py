@@ -1,22 +1,31 @@
 import sys
-import pandas as pd
 from pathlib import Path
 import logging
-from datetime import datetime
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-# Add the project root to sys.path
+# Add the project root to sys.path when run as a script
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
-sys.path.append(str(PROJECT_ROOT))
+if __package__ in (None, ""):
+    sys.path.append(str(PROJECT_ROOT))
 
 from config import PROCESSED_DATA_DIR
+from scripts.cross_rates import BASE_CURRENCY, base_panel
+from scripts.result_cache import cached_metric
+from scripts.instrumentation import stage, timed
+from scripts.lazy import lazy_import
 
-def calculate_depreciation(START, END):
+pd = lazy_import("pandas")
+
+@timed
+def calculate_depreciation(START, END, base=BASE_CURRENCY):
     """
-    Analyze which currency depreciated the most vs. CHF over the time period.
+    Analyze which currency depreciated the most vs. the base currency over the time period.
+
+    Args:
+        START (int or date-like): Start year, or an exact start date.
+        END (int or date-like): End year, or an exact end date.
+        base (str): Home currency of the resident, the pairs are triangulated to it (default is CHF).
     """
 
     # Ensure the processed data directory exists
@@ -24,42 +33,17 @@ def calculate_depreciation(START, END):
         logger.error(f"Processed data directory does not exist: {PROCESSED_DATA_DIR}")
         return
 
-    # List all processed CSV files
-    csv_files = list(PROCESSED_DATA_DIR.glob("*.csv"))
-    if not csv_files:
+    # Load the shared price panel
+    with stage("load") as record:
+        panel = base_panel(base)
+        record.rows = len(panel)
+    if panel.empty:
         logger.error("No processed datasets found.")
         return
 
-    # Initialize a dictionary to store depreciation values
-    depreciation_results = {}
-
-    # Process each dataset
-    for csv_file in csv_files:
-        try:
-            # Load the dataset
-            df = pd.read_csv(csv_file, parse_dates=["Date"])
-
-            # Convert START and END to datetime objects
-            START_YEAR = datetime(START, 1, 1)
-            END_YEAR = datetime(END, 12, 31)
-
-            # Filter the dataset to the specified date range
-            df = df[(df["Date"] >= START_YEAR) & (df["Date"] <= END_YEAR)]
-
-            if df.empty:
-                logger.warning(f"No data available in the specified range for {csv_file.stem}. Skipping.")
-                continue
-
-            # Extract start and end exchange rates
-            start_rate = df.iloc[-1]["Price"]
-            end_rate = df.iloc[0]["Price"]
-
-            # Calculate percentage depreciation
-            depreciation = ((start_rate - end_rate) / start_rate) * 100
-            depreciation_results[csv_file.stem] = depreciation
-
-        except Exception as e:
-            logger.error(f"Error processing file {csv_file}: {e}")
+    # Calculate percentage depreciation for all currencies at once, reusing earlier results
+    with stage("compute", rows=len(panel)):
+        depreciation_results = cached_metric("depreciation", START, END, base=base)
 
     # Identify the currency with the highest depreciation
     if depreciation_results:
@@ -78,4 +62,6 @@ def calculate_depreciation(START, END):
 
 
 if __name__ == "__main__":
+    # Set up logging
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
     calculate_depreciation(2000, 2020)
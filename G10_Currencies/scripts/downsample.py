@@ -0,0 +1,114 @@
+from scripts.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+"""
+Downsampling of long series for plotting.
+
+A chart is only as wide as its pixels, so drawing millions of points per line
+is wasted work. Both downsamplers return the positions of the points to keep,
+always including the first and the last one:
+
+- "minmax" splits the x range into equally wide buckets, one per pixel, and
+  keeps the first, lowest, highest and last point of every bucket (M4). The
+  line drawn through them covers exactly the pixels of the full series, so it
+  is visually lossless, and it is fully vectorized.
+- "lttb" (Largest-Triangle-Three-Buckets) keeps one point per bucket of equal
+  count, the one forming the largest triangle with the previous kept point
+  and the average of the next bucket. It keeps the shape with fewer points,
+  but is not pixel exact.
+"""
+
+
+def minmax_indices(x, y, buckets):
+    """
+    Positions of the first, lowest, highest and last point in every bucket of x.
+
+    Args:
+        x (np.ndarray): Sorted x values, e.g. dates as numbers.
+        y (np.ndarray): y values without NaN.
+        buckets (int): Number of equally wide buckets, typically the width in pixels.
+
+    Returns:
+        np.ndarray: Sorted positions of the kept points.
+    """
+    n = len(x)
+    if n <= 4 * buckets:
+        return np.arange(n)
+
+    # Start of every non-empty bucket
+    edges = np.linspace(x[0], x[-1], buckets + 1)[1:-1]
+    starts = np.unique(np.concatenate([[0], np.searchsorted(x, edges)]))
+    starts = starts[starts < n]
+    ends = np.append(starts[1:], n)
+    counts = ends - starts
+
+    # The first position in every bucket where the bucket's extreme is reached
+    kept = [starts, ends - 1]
+    for reduce in (np.minimum, np.maximum):
+        hits = np.flatnonzero(y == np.repeat(reduce.reduceat(y, starts), counts))
+        bucket = np.searchsorted(starts, hits, side="right")
+        kept.append(hits[np.flatnonzero(np.diff(bucket, prepend=0))])
+    return np.unique(np.concatenate(kept))
+
+
+def lttb_indices(x, y, points):
+    """
+    Positions of the points kept by Largest-Triangle-Three-Buckets.
+
+    Args:
+        x (np.ndarray): Sorted x values.
+        y (np.ndarray): y values without NaN.
+        points (int): Number of points to keep, at least 3.
+
+    Returns:
+        np.ndarray: Sorted positions of the kept points.
+    """
+    n = len(x)
+    if points >= n or points < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+
+    # points - 2 buckets between the first and the last point, the last point is a bucket of its own
+    edges = np.append(np.linspace(1, n - 1, points - 1).astype("int64"), n)
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x, edges[:-1]) / counts
+    mean_y = np.add.reduceat(y, edges[:-1]) / counts
+
+    kept = np.empty(points, dtype="int64")
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for i in range(points - 2):
+        first, last = edges[i], edges[i + 1]
+        # Twice the area of the triangles (previous, candidate, average of the next bucket)
+        area = np.abs(
+            (x[previous] - mean_x[i + 1]) * (y[first:last] - y[previous])
+            - (x[previous] - x[first:last]) * (mean_y[i + 1] - y[previous])
+        )
+        previous = first + int(np.argmax(area))
+        kept[i + 1] = previous
+    return kept
+
+
+def downsample(x, y, width, method="minmax"):
+    """
+    Downsample a series to the points needed to draw it at a width.
+
+    Args:
+        x (np.ndarray): Sorted x values.
+        y (np.ndarray): y values without NaN.
+        width (int): Width of the plot in pixels.
+        method (str): "minmax" or "lttb".
+
+    Returns:
+        tuple: (x, y) of the kept points.
+    """
+    width = max(int(width), 1)
+    if method == "minmax":
+        kept = minmax_indices(x, y, width)
+    elif method == "lttb":
+        kept = lttb_indices(x, y, 2 * width)
+    else:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    return x[kept], y[kept]
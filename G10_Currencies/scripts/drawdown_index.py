@@ -0,0 +1,151 @@
+import threading
+from collections import OrderedDict
+
+from scripts.metrics import date_positions
+from scripts.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+"""
+Segment tree for maximum drawdown range queries.
+
+Every node of the tree summarizes a stretch of the reciprocal (1 / Price)
+series of every currency as (max, min, drawdown), where drawdown is the worst
+ratio minus one between a value and an earlier peak within the stretch. Two
+consecutive stretches combine in constant time, so the maximum drawdown of
+any range is assembled from O(log n) nodes after an O(n) build.
+
+Missing prices are leaves with the neutral summary (0, inf, 0): reciprocal
+prices are positive, so neither bound can win and no drawdown is created.
+"""
+
+
+def _combine(earlier, later):
+    """
+    Combine the summaries of two consecutive stretches, element-wise.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        crossing = later[1] / earlier[0] - 1
+    crossing = np.where(np.isfinite(crossing), crossing, 0.0)
+    return (
+        np.maximum(earlier[0], later[0]),
+        np.minimum(earlier[1], later[1]),
+        np.minimum(np.minimum(earlier[2], later[2]), crossing),
+    )
+
+
+class DrawdownIndex:
+    """
+    Segment tree over the reciprocal prices of a panel, answering range queries for all currencies at once.
+
+    Args:
+        panel (pd.DataFrame): Date-indexed price panel sorted by date.
+    """
+
+    __slots__ = ("dates", "columns", "size", "maxima", "minima", "drawdowns")
+
+    def __init__(self, panel):
+        self.dates = panel.index.to_numpy(dtype="datetime64[ns]")
+        self.columns = panel.columns
+        reciprocal = 1 / panel.to_numpy(dtype="float64")
+        n, k = reciprocal.shape
+
+        # Leaves start at position `size`, the root is at position 1
+        self.size = 1
+        while self.size < max(n, 1):
+            self.size *= 2
+
+        missing = np.isnan(reciprocal)
+        self.maxima = np.zeros((2 * self.size, k))
+        self.minima = np.full((2 * self.size, k), np.inf)
+        self.drawdowns = np.zeros((2 * self.size, k))
+        self.maxima[self.size:self.size + n] = np.where(missing, 0.0, reciprocal)
+        self.minima[self.size:self.size + n] = np.where(missing, np.inf, reciprocal)
+
+        # Build the tree one level at a time, from the leaves up
+        level = self.size // 2
+        while level:
+            nodes = slice(level, 2 * level)
+            left = slice(2 * level, 4 * level, 2)
+            right = slice(2 * level + 1, 4 * level, 2)
+            summary = _combine(
+                (self.maxima[left], self.minima[left], self.drawdowns[left]),
+                (self.maxima[right], self.minima[right], self.drawdowns[right]),
+            )
+            self.maxima[nodes], self.minima[nodes], self.drawdowns[nodes] = summary
+            level //= 2
+
+    def _node(self, position):
+        return self.maxima[position], self.minima[position], self.drawdowns[position]
+
+    def query_positions(self, first, last):
+        """
+        Maximum drawdown of every currency between two row positions.
+
+        Args:
+            first (int): First row, inclusive.
+            last (int): Last row, inclusive.
+
+        Returns:
+            np.ndarray: Maximum drawdown in percent, NaN for currencies without data.
+        """
+        k = len(self.columns)
+        neutral = (np.zeros(k), np.full(k, np.inf), np.zeros(k))
+        left, right = neutral, neutral
+
+        # Walk up from both ends, collecting the nodes covering the range in order
+        lower, upper = first + self.size, last + self.size + 1
+        while lower < upper:
+            if lower & 1:
+                left = _combine(left, self._node(lower))
+                lower += 1
+            if upper & 1:
+                upper -= 1
+                right = _combine(self._node(upper), right)
+            lower //= 2
+            upper //= 2
+
+        maxima, minima, drawdowns = _combine(left, right)
+        return np.where(np.isinf(minima), np.nan, drawdowns * 100)
+
+    def maximum_drawdown(self, START, END):
+        """
+        Maximum drawdown of the reciprocal (1 / Price) of every currency over a date range.
+
+        Args:
+            START (int or date-like): Start year or date.
+            END (int or date-like): End year or date.
+
+        Returns:
+            np.ndarray: Maximum drawdown in percent, NaN for currencies without data.
+        """
+        first, last = date_positions(self.dates, START, END)
+        if first > last:
+            return np.full(len(self.columns), np.nan)
+        return self.query_positions(first, last)
+
+
+# Indexes of the most recently used panels, e.g. the panels of several base currencies: id(panel): (panel, index)
+_INDEX_CACHE = OrderedDict()
+_INDEX_LOCK = threading.Lock()
+INDEX_CACHE_SIZE = 16
+
+
+def drawdown_index(panel):
+    """
+    Return the drawdown index of a panel, building it on first use.
+
+    Args:
+        panel (pd.DataFrame): Date-indexed price panel sorted by date.
+
+    Returns:
+        DrawdownIndex: The index of the panel.
+    """
+    with _INDEX_LOCK:
+        cached = _INDEX_CACHE.get(id(panel))
+        if cached is None or cached[0] is not panel:
+            cached = _INDEX_CACHE[id(panel)] = (panel, DrawdownIndex(panel))
+            while len(_INDEX_CACHE) > INDEX_CACHE_SIZE:
+                _INDEX_CACHE.popitem(last=False)
+        _INDEX_CACHE.move_to_end(id(panel))
+        return cached[1]
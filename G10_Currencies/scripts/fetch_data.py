@@ -0,0 +1,219 @@
+import os
+import sys
+import json
+import random
+import asyncio
+from pathlib import Path
+from typing import List
+import typer
+from loguru import logger
+
+# Add the project root to sys.path when run as a script
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if __package__ in (None, ""):
+    sys.path.append(str(PROJECT_ROOT))
+
+from config import INTERIM_DATA_DIR, RAW_DATA_DIR
+from scripts.lazy import lazy_import
+
+aiohttp = lazy_import("aiohttp")
+
+"""
+Refresh the raw exchange rate files over HTTP.
+
+All pairs are requested concurrently through one pooled aiohttp session, with
+at most `concurrency` requests in flight. Failed requests (connection errors,
+timeouts, 429 and 5xx responses) are retried with exponential backoff and
+jitter. The ETag and Last-Modified of every download are remembered in
+FETCH_STATE_PATH and sent back as If-None-Match / If-Modified-Since, so pairs
+that did not change cost a 304 response and are not rewritten.
+
+Files are written to RAW_DATA_DIR as "<PAIR> Historical Data.csv" in the raw
+Investing.com format, ready for `clean_data.py --incremental`. The provider is
+expected to serve GET <base_url>/pairs/<PAIR>.csv (or .json), see
+mock_fx_server.py for a local stand-in.
+"""
+
+FETCH_STATE_PATH = INTERIM_DATA_DIR / "fetch_state.json"
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def raw_path(pair, raw_dir=RAW_DATA_DIR):
+    return Path(raw_dir) / f"{pair} Historical Data.csv"
+
+
+def local_pairs(raw_dir=RAW_DATA_DIR):
+    """
+    Return the pairs that already have a raw file, e.g. "CHF_USD".
+    """
+    return sorted(csv_file.name.removesuffix(" Historical Data.csv") for csv_file in Path(raw_dir).glob("*.csv"))
+
+
+def json_to_raw_csv(rows):
+    """
+    Write JSON rows in the raw Investing.com CSV format.
+
+    Args:
+        rows (list): One dictionary per row, the raw header as keys.
+
+    Returns:
+        bytes: The file content, with byte order mark, quoted fields and no trailing newline.
+    """
+    if not rows:
+        raise ValueError("No rows received.")
+    header = list(rows[0])
+    lines = [",".join(f'"{field}"' for field in header)]
+    lines += [",".join(f'"{row[field]}"' for field in header) for row in rows]
+    return "\n".join(lines).encode("utf-8-sig")
+
+
+def _write_atomic(path, content):
+    # Write next to the target and swap, so readers never see a partial file
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(content)
+    os.replace(tmp_path, path)
+
+
+def load_fetch_state(path=FETCH_STATE_PATH):
+    try:
+        return json.loads(Path(path).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def save_fetch_state(state, path=FETCH_STATE_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(state, indent=2, sort_keys=True))
+
+
+async def fetch_pair(session, semaphore, base_url, pair, state, raw_dir, data_format="csv", retries=4, backoff=0.5):
+    """
+    Download one pair unless it did not change, and save it as a raw file.
+
+    Args:
+        session (aiohttp.ClientSession): Pooled HTTP session.
+        semaphore (asyncio.Semaphore): Limits the number of requests in flight.
+        base_url (str): URL of the provider.
+        pair (str): The pair, e.g. "CHF_USD".
+        state (dict): ETag and Last-Modified of the previous download, updated in place.
+        raw_dir (Path): Directory to save the raw file to.
+        data_format (str): "csv" or "json".
+        retries (int): Retries after a failed request.
+        backoff (float): Seconds to wait before the first retry, doubled for every further one.
+
+    Returns:
+        str: "updated" or "not modified".
+    """
+    url = f"{base_url.rstrip('/')}/pairs/{pair}.{data_format}"
+    path = raw_path(pair, raw_dir)
+
+    # Ask for the content only if it changed, as long as we still have it
+    headers = {}
+    previous = state.get(pair, {})
+    if path.exists() and previous.get("format") == data_format:
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+
+    for attempt in range(retries + 1):
+        try:
+            async with semaphore, session.get(url, headers=headers) as response:
+                if response.status == 304:
+                    return "not modified"
+                if response.status in RETRY_STATUSES:
+                    raise aiohttp.ClientResponseError(
+                        response.request_info, response.history, status=response.status, message=response.reason
+                    )
+                response.raise_for_status()
+
+                if data_format == "json":
+                    content = json_to_raw_csv((await response.json())["rows"])
+                else:
+                    content = await response.read()
+                etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+            break
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            retryable = not isinstance(e, aiohttp.ClientResponseError) or e.status in RETRY_STATUSES
+            if not retryable or attempt == retries:
+                raise
+            delay = backoff * 2 ** attempt * (0.5 + random.random())
+            logger.debug(f"{pair}: {e}, retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    _write_atomic(path, content)
+    state[pair] = {"format": data_format, "etag": etag, "last_modified": last_modified}
+    return "updated"
+
+
+async def fetch_pairs(pairs, base_url, raw_dir=RAW_DATA_DIR, data_format="csv", concurrency=16,
+                      retries=4, backoff=0.5, timeout=60, state_path=FETCH_STATE_PATH):
+    """
+    Download many pairs concurrently.
+
+    Args:
+        pairs (list): Pairs to download, e.g. ["CHF_USD", "CHF_EUR"].
+        base_url (str): URL of the provider.
+        raw_dir (Path): Directory to save the raw files to.
+        data_format (str): "csv" or "json".
+        concurrency (int): Maximum number of requests and connections at once.
+        retries (int): Retries after a failed request.
+        backoff (float): Seconds to wait before the first retry.
+        timeout (float): Seconds a single request may take.
+        state_path (Path): Where the ETags and Last-Modified dates are kept.
+
+    Returns:
+        dict: Per pair "updated", "not modified" or the exception that made it fail.
+    """
+    Path(raw_dir).mkdir(parents=True, exist_ok=True)
+    state = load_fetch_state(state_path)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        results = await asyncio.gather(
+            *(fetch_pair(session, semaphore, base_url, pair, state, raw_dir, data_format, retries, backoff) for pair in pairs),
+            return_exceptions=True,
+        )
+
+    save_fetch_state(state, state_path)
+    return dict(zip(pairs, results))
+
+
+app = typer.Typer()
+
+
+@app.command()
+def main(
+    base_url: str = typer.Option("http://127.0.0.1:8765", help="URL of the provider, e.g. the mock server."),
+    pair: List[str] = typer.Option([], help="Pair to fetch, e.g. CHF_USD. Can be repeated, defaults to the pairs in RAW_DATA_DIR."),
+    data_format: str = typer.Option("csv", "--format", help="Download as csv or json."),
+    concurrency: int = typer.Option(16, min=1, help="Maximum number of requests at once."),
+    retries: int = typer.Option(4, min=0, help="Retries after a failed request."),
+):
+    pairs = pair or local_pairs()
+    if not pairs:
+        logger.error("No pairs given and no raw files found.")
+        raise typer.Exit(1)
+
+    results = asyncio.run(fetch_pairs(pairs, base_url, data_format=data_format, concurrency=concurrency, retries=retries))
+
+    failed = 0
+    for name, result in sorted(results.items()):
+        if isinstance(result, Exception):
+            failed += 1
+            logger.error(f"Error fetching {name}: {result!r}")
+        elif result == "updated":
+            logger.success(f"Updated: {raw_path(name)}")
+        else:
+            logger.info(f"Not modified: {name}")
+
+    logger.info(f"Fetched {len(results) - failed} of {len(results)} pairs.")
+    if failed:
+        raise typer.Exit(1)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,224 @@
+import os
+import sys
+import json
+import time
+import cProfile
+import logging
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Add the project root to sys.path when run as a script
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if __package__ in (None, ""):
+    sys.path.append(str(PROJECT_ROOT))
+
+from config import INTERIM_DATA_DIR
+
+"""
+Timing instrumentation for the load, filter, compute and render stages.
+
+Functions decorated with @timed, and the `with stage(...)` blocks inside them,
+record wall time, CPU time, rows processed and bytes read. Every record is
+added to in-process counters, which can be exported in the Prometheus text
+format, and appended to a JSONL file if G10_METRICS_LOG is set:
+
+    G10_METRICS_LOG=data/interim/metrics.jsonl python figures/var_bar_chart.py
+
+Profiling is opt-in: with G10_PROFILE=cprofile (or pyinstrument, if it is
+installed) every outermost @timed call is profiled and the profile is saved to
+G10_PROFILE_DIR, data/interim/profiles by default. Open .prof files with
+`python -m pstats` or snakeviz.
+"""
+
+METRICS_LOG_ENV = "G10_METRICS_LOG"
+PROFILE_ENV = "G10_PROFILE"
+PROFILE_DIR_ENV = "G10_PROFILE_DIR"
+
+DEFAULT_PROFILE_DIR = INTERIM_DATA_DIR / "profiles"
+
+# (function, stage): [calls, wall seconds, CPU seconds, rows, bytes read]
+_COUNTERS = {}
+_LOCK = threading.Lock()
+
+# Name of the @timed function currently running
+_FUNCTION = contextvars.ContextVar("function", default=None)
+
+
+class StageRecord:
+    """
+    Measurements of one run of a stage. Rows and bytes can be set while the stage runs.
+    """
+
+    __slots__ = ("function", "stage", "rows", "bytes_read", "wall_seconds", "cpu_seconds")
+
+    def __init__(self, function, stage, rows=None, bytes_read=None):
+        self.function = function
+        self.stage = stage
+        self.rows = rows
+        self.bytes_read = bytes_read
+        self.wall_seconds = None
+        self.cpu_seconds = None
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def _emit(record):
+    with _LOCK:
+        counter = _COUNTERS.setdefault((record.function, record.stage), [0, 0.0, 0.0, 0, 0])
+        counter[0] += 1
+        counter[1] += record.wall_seconds
+        counter[2] += record.cpu_seconds
+        counter[3] += record.rows or 0
+        counter[4] += record.bytes_read or 0
+
+        log_path = os.environ.get(METRICS_LOG_ENV)
+        if log_path:
+            line = json.dumps({"timestamp": time.time(), "pid": os.getpid(), **record.to_dict()})
+            with open(log_path, "a") as f:
+                f.write(line + "\n")
+
+
+@contextmanager
+def stage(name, rows=None, bytes_read=None):
+    """
+    Measure a block of code as a stage of the current @timed function.
+
+    Args:
+        name (str): Name of the stage, e.g. "load", "filter", "compute" or "render".
+        rows (int): Rows processed, can also be set on the record inside the block.
+        bytes_read (int): Bytes read, can also be set on the record inside the block.
+
+    Yields:
+        StageRecord: The record of this run.
+    """
+    record = StageRecord(_FUNCTION.get(), name, rows, bytes_read)
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    finally:
+        record.wall_seconds = time.perf_counter() - wall
+        record.cpu_seconds = time.process_time() - cpu
+        _emit(record)
+
+
+def _profiled(name, func, args, kwargs):
+    """
+    Call func, profiling it if G10_PROFILE asks for it.
+    """
+    mode = os.environ.get(PROFILE_ENV, "").lower()
+    if not mode:
+        return func(*args, **kwargs)
+
+    profile_dir = Path(os.environ.get(PROFILE_DIR_ENV, DEFAULT_PROFILE_DIR))
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    path = profile_dir / f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+
+    if mode == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning("pyinstrument is not installed, falling back to cProfile.")
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.stop()
+                path.with_suffix(".html").write_text(profiler.output_html())
+
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        profiler.dump_stats(path.with_suffix(".prof"))
+
+
+def timed(func):
+    """
+    Decorator measuring every call of a function as its "total" stage.
+
+    Stages inside the function are recorded under its name, and the outermost
+    timed call is profiled if G10_PROFILE is set.
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        outermost = _FUNCTION.get() is None
+        token = _FUNCTION.set(name)
+        try:
+            with stage("total"):
+                if outermost:
+                    return _profiled(name, func, args, kwargs)
+                return func(*args, **kwargs)
+        finally:
+            _FUNCTION.reset(token)
+
+    return wrapper
+
+
+def stage_counters():
+    """
+    Return the accumulated measurements of every stage.
+
+    Returns:
+        dict: (function, stage) mapped to its calls, wall_seconds, cpu_seconds, rows and bytes_read.
+    """
+    with _LOCK:
+        return {
+            key: dict(zip(("calls", "wall_seconds", "cpu_seconds", "rows", "bytes_read"), counter))
+            for key, counter in _COUNTERS.items()
+        }
+
+
+def reset_counters():
+    """
+    Drop all accumulated measurements.
+    """
+    with _LOCK:
+        _COUNTERS.clear()
+
+
+_PROMETHEUS_METRICS = [
+    ("calls", "g10_stage_calls_total", "Number of times a stage ran."),
+    ("wall_seconds", "g10_stage_wall_seconds_total", "Wall time spent in a stage."),
+    ("cpu_seconds", "g10_stage_cpu_seconds_total", "CPU time of the process spent in a stage."),
+    ("rows", "g10_stage_rows_total", "Rows processed by a stage."),
+    ("bytes_read", "g10_stage_bytes_read_total", "Bytes read by a stage."),
+]
+
+
+def prometheus_text():
+    """
+    Render the counters in the Prometheus text exposition format.
+
+    Returns:
+        str: One counter family per measurement, labelled by function and stage.
+    """
+    counters = stage_counters()
+    lines = []
+    for key, metric, help_text in _PROMETHEUS_METRICS:
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+        for (function, stage_name), values in sorted(counters.items(), key=lambda item: (str(item[0][0]), item[0][1])):
+            lines.append(f'{metric}{{function="{function or ""}",stage="{stage_name}"}} {values[key]}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    """
+    Write the counters to a file in the Prometheus text format, e.g. for the node exporter's textfile collector.
+
+    Args:
+        path (Path): The file to write.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(prometheus_text())
+    os.replace(tmp_path, path)
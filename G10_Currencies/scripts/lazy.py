@@ -0,0 +1,47 @@
+import sys
+import types
+import importlib
+
+"""
+Lazy imports of the heavy dependencies.
+
+`pd = lazy_import("pandas")` binds a stand-in module that imports pandas on
+first attribute access, e.g. the first call to pd.read_csv. Importing a
+figure or metric module, or running a command with --help, therefore does not
+pay for pandas, numpy or matplotlib until they are actually used.
+"""
+
+
+class LazyModule(types.ModuleType):
+    """
+    Stand-in for a module that is imported when one of its attributes is first used.
+    """
+
+    def _load(self):
+        module = self.__dict__.get("_module")
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_import(name):
+    """
+    Return a module that is only imported on first use.
+
+    Args:
+        name (str): Name of the module, e.g. "pandas" or "matplotlib.pyplot".
+
+    Returns:
+        module: The module itself if it is already imported, otherwise a LazyModule.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
@@ -1,20 +1,23 @@
 import sys
-import pandas as pd
 from pathlib import Path
-from datetime import datetime
 import logging
 
-# Set up logging
-logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-# Add the project root to sys.path
+# Add the project root to sys.path when run as a script
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
-sys.path.append(str(PROJECT_ROOT))
+if __package__ in (None, ""):
+    sys.path.append(str(PROJECT_ROOT))
 
-from config import PROCESSED_DATA_DIR
+from scripts.cross_rates import BASE_CURRENCY, base_panel
+from scripts.result_cache import cached_metric
+from scripts.instrumentation import stage, timed
+from scripts.lazy import lazy_import
 
-def calculate_maximum_drawdown(START, END):
+pd = lazy_import("pandas")
+
+@timed
+def calculate_maximum_drawdown(START, END, base=BASE_CURRENCY):
     """
     Calculate the maximum drawdown for each currency within a specified time period,
     using the reciprocal (1 / Price) of the original prices.
@@ -22,53 +25,23 @@ def calculate_maximum_drawdown(START, END):
     Args:
         START (int): Start year for filtering the data.
         END (int): End year for filtering the data.
+        base (str): Home currency of the resident, the pairs are triangulated to it (default is CHF).
 
     Returns:
         dict: Dictionary of currencies and their respective maximum drawdown percentages.
     """
 
-    # List all processed CSV files
-    csv_files = list(PROCESSED_DATA_DIR.glob("*.csv"))
-    if not csv_files:
+    # Load the shared price panel
+    with stage("load") as record:
+        panel = base_panel(base)
+        record.rows = len(panel)
+    if panel.empty:
         logger.error("No processed datasets found.")
         return
 
-    # Initialize a dictionary to store maximum drawdown results
-    mdd_results = {}
-
-    # Process each dataset
-    for csv_file in csv_files:
-        try:
-            # Load the dataset
-            df = pd.read_csv(csv_file, parse_dates=["Date"])
-
-            # Convert START and END to datetime objects
-            START_YEAR = datetime(START, 1, 1)
-            END_YEAR = datetime(END, 12, 31)
-
-            # Filter the dataset to include only rows within the specified date range
-            df = df[(df["Date"] >= START_YEAR) & (df["Date"] <= END_YEAR)]
-
-            # Ensure the dataset is sorted by date
-            df = df.sort_values(by="Date")
-
-            # Calculate the reciprocal (1 / Price) of the original prices
-            df["Reciprocal Price"] = 1 / df["Price"]
-
-            # Calculate the rolling maximum of reciprocal prices
-            df["Rolling Max"] = df["Reciprocal Price"].cummax()
-
-            # Calculate the drawdown as a percentage
-            df["Drawdown"] = (df["Reciprocal Price"] - df["Rolling Max"]) / df["Rolling Max"] * 100
-
-            # Find the maximum drawdown value
-            max_drawdown = df["Drawdown"].min()
-
-            # Store the maximum drawdown in the results dictionary
-            mdd_results[csv_file.stem] = max_drawdown
-
-        except Exception as e:
-            logger.error(f"Error processing file {csv_file}: {e}")
+    # Calculate the maximum drawdown for all currencies at once, reusing earlier results
+    with stage("compute", rows=len(panel)):
+        mdd_results = cached_metric("maximum_drawdown", START, END, base=base)
 
     # Display or save the results
     if mdd_results:
@@ -78,4 +51,6 @@ def calculate_maximum_drawdown(START, END):
     return mdd_results
 
 if __name__ == "__main__":
+    # Set up logging
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
     calculate_maximum_drawdown(2000, 2024)
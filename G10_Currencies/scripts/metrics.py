@@ -0,0 +1,301 @@
+import warnings
+import functools
+from datetime import datetime
+
+from scripts.resample import horizon_periods, infer_frequency, periods_per_year, resample_prices
+from scripts.lazy import lazy_import
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+"""
+Vectorized metric engine.
+
+Every metric is computed for all currencies at once on a 2-D array of prices
+(rows are dates in chronological order, columns are currencies). Missing
+prices (NaN) are skipped, so each column behaves as if its NaN rows had been
+dropped before the calculation.
+
+The metric functions also take a single CurrencySeries (see series.py) and
+return a float for it.
+"""
+
+# Number of observations per year of the shipped data (monthly bars), used when
+# the frequency of a series cannot be inferred, see scripts/resample.py
+PERIODS_PER_YEAR = 12
+
+# Column order of the tidy result frame
+METRICS = ["depreciation", "volatility", "var", "maximum_drawdown"]
+
+
+def window_bounds(START, END):
+    """
+    Convert the bounds of a date range to timestamps.
+
+    Args:
+        START (int or date-like): Start year (from January 1) or date.
+        END (int or date-like): End year (until December 31) or date.
+
+    Returns:
+        tuple: (start, end) as pd.Timestamp.
+    """
+    start = datetime(START, 1, 1) if isinstance(START, int) else START
+    end = datetime(END, 12, 31) if isinstance(END, int) else END
+    return pd.Timestamp(start), pd.Timestamp(end)
+
+
+def date_positions(dates, START, END):
+    """
+    Find the first and last position of a sorted date array within a date range.
+
+    Args:
+        dates (np.ndarray): Sorted datetime64[ns] array.
+        START (int or date-like): Start year or date.
+        END (int or date-like): End year or date.
+
+    Returns:
+        tuple: (first, last) positions, first > last if the range is empty.
+    """
+    start, end = window_bounds(START, END)
+    first = np.searchsorted(dates, start.to_datetime64(), side="left")
+    last = np.searchsorted(dates, end.to_datetime64(), side="right") - 1
+    return first, last
+
+
+def date_window(panel, START, END):
+    """
+    Select the rows of the panel within a date range.
+
+    Args:
+        panel (pd.DataFrame): Date-indexed price panel sorted by date.
+        START (int or date-like): Start year or date.
+        END (int or date-like): End year or date.
+
+    Returns:
+        pd.DataFrame: The rows of the panel within the range.
+    """
+    start, end = window_bounds(START, END)
+    return panel.loc[start:end]
+
+
+def _accepts_series(func=None, from_series=None):
+    """
+    Let a metric take a CurrencySeries as well as a 2-D array, returning a float for the series.
+
+    from_series(series, *args, **kwargs) computes the metric from the returns
+    the series has cached, it returns None to fall back to the prices.
+    """
+    if func is None:
+        return functools.partial(_accepts_series, from_series=from_series)
+
+    code = func.__code__
+    takes_frequency = "periods_per_year" in code.co_varnames[:code.co_argcount]
+
+    @functools.wraps(func)
+    def wrapper(prices, *args, **kwargs):
+        if not hasattr(prices, "as_column"):
+            return func(prices, *args, **kwargs)
+
+        # A series knows its frequency, annualize with it unless told otherwise
+        if takes_frequency and not args and "periods_per_year" not in kwargs:
+            kwargs["periods_per_year"] = prices.periods_per_year
+        if from_series is not None:
+            result = from_series(prices, *args, **kwargs)
+            if result is not None:
+                return result
+        return float(func(prices.as_column(), *args, **kwargs)[0])
+
+    return wrapper
+
+
+def _forward_filled(prices):
+    """
+    Forward-fill NaN gaps column-wise so that consecutive valid prices line up.
+    """
+    valid = ~np.isnan(prices)
+    positions = np.where(valid, np.arange(len(prices))[:, None], 0)
+    np.maximum.accumulate(positions, axis=0, out=positions)
+    filled = np.take_along_axis(prices, positions, axis=0)
+
+    # Rows before the first valid price stay missing
+    filled[~np.maximum.accumulate(valid, axis=0)] = np.nan
+    return filled
+
+
+def _returns(prices, log=False, lag=1):
+    """
+    Returns over `lag` rows between valid prices, NaN where the price is missing.
+    """
+    filled = _forward_filled(prices)
+    if log:
+        returns = np.log(filled[lag:] / filled[:-lag])
+    else:
+        returns = filled[lag:] / filled[:-lag] - 1
+    returns[np.isnan(prices[lag:])] = np.nan
+    return returns
+
+
+def _series_volatility(series, periods_per_year=PERIODS_PER_YEAR):
+    """
+    volatility of a CurrencySeries from its cached log returns.
+    """
+    log_returns = series.log_returns
+    if len(log_returns) < 2:
+        return float("nan")
+    return float(log_returns.std(ddof=1) * np.sqrt(periods_per_year))
+
+
+def _series_value_at_risk(series, confidence_level=0.95, horizon=1):
+    """
+    value_at_risk of a CurrencySeries from its cached returns, None for longer horizons.
+    """
+    if horizon != 1:
+        return None
+    returns = series.returns
+    if not len(returns):
+        return float("nan")
+    # Return of the reciprocal price: p[t - 1] / p[t] - 1 = -r / (1 + r)
+    return float(np.percentile(-returns / (1 + returns), (1 - confidence_level) * 100) * 100)
+
+
+@_accepts_series
+def depreciation(prices):
+    """
+    Percentage depreciation of each currency between its first and last valid price.
+
+    Args:
+        prices (np.ndarray): 2-D array of prices, one column per currency.
+
+    Returns:
+        np.ndarray: Depreciation in percent, NaN for columns without data.
+    """
+    if not len(prices):
+        return np.full(prices.shape[1], np.nan)
+
+    # Last valid price in every column
+    end_rate = _forward_filled(prices)[-1]
+
+    # Position of the first valid price in every column
+    first = (~np.isnan(prices)).argmax(axis=0)
+    start_rate = prices[first, np.arange(prices.shape[1])]
+
+    return (start_rate - end_rate) / start_rate * 100
+
+
+@_accepts_series(from_series=_series_volatility)
+def volatility(prices, periods_per_year=PERIODS_PER_YEAR):
+    """
+    Annualized standard deviation of the log returns of each currency.
+
+    Args:
+        prices (np.ndarray): 2-D array of prices, one column per currency.
+        periods_per_year (int): Number of prices per year, see resample.periods_per_year.
+
+    Returns:
+        np.ndarray: Annualized volatility, NaN for columns with fewer than two returns.
+    """
+    log_returns = _returns(prices, log=True)
+    counts = (~np.isnan(log_returns)).sum(axis=0)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        std_dev = np.nanstd(log_returns, axis=0, ddof=1)
+
+    std_dev[counts < 2] = np.nan
+    return std_dev * np.sqrt(periods_per_year)
+
+
+@_accepts_series(from_series=_series_value_at_risk)
+def value_at_risk(prices, confidence_level=0.95, horizon=1):
+    """
+    Historical Value at Risk of holding each currency, valued in CHF (1 / Price).
+
+    Args:
+        prices (np.ndarray): 2-D array of prices, one column per currency.
+        confidence_level (float): The confidence level for VaR calculation.
+        horizon (int): Holding period in rows, returns over longer horizons overlap.
+
+    Returns:
+        np.ndarray: VaR in percent, NaN for columns without returns.
+    """
+    if len(prices) <= horizon:
+        return np.full(prices.shape[1], np.nan)
+    returns = _returns(1 / prices, lag=horizon)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        var = np.nanpercentile(returns, (1 - confidence_level) * 100, axis=0)
+
+    return var * 100
+
+
+@_accepts_series
+def maximum_drawdown(prices):
+    """
+    Maximum drawdown of the reciprocal (1 / Price) of each currency.
+
+    Args:
+        prices (np.ndarray): 2-D array of prices, one column per currency.
+
+    Returns:
+        np.ndarray: Maximum drawdown in percent, NaN for columns without data.
+    """
+    if not len(prices):
+        return np.full(prices.shape[1], np.nan)
+
+    reciprocal = 1 / prices
+
+    # Running maximum of the reciprocal prices, ignoring missing values
+    rolling_max = np.maximum.accumulate(np.where(np.isnan(reciprocal), -np.inf, reciprocal), axis=0)
+    drawdown = (reciprocal - rolling_max) / rolling_max * 100
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        return np.nanmin(drawdown, axis=0)
+
+
+def compute_metrics(prices, confidence_level=0.95, metrics=METRICS, frequency=None, horizon=1):
+    """
+    Compute the requested metrics for every currency of a price panel in one pass.
+
+    Volatility is annualized and the VaR horizon converted with the frequency
+    of the prices, inferred from their dates.
+
+    Args:
+        prices (pd.DataFrame or CurrencySeries): Date-indexed price panel sorted by date, e.g. a date_window.
+        confidence_level (float): The confidence level for VaR calculation (default is 0.95).
+        metrics (list): Metrics to compute, defaults to all METRICS.
+        frequency (str): Resample the prices to this coarser frequency first, e.g. "W" or "MS".
+        horizon (int or str): VaR holding period in periods, or a duration such as "10D" or "1MS".
+
+    Returns:
+        pd.DataFrame: One row per currency, one column per metric.
+    """
+    if hasattr(prices, "as_column"):
+        prices = prices.to_series().to_frame()
+    if frequency is not None:
+        prices = resample_prices(prices, frequency)
+    values = prices.to_numpy(dtype="float64")
+
+    # Frequency of the prices, the shipped monthly frequency if there are too few dates to tell
+    native = infer_frequency(prices.index) if len(prices) > 1 else "MS"
+
+    # A new index, naming the columns of the prices would rename those of the caller's panel
+    results = pd.DataFrame(index=pd.Index(prices.columns, name="Currency"), columns=list(metrics), dtype="float64")
+    for metric in metrics:
+        if metric == "var":
+            results[metric] = value_at_risk(values, confidence_level, horizon_periods(horizon, native))
+        elif metric == "volatility":
+            results[metric] = volatility(values, periods_per_year(native))
+        else:
+            results[metric] = _METRIC_FUNCTIONS[metric](values)
+
+    return results
+
+
+_METRIC_FUNCTIONS = {
+    "depreciation": depreciation,
+    "volatility": volatility,
+    "var": value_at_risk,
+    "maximum_drawdown": maximum_drawdown,
+}
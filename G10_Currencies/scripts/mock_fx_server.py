@@ -0,0 +1,162 @@
+import sys
+import csv
+import json
+import time
+import random
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import typer
+from loguru import logger
+
+# Add the project root to sys.path when run as a script
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if __package__ in (None, ""):
+    sys.path.append(str(PROJECT_ROOT))
+
+from config import RAW_DATA_DIR
+
+"""
+Local stand-in for the exchange rate provider, to run fetch_data offline.
+
+Serves the raw files of a directory:
+
+- GET /pairs                returns the available pairs as JSON
+- GET /pairs/<PAIR>.csv     returns the file as exported by Investing.com
+- GET /pairs/<PAIR>.json    returns the same rows as JSON, all fields as strings
+
+Responses carry an ETag and a Last-Modified header, and conditional requests
+(If-None-Match, If-Modified-Since) are answered with 304 Not Modified. An
+artificial latency and a rate of failing (503) responses can be set to
+exercise the fetcher's concurrency and retries.
+"""
+
+
+def _pair_name(csv_file):
+    return csv_file.name.removesuffix(" Historical Data.csv")
+
+
+def rows_as_json(content):
+    """
+    Convert the content of a raw CSV file to JSON rows.
+
+    Args:
+        content (bytes): The raw CSV file.
+
+    Returns:
+        list: One dictionary per row, with the raw header as keys and the raw fields as values.
+    """
+    return list(csv.DictReader(content.decode("utf-8-sig").splitlines()))
+
+
+class MockFXHandler(BaseHTTPRequestHandler):
+    source_dir = RAW_DATA_DIR
+    latency = 0.0
+    failure_rate = 0.0
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    def _send(self, status, body=b"", content_type="application/json", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            self._send(503, b'{"error": "unavailable"}')
+            return
+
+        if self.path == "/pairs":
+            pairs = sorted(_pair_name(csv_file) for csv_file in self.source_dir.glob("*.csv"))
+            self._send(200, json.dumps(pairs).encode())
+            return
+
+        pair, _, extension = self.path.removeprefix("/pairs/").rpartition(".")
+        csv_file = self.source_dir / f"{pair} Historical Data.csv"
+        if not self.path.startswith("/pairs/") or extension not in ("csv", "json") or not csv_file.is_file():
+            self._send(404, b'{"error": "not found"}')
+            return
+
+        content = csv_file.read_bytes()
+        mtime = csv_file.stat().st_mtime
+        etag = f'"{hashlib.sha256(content).hexdigest()[:32]}-{extension}"'
+        headers = {"ETag": etag, "Last-Modified": formatdate(mtime, usegmt=True)}
+
+        # Conditional requests, the ETag takes precedence over the date
+        if_none_match = self.headers.get("If-None-Match")
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_none_match is not None:
+            not_modified = etag in (tag.strip() for tag in if_none_match.split(","))
+        elif if_modified_since is not None:
+            try:
+                not_modified = int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                not_modified = False
+        else:
+            not_modified = False
+
+        if not_modified:
+            self._send(304, headers=headers)
+        elif extension == "csv":
+            self._send(200, content, "text/csv; charset=utf-8", headers)
+        else:
+            body = json.dumps({"pair": pair, "rows": rows_as_json(content)}).encode()
+            self._send(200, body, "application/json", headers)
+
+
+def create_server(host="127.0.0.1", port=8765, source_dir=RAW_DATA_DIR, latency=0.0, failure_rate=0.0):
+    """
+    Create the mock server, call serve_forever() on it to start serving.
+
+    Args:
+        host (str): Address to listen on.
+        port (int): Port to listen on, 0 picks a free port.
+        source_dir (Path): Directory of raw CSV files to serve.
+        latency (float): Seconds to wait before every response.
+        failure_rate (float): Share of requests answered with 503 Service Unavailable.
+
+    Returns:
+        ThreadingHTTPServer: The server, its address is in server_address.
+    """
+    handler = type(
+        "ConfiguredMockFXHandler",
+        (MockFXHandler,),
+        {"source_dir": Path(source_dir), "latency": latency, "failure_rate": failure_rate},
+    )
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+app = typer.Typer()
+
+
+@app.command()
+def main(
+    host: str = "127.0.0.1",  # Address to listen on
+    port: int = 8765,  # Port to listen on
+    source_dir: Path = RAW_DATA_DIR,  # Directory of raw CSV files to serve
+    latency: float = typer.Option(0.0, help="Seconds to wait before every response."),
+    failure_rate: float = typer.Option(0.0, help="Share of requests answered with 503."),
+):
+    server = create_server(host, port, source_dir, latency, failure_rate)
+    logger.info(f"Serving {source_dir} on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,232 @@
+import sys
+import os
+import json
+from pathlib import Path
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Add the project root to sys.path when run as a script
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if __package__ in (None, ""):
+    sys.path.append(str(PROJECT_ROOT))
+
+from config import PROCESSED_DATA_DIR
+from scripts.schema import parse_dates, read_processed
+from scripts.lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+"""
+Shared in-memory store for the processed exchange rates.
+
+All processed CSV files are read once and combined into a single wide panel:
+one row per date, one float64 "Price" column per CHF pair (named after the
+file stem, e.g. "CHF_AUD Historical Data"). The panel is kept in memory and
+rebuilt only when a source file is added, removed or modified.
+
+clean_data additionally stores the panel as memory-mappable .npy arrays
+(int64 epoch-nanosecond dates and a float64 price matrix) in a "panel"
+subdirectory. When these arrays are up to date with the CSV files they are
+mapped directly instead of parsing any text.
+"""
+
+# Subdirectory of the processed data directory holding the binary panel
+ARRAYS_DIRNAME = "panel"
+
+# Cached panels, keyed by data directory: {directory: (signature, panel)}
+_PANEL_CACHE = {}
+
+
+def panel_signature(data_dir=PROCESSED_DATA_DIR):
+    """
+    Build a cheap fingerprint of the processed CSV files.
+
+    Args:
+        data_dir (Path): Directory containing the processed CSV files.
+
+    Returns:
+        tuple: Sorted (filename, mtime_ns, size) entries for every CSV file.
+    """
+    signature = []
+    for csv_file in Path(data_dir).glob("*.csv"):
+        stat = csv_file.stat()
+        signature.append((csv_file.name, stat.st_mtime_ns, stat.st_size))
+    return tuple(sorted(signature))
+
+
+def _read_price_column(csv_file):
+    """
+    Read the chronologically sorted prices of one processed CSV file.
+    """
+    df = read_processed(csv_file, columns=["Date", "Price"])
+    return pd.Series(df["Price"].to_numpy(), index=pd.DatetimeIndex(df["Date"])).sort_index()
+
+
+def build_panel(data_dir=PROCESSED_DATA_DIR, previous=None):
+    """
+    Read every processed CSV file and align the prices on a common date index.
+
+    Args:
+        data_dir (Path): Directory containing the processed CSV files.
+        previous (tuple): Optional (signature, panel) of an earlier build, columns
+            of files whose signature entry is unchanged are reused instead of re-read.
+
+    Returns:
+        pd.DataFrame: Date-indexed panel sorted by date, one float64 column per pair.
+    """
+    reusable = set()
+    if previous is not None:
+        reusable = set(previous[0])
+
+    columns = {}
+    for entry in panel_signature(data_dir):
+        csv_file = Path(data_dir) / entry[0]
+        try:
+            if entry in reusable and csv_file.stem in previous[1].columns:
+                columns[csv_file.stem] = previous[1][csv_file.stem].dropna()
+            else:
+                columns[csv_file.stem] = _read_price_column(csv_file)
+        except Exception as e:
+            logger.error(f"Error processing file {csv_file}: {e}")
+
+    if not columns:
+        return pd.DataFrame(dtype="float64")
+
+    # Outer-join all pairs on their dates and order chronologically
+    panel = pd.concat(columns, axis=1).sort_index()
+    panel.index.name = "Date"
+    return panel
+
+
+def _save_array(path, array):
+    """
+    Write an array next to its destination and move it into place atomically,
+    so that processes still mapping the old file are not affected.
+    """
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def write_panel_arrays(data_dir=PROCESSED_DATA_DIR):
+    """
+    Store the panel of the processed CSV files as memory-mappable .npy arrays.
+
+    Args:
+        data_dir (Path): Directory containing the processed CSV files.
+
+    Returns:
+        pd.DataFrame: The panel that was written.
+    """
+    data_dir = Path(data_dir)
+    arrays_dir = data_dir / ARRAYS_DIRNAME
+    arrays_dir.mkdir(parents=True, exist_ok=True)
+
+    # Reuse the columns of the previous arrays for files that did not change
+    signature = panel_signature(data_dir)
+    previous = _load_arrays(arrays_dir)
+    if previous is not None:
+        previous = (previous[0], _panel_from_arrays(*previous[1:]))
+    panel = build_panel(data_dir, previous)
+
+    # Dates as int64 epoch nanoseconds, prices column-major so every pair is contiguous
+    _save_array(arrays_dir / "dates.npy", panel.index.to_numpy(dtype="datetime64[ns]").view("int64"))
+    _save_array(arrays_dir / "prices.npy", np.asfortranarray(panel.to_numpy(dtype="float64")))
+
+    # The metadata is written last, it marks the arrays as complete
+    meta = {"columns": list(panel.columns), "signature": [list(entry) for entry in signature]}
+    tmp_path = arrays_dir / "meta.json.tmp"
+    tmp_path.write_text(json.dumps(meta, indent=2))
+    os.replace(tmp_path, arrays_dir / "meta.json")
+
+    return panel
+
+
+def load_panel_arrays(data_dir=PROCESSED_DATA_DIR, signature=None):
+    """
+    Memory-map the binary panel written by write_panel_arrays.
+
+    Args:
+        data_dir (Path): Directory containing the processed CSV files.
+        signature (tuple): Expected panel_signature, defaults to the current one.
+
+    Returns:
+        tuple: (dates, prices, columns) with read-only memory-mapped arrays,
+            or None if the arrays are missing or older than the CSV files.
+    """
+    arrays = _load_arrays(Path(data_dir) / ARRAYS_DIRNAME)
+    if arrays is None:
+        return None
+
+    if signature is None:
+        signature = panel_signature(data_dir)
+    if arrays[0] != signature:
+        return None
+
+    return arrays[1:]
+
+
+def _load_arrays(arrays_dir):
+    """
+    Memory-map the arrays of a panel directory together with their signature.
+    """
+    try:
+        meta = json.loads((arrays_dir / "meta.json").read_text())
+        dates = np.load(arrays_dir / "dates.npy", mmap_mode="r")
+        prices = np.load(arrays_dir / "prices.npy", mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+
+    signature = tuple(tuple(entry) for entry in meta["signature"])
+    return signature, dates, prices, meta["columns"]
+
+
+def _panel_from_arrays(dates, prices, columns):
+    """
+    Wrap memory-mapped arrays in a DataFrame without copying the prices.
+    """
+    index = pd.DatetimeIndex(parse_dates(np.asarray(dates)), name="Date")
+    return pd.DataFrame(prices, index=index, columns=columns, copy=False)
+
+
+def load_panel(data_dir=PROCESSED_DATA_DIR):
+    """
+    Return the cached price panel, rebuilding it if any source file changed.
+
+    The binary arrays are used when they match the CSV files, otherwise the
+    CSV files are parsed. The returned frame is shared between callers and
+    must not be modified in place.
+
+    Args:
+        data_dir (Path): Directory containing the processed CSV files.
+
+    Returns:
+        pd.DataFrame: Date-indexed panel sorted by date, one float64 column per pair.
+    """
+    key = Path(data_dir).resolve()
+    signature = panel_signature(key)
+
+    cached = _PANEL_CACHE.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    arrays = load_panel_arrays(key, signature)
+    if arrays is not None:
+        logger.info(f"Mapping price panel from {key / ARRAYS_DIRNAME}")
+        panel = _panel_from_arrays(*arrays)
+    else:
+        logger.info(f"Loading price panel from {key}")
+        panel = build_panel(key, cached)
+
+    _PANEL_CACHE[key] = (signature, panel)
+    return panel
+
+
+def clear_panel_cache():
+    """
+    Drop all cached panels so the next call to load_panel reads from disk.
+    """
+    _PANEL_CACHE.clear()
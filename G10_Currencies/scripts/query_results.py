@@ -0,0 +1,59 @@
+import sys
+from pathlib import Path
+from typing import Optional
+import typer
+from loguru import logger
+
+# Add the project root to sys.path when run as a script
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if __package__ in (None, ""):
+    sys.path.append(str(PROJECT_ROOT))
+
+from scripts.metrics import METRICS
+from scripts.result_store import metric_params, result_store
+
+"""
+Read metric results from the result store without computing anything.
+
+    python scripts/query_results.py query --currency "CHF_JPY Historical Data" --metric var
+    python scripts/query_results.py top var 2007-2009
+
+Results are stored by the notebook, the calculate_* scripts and the batch
+report, only what they computed before can be queried.
+"""
+
+
+app = typer.Typer()
+
+
+@app.command()
+def query(
+    currency: Optional[str] = typer.Option(None, help='Currency, e.g. "CHF_JPY Historical Data".'),
+    metric: Optional[str] = typer.Option(None, help=f"One of {', '.join(METRICS)}."),
+    version: Optional[str] = typer.Option(None, help='Data version, defaults to the current one, "all" for every version.'),
+):
+    frame = result_store().query(currency, metric, version=version)
+    if frame.empty:
+        logger.warning("No stored results match.")
+        return
+    print(frame.to_string(index=False))
+
+
+@app.command()
+def top(
+    metric: str = typer.Argument(..., help=f"One of {', '.join(METRICS)}."),
+    period: str = typer.Argument(..., help='Years as "START-END", e.g. 2007-2009.'),
+    n: int = typer.Option(5, min=1, help="Number of currencies."),
+    confidence_level: float = typer.Option(0.95, help="Confidence level of the VaR."),
+):
+    START, END = (int(year) for year in period.split("-"))
+    ranking = result_store().top(metric, START, END, n, metric_params(metric, confidence_level))
+    if ranking is None:
+        logger.error(f"No stored {metric} for {period}, run the report or the notebook first.")
+        raise typer.Exit(1)
+    for currency, value in ranking.items():
+        print(f"{currency}: {value:.4f}")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,173 @@
+import warnings
+import threading
+from collections import OrderedDict
+
+from scripts.metrics import PERIODS_PER_YEAR, _returns, date_positions
+from scripts.resample import FREQUENCIES, frequency_from_counts, spacing_classes
+from scripts.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+"""
+Prefix-sum index for constant-time range queries.
+
+For every currency the index stores the cumulative sums of the log returns
+and of the squared log returns, the cumulative count of returns, and the
+position of the next and previous valid price at every row. Volatility and
+depreciation over any date range then take two binary searches on the date
+array and a handful of array lookups, independent of the length of the range.
+Volatility is annualized with the frequency of the dates within the range, as
+in compute_metrics; the index also counts the gaps between dates per spacing
+class, so the frequency of any range is read from two rows of counts.
+"""
+
+
+class PrefixSumIndex:
+    """
+    Cumulative sums over a price panel, answering range queries for all currencies at once.
+
+    Args:
+        panel (pd.DataFrame): Date-indexed price panel sorted by date.
+    """
+
+    __slots__ = (
+        "dates", "columns", "prices", "sums", "squares", "counts", "next_valid", "previous_valid", "gap_counts",
+    )
+
+    def __init__(self, panel):
+        self.dates = panel.index.to_numpy(dtype="datetime64[ns]")
+        self.columns = panel.columns
+        self.prices = panel.to_numpy(dtype="float64")
+        n, k = self.prices.shape
+
+        # gap_counts[i] counts the gaps between the dates up to position i per spacing class
+        gap_counts = np.zeros((n, len(FREQUENCIES)), dtype="int64")
+        if n > 1:
+            gap_counts[np.arange(1, n), spacing_classes(self.dates)] = 1
+        self.gap_counts = np.cumsum(gap_counts, axis=0)
+
+        # Log return ending at every price, centred per currency to keep the sums precise
+        log_returns = np.vstack([np.full((1, k), np.nan), _returns(self.prices, log=True)])[:n]
+        valid = ~np.isnan(log_returns)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            centred = np.where(valid, log_returns - np.nanmean(log_returns, axis=0), 0.0)
+
+        # sums[i] covers all returns ending at a price up to position i
+        self.sums = np.cumsum(centred, axis=0)
+        self.squares = np.cumsum(centred ** 2, axis=0)
+        self.counts = np.cumsum(valid, axis=0)
+
+        # Position of the next valid price at or after, and the previous at or before, every row
+        has_price = ~np.isnan(self.prices)
+        rows = np.arange(n)[:, None]
+        self.previous_valid = np.maximum.accumulate(np.where(has_price, rows, -1), axis=0)
+        self.next_valid = np.minimum.accumulate(np.where(has_price, rows, n)[::-1], axis=0)[::-1]
+
+    def positions(self, START, END):
+        """
+        Find the first and last row within a date range.
+
+        Args:
+            START (int or date-like): Start year or date.
+            END (int or date-like): End year or date.
+
+        Returns:
+            tuple: (first, last) row positions, first > last if the range is empty.
+        """
+        return date_positions(self.dates, START, END)
+
+    def _valid_bounds(self, first, last):
+        """
+        First and last valid price position of every currency within a row range.
+        """
+        k = len(self.columns)
+        if first > last:
+            return np.zeros(k, dtype="int64"), np.full(k, -1)
+        return self.next_valid[first], self.previous_valid[last]
+
+    def _periods_per_year(self, first, last):
+        """
+        Periods per year of the rows within a row range, the shipped monthly frequency if there are too few to tell.
+        """
+        if last <= first:
+            return PERIODS_PER_YEAR
+        return FREQUENCIES[frequency_from_counts(self.gap_counts[last] - self.gap_counts[first])][1]
+
+    def depreciation(self, START, END):
+        """
+        Percentage depreciation of every currency over a date range.
+
+        Args:
+            START (int or date-like): Start year or date.
+            END (int or date-like): End year or date.
+
+        Returns:
+            np.ndarray: Depreciation in percent, NaN for currencies without data.
+        """
+        first, last = self._valid_bounds(*self.positions(START, END))
+        found = first <= last
+
+        result = np.full(len(self.columns), np.nan)
+        columns = np.flatnonzero(found)
+        start_rate = self.prices[first[found], columns]
+        end_rate = self.prices[last[found], columns]
+        result[found] = (start_rate - end_rate) / start_rate * 100
+        return result
+
+    def volatility(self, START, END):
+        """
+        Annualized standard deviation of the log returns of every currency over a date range.
+
+        Args:
+            START (int or date-like): Start year or date.
+            END (int or date-like): End year or date.
+
+        Returns:
+            np.ndarray: Annualized volatility, NaN for currencies with fewer than two returns.
+        """
+        rows = self.positions(START, END)
+        first, last = self._valid_bounds(*rows)
+        result = np.full(len(self.columns), np.nan)
+
+        # Returns ending after the first valid price, up to the last one
+        found = first < last
+        columns = np.flatnonzero(found)
+        first, last = first[found], last[found]
+
+        counts = self.counts[last, columns] - self.counts[first, columns]
+        s1 = self.sums[last, columns] - self.sums[first, columns]
+        s2 = self.squares[last, columns] - self.squares[first, columns]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            variance = np.maximum(s2 - s1 ** 2 / counts, 0.0) / (counts - 1)
+        variance[counts < 2] = np.nan
+
+        result[found] = np.sqrt(variance) * np.sqrt(self._periods_per_year(*rows))
+        return result
+
+
+# Indexes of the most recently used panels, e.g. the panels of several base currencies: id(panel): (panel, index)
+_INDEX_CACHE = OrderedDict()
+_INDEX_LOCK = threading.Lock()
+INDEX_CACHE_SIZE = 16
+
+
+def prefix_index(panel):
+    """
+    Return the prefix-sum index of a panel, building it on first use.
+
+    Args:
+        panel (pd.DataFrame): Date-indexed price panel sorted by date.
+
+    Returns:
+        PrefixSumIndex: The index of the panel.
+    """
+    with _INDEX_LOCK:
+        cached = _INDEX_CACHE.get(id(panel))
+        if cached is None or cached[0] is not panel:
+            cached = _INDEX_CACHE[id(panel)] = (panel, PrefixSumIndex(panel))
+            while len(_INDEX_CACHE) > INDEX_CACHE_SIZE:
+                _INDEX_CACHE.popitem(last=False)
+        _INDEX_CACHE.move_to_end(id(panel))
+        return cached[1]
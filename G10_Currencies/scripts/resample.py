@@ -0,0 +1,240 @@
+from scripts.lazy import lazy_import
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+"""
+Sampling frequency of price series.
+
+The native frequency of a series is inferred from the spacing of its dates
+and snapped to one of FREQUENCIES, which also give the number of periods
+per year used to annualize volatility and to convert VaR horizons into a
+number of periods, and the decay factor of EWMA variances. FX trades 24
+hours on business days, so a year has 252 daily, 252 * 24 hourly and
+252 * 24 * 60 minute bars.
+
+resample_prices and resample_ohlc convert a series to a coarser frequency with
+pandas' vectorized resample, e.g. minute bars to daily or daily to monthly
+closes. Monthly bars are labelled with the first day of the month, as in the
+Investing.com exports.
+"""
+
+TRADING_DAYS = 252
+
+# Pandas offset alias: (nominal length of a period, periods per year), shortest first
+FREQUENCIES = {
+    "min": ("1min", TRADING_DAYS * 24 * 60),
+    "h": ("1h", TRADING_DAYS * 24),
+    "B": ("1D", TRADING_DAYS),
+    "W": ("7D", 52),
+    "MS": ("30.44D", 12),
+    "QS": ("91.31D", 4),
+    "YS": ("365.25D", 1),
+}
+
+# Decay factors of exponentially weighted variances, RiskMetrics uses 0.94 for
+# daily and 0.97 for monthly data; weekly data lies in between
+EWMA_DECAYS = {"min": 0.94, "h": 0.94, "B": 0.94, "W": 0.955, "MS": 0.97, "QS": 0.97, "YS": 0.97}
+
+# Percentile of the gaps between dates that decides the frequency of a series
+SPACING_PERCENTILE = 10
+
+# Other spellings of the canonical frequencies
+_ALIASES = {
+    "T": "min", "H": "h", "D": "B", "C": "B",
+    "M": "MS", "ME": "MS", "BM": "MS", "BMS": "MS",
+    "Q": "QS", "QE": "QS", "BQ": "QS", "BQS": "QS",
+    "A": "YS", "AS": "YS", "Y": "YS", "YE": "YS", "BA": "YS", "BY": "YS",
+}
+
+# Columns of OHLC bars and how they aggregate
+OHLC_AGGREGATION = {"Open": "first", "High": "max", "Low": "min", "Price": "last"}
+
+
+def canonical_frequency(frequency):
+    """
+    Map a pandas offset alias to one of FREQUENCIES.
+
+    Args:
+        frequency (str): e.g. "D", "W-FRI", "ME" or "MS".
+
+    Returns:
+        str: The canonical alias.
+    """
+    base = pd.tseries.frequencies.to_offset(frequency).base.freqstr.split("-")[0]
+    base = _ALIASES.get(base, base)
+    if base not in FREQUENCIES:
+        raise ValueError(f"Unsupported frequency: {frequency}")
+    return base
+
+
+def spacing_classes(dates):
+    """
+    Classify the gaps between consecutive dates by the frequency closest to them.
+
+    Args:
+        dates (pd.DatetimeIndex or np.ndarray): Dates of a series, in either order.
+
+    Returns:
+        np.ndarray: Position in FREQUENCIES (shortest first) of the frequency closest to every gap, on a log scale.
+    """
+    gaps = np.diff(np.sort(np.asarray(dates, dtype="datetime64[ns]").view("int64")))
+    lengths = np.array([pd.Timedelta(length).value for length, _ in FREQUENCIES.values()], dtype="float64")
+
+    # A gap is closer to the shorter of two neighbouring lengths below their geometric mean
+    return np.searchsorted(np.sqrt(lengths[:-1] * lengths[1:]), gaps, side="left")
+
+
+def frequency_from_counts(counts):
+    """
+    Pick the frequency of a series from the number of its gaps in every spacing class.
+
+    The frequency is that of a low percentile of the gaps, as weekends,
+    holidays and missing bars only widen gaps. The counts of consecutive
+    stretches of a series add up, so the frequency of any range can be read
+    from cumulative counts, see range_index.py and streaming.py.
+
+    Args:
+        counts (np.ndarray): Gaps per spacing class, see spacing_classes.
+
+    Returns:
+        str: The alias of FREQUENCIES.
+    """
+    counts = [int(count) for count in counts]
+    total = sum(counts)
+    if total < 1:
+        raise ValueError("At least two dates are needed to infer a frequency.")
+
+    # The gap at the SPACING_PERCENTILE, counted from the shortest
+    rank = SPACING_PERCENTILE * (total - 1) // 100
+    for alias, count in zip(FREQUENCIES, counts):
+        rank -= count
+        if rank < 0:
+            return alias
+
+
+def infer_frequency(dates):
+    """
+    Infer the native frequency of a series from the spacing of its dates.
+
+    Args:
+        dates (pd.DatetimeIndex or np.ndarray): Dates of the series, in either order.
+
+    Returns:
+        str: The alias of FREQUENCIES whose nominal length is closest to the typical spacing.
+    """
+    if len(dates) < 2:
+        raise ValueError("At least two dates are needed to infer a frequency.")
+    return frequency_from_counts(np.bincount(spacing_classes(dates), minlength=len(FREQUENCIES)))
+
+
+def periods_per_year(frequency):
+    """
+    Number of periods of a frequency in a year.
+
+    Args:
+        frequency (str): A pandas offset alias.
+
+    Returns:
+        int: Periods per year.
+    """
+    return FREQUENCIES[canonical_frequency(frequency)][1]
+
+
+def ewma_decay(frequency):
+    """
+    Decay factor of an exponentially weighted variance of data of a frequency.
+
+    Args:
+        frequency (str): A pandas offset alias.
+
+    Returns:
+        float: The decay factor, see EWMA_DECAYS.
+    """
+    return EWMA_DECAYS[canonical_frequency(frequency)]
+
+
+def annualization_factor(dates):
+    """
+    Factor turning a per-period standard deviation into an annual one.
+
+    Args:
+        dates (pd.DatetimeIndex or np.ndarray): Dates of the series.
+
+    Returns:
+        float: Square root of the periods per year of the series' frequency.
+    """
+    return np.sqrt(periods_per_year(infer_frequency(dates)))
+
+
+def horizon_periods(horizon, frequency):
+    """
+    Convert a VaR horizon to a number of periods of a frequency.
+
+    Args:
+        horizon (int or str): Number of periods, or a duration as offset alias, e.g. "10D", "1W" or "1MS".
+        frequency (str): Frequency of the series.
+
+    Returns:
+        int: Number of periods, rounded to a whole number and at least one.
+    """
+    if isinstance(horizon, (int, np.integer)):
+        periods = float(horizon)
+    else:
+        offset = pd.tseries.frequencies.to_offset(horizon)
+        periods = offset.n * periods_per_year(frequency) / periods_per_year(offset.base.freqstr)
+
+    # Durations are converted through the periods per year, e.g. a week of business days is 252 / 52 = 4.85 ~ 5
+    if round(periods) < 1:
+        raise ValueError(f"The horizon {horizon} is shorter than one period of {frequency} data.")
+    return int(round(periods))
+
+
+def _check_downsampling(index, frequency):
+    native = infer_frequency(index)
+    if periods_per_year(frequency) > periods_per_year(native):
+        raise ValueError(f"Cannot resample {native} data to the finer frequency {frequency}.")
+
+
+def resample_prices(panel, frequency):
+    """
+    Resample a price panel to a coarser frequency, keeping the last price of every period.
+
+    Args:
+        panel (pd.DataFrame): Date-indexed price panel sorted by date.
+        frequency (str): Target frequency, a pandas offset alias.
+
+    Returns:
+        pd.DataFrame: The panel at the target frequency, periods without any price dropped.
+    """
+    if len(panel) < 2:
+        return panel
+    _check_downsampling(panel.index, frequency)
+    return panel.resample(frequency).last().dropna(how="all")
+
+
+def resample_ohlc(df, frequency):
+    """
+    Resample OHLC bars, e.g. a dataset read with schema.read_raw, to a coarser frequency.
+
+    Args:
+        df (pd.DataFrame): Bars with a Date column, in either order.
+        frequency (str): Target frequency, a pandas offset alias.
+
+    Returns:
+        pd.DataFrame: Chronologically sorted bars with Date, Open, High, Low, Price and Vol. columns.
+    """
+    df = df.sort_values("Date")
+    if len(df) >= 2:
+        _check_downsampling(df["Date"], frequency)
+
+    resampler = df.resample(frequency, on="Date")
+    bars = resampler.agg({column: how for column, how in OHLC_AGGREGATION.items() if column in df})
+    if "Vol." in df:
+        # Bars without any reported volume stay empty instead of summing to zero
+        bars["Vol."] = resampler["Vol."].sum(min_count=1)
+    bars = bars.dropna(subset=["Price"])
+
+    # Change % between the closes of consecutive bars
+    bars["Change %"] = bars["Price"].pct_change() * 100
+    return bars.reset_index()
@@ -0,0 +1,189 @@
+import threading
+import logging
+from collections import OrderedDict
+
+
+from scripts.panel import load_panel
+from scripts.cross_rates import BASE_CURRENCY, base_panel
+from scripts.metrics import METRICS, compute_metrics, date_window
+from scripts.range_index import prefix_index
+from scripts.drawdown_index import drawdown_index
+from scripts.instrumentation import stage, timed
+from scripts.result_store import data_version, metric_params, result_store
+from scripts.lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+"""
+Memoized metric results for the interactive notebook.
+
+Results are cached per (metric, START, END, confidence_level, base currency,
+data version),
+where the data version is derived from the processed files' names, sizes and
+modification times. Rerunning clean_data therefore changes the key, and stale
+results are never served; they simply age out of the least recently used
+cache.
+
+Behind the in-memory cache sits the persistent result store: results missing
+from memory are read from it before being computed, and computed results are
+written to it, so they survive the process and are shared with the report
+generator and other readers.
+"""
+
+# Maximum number of cached results, enough for a full warm-up of 2000-2024
+CACHE_SIZE = 2048
+
+_CACHE = OrderedDict()
+_LOCK = threading.Lock()
+
+
+def _cache_key(metric, START, END, confidence_level, version, horizon=1, base=BASE_CURRENCY):
+    # The confidence level and the horizon only matter for VaR
+    if metric != "var":
+        confidence_level, horizon = None, None
+    return (metric, START, END, confidence_level, horizon, base, version)
+
+
+@timed
+def compute_metric(metric, START, END, confidence_level=0.95, panel=None, horizon=1, base=BASE_CURRENCY):
+    """
+    Compute a single metric over a date range and return it as a dictionary.
+
+    Depreciation and volatility are answered from the prefix-sum index and the
+    maximum drawdown from the drawdown index. VaR is computed on the rows
+    within the range.
+
+    Args:
+        metric (str): One of METRICS.
+        START (int or date-like): Start year or date.
+        END (int or date-like): End year or date.
+        confidence_level (float): The confidence level for VaR calculation.
+        panel (pd.DataFrame): Price panel, defaults to the shared processed panel.
+        horizon (int or str): VaR holding period, see resample.horizon_periods.
+        base (str): Base currency, the pairs of the panel are triangulated to it, see cross_rates.py.
+
+    Returns:
+        dict: Currencies and their metric values, currencies without data are left out.
+    """
+    panel = base_panel(base, panel)
+
+    if metric in ("depreciation", "volatility"):
+        with stage("compute", rows=len(panel)):
+            values = getattr(prefix_index(panel), metric)(START, END)
+        results = pd.Series(values, index=panel.columns)
+    elif metric == "maximum_drawdown":
+        with stage("compute", rows=len(panel)):
+            values = drawdown_index(panel).maximum_drawdown(START, END)
+        results = pd.Series(values, index=panel.columns)
+    else:
+        with stage("filter") as record:
+            window = date_window(panel, START, END)
+            record.rows = len(window)
+        with stage("compute", rows=len(window)):
+            results = compute_metrics(window, confidence_level, [metric], horizon=horizon)[metric]
+
+    return results.dropna().to_dict()
+
+
+def _store(key, results):
+    with _LOCK:
+        _CACHE[key] = results
+        _CACHE.move_to_end(key)
+        while len(_CACHE) > CACHE_SIZE:
+            _CACHE.popitem(last=False)
+
+
+def cached_metric(metric, START, END, confidence_level=0.95, horizon=1, base=BASE_CURRENCY, version=None,
+                  persist=True):
+    """
+    Return a metric over a date range, computing it only if it is neither cached nor stored yet.
+
+    Args:
+        metric (str): One of METRICS.
+        START (int or date-like): Start year or date.
+        END (int or date-like): End year or date.
+        confidence_level (float): The confidence level for VaR calculation.
+        horizon (int or str): VaR holding period, see resample.horizon_periods.
+        base (str): Base currency, e.g. "EUR" for the risk of holding each currency for a euro resident.
+        version (str): Data version, looked up if None, see result_store.data_version.
+        persist (bool): Write computed results to the result store, False keeps them in memory only.
+
+    Returns:
+        dict: Currencies and their metric values.
+    """
+    if version is None:
+        version = data_version()
+    key = _cache_key(metric, START, END, confidence_level, version, horizon, base)
+
+    with _LOCK:
+        results = _CACHE.get(key)
+        if results is not None:
+            _CACHE.move_to_end(key)
+            return dict(results)
+
+    params = metric_params(metric, confidence_level, horizon, base)
+    results = result_store().get(metric, START, END, params, version)
+    if results is None:
+        results = compute_metric(metric, START, END, confidence_level, horizon=horizon, base=base)
+        if persist:
+            result_store().put(metric, START, END, results, params, version)
+    _store(key, results)
+    return dict(results)
+
+
+def clear_cache():
+    """
+    Drop all cached results.
+    """
+    with _LOCK:
+        _CACHE.clear()
+
+
+def _warm_up(start, end, confidence_level):
+    version = data_version()
+    store = result_store()
+    panel = None
+
+    for START in range(start, end + 1):
+        for END in range(START, end + 1):
+            # Read stored results, compute all metrics of a year range at once if any is missing
+            params = {metric: metric_params(metric, confidence_level) for metric in METRICS}
+            stored = {metric: store.get(metric, START, END, params[metric], version) for metric in METRICS}
+            if any(results is None for results in stored.values()):
+                if panel is None:
+                    panel = load_panel()
+                computed = compute_metrics(date_window(panel, START, END), confidence_level)
+                for metric in METRICS:
+                    stored[metric] = computed[metric].dropna().to_dict()
+                    store.put(metric, START, END, stored[metric], params[metric], version, flush=False)
+
+            for metric in METRICS:
+                _store(_cache_key(metric, START, END, confidence_level, version), stored[metric])
+
+    store.flush()
+
+    logger.info(f"Cached all metrics for the year ranges between {start} and {end}")
+
+
+def warm_up(start=2000, end=2024, confidence_level=0.95, background=True):
+    """
+    Precompute every metric for every year range between start and end.
+
+    Args:
+        start (int): First year.
+        end (int): Last year.
+        confidence_level (float): The confidence level for VaR calculation.
+        background (bool): Run in a daemon thread instead of blocking.
+
+    Returns:
+        threading.Thread: The warm-up thread, or None if it ran in the foreground.
+    """
+    if not background:
+        _warm_up(start, end, confidence_level)
+        return None
+
+    thread = threading.Thread(target=_warm_up, args=(start, end, confidence_level), daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,554 @@
+import os
+import sys
+import json
+import time
+import atexit
+import hashlib
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from multiprocessing import util
+import logging
+
+try:
+    import fcntl
+except ImportError:  # Windows, the store is then only safe within one process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Add the project root to sys.path when run as a script
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if __package__ in (None, ""):
+    sys.path.append(str(PROJECT_ROOT))
+
+from config import RESULTS_DIR
+from scripts.panel import panel_signature
+from scripts.metrics import window_bounds
+from scripts.lazy import lazy_import
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+"""
+Persistent table of computed metric results.
+
+Every result is one row (currency, metric, start, end, params, value,
+version), where version identifies the processed data it was computed from.
+The table is stored column by column in a single .npz file: dates as int64
+epoch nanoseconds, values as float64 and the text columns dictionary-encoded
+as integer codes. Rows are sorted by (version, metric, params, start, end,
+currency), so the results of one metric and window are contiguous.
+
+On load two indexes are built: one mapping (version, metric, params, start,
+end) to its rows, answering get() without a scan, and one holding the rows of
+every currency. Readers reload the table only when it changed.
+
+put() queues results, which get() serves right away, and a background flush
+writes everything queued within FLUSH_DELAY seconds as a small segment file
+next to the table; whatever is still queued is written when the process, or
+a multiprocessing worker, exits. Once there are more than MAX_SEGMENTS
+segments they are merged into the table. A later result replaces all rows of
+its (version, metric, params, start, end) key.
+
+Writers hold an exclusive lock on a lock file next to the table and readers a
+shared one, so any number of processes can read and write the store at once.
+Results of older data versions stay in the table until prune() drops them,
+which clean_data does after writing new processed data.
+"""
+
+RESULTS_PATH = RESULTS_DIR / "results.npz"
+
+# Seconds between a put() and the background flush writing it
+FLUSH_DELAY = 1.0
+
+# Segment files merged into the table once there are more of them
+MAX_SEGMENTS = 32
+
+# Columns of the decoded table
+_COLUMNS = ["currency", "metric", "start", "end", "params", "value", "version"]
+
+# Text columns, stored as codes into a sorted dictionary of their values
+_ENCODED = ["currency", "metric", "params", "version"]
+
+# Sort order of the rows, the group key is everything but the currency
+_SORT_ORDER = ["version", "metric", "params", "start", "end", "currency"]
+
+# Whether a larger value means more risk, used to rank currencies
+RISKIER_IS_HIGHER = {
+    "depreciation": True,
+    "volatility": True,
+    "var": False,
+    "maximum_drawdown": False,
+}
+
+
+def data_version():
+    """
+    Identify the current state of the processed data.
+
+    Returns:
+        str: A short hash of the processed files' signature.
+    """
+    return hashlib.sha256(repr(panel_signature()).encode()).hexdigest()[:16]
+
+
+def metric_params(metric, confidence_level=0.95, horizon=1, base="CHF"):
+    """
+    Canonical text of the parameters a metric depends on.
+
+    Args:
+        metric (str): One of METRICS.
+        confidence_level (float): The confidence level for VaR calculation.
+        horizon (int or str): VaR holding period, left out if it is the default of one period.
+        base (str): Base currency of the pairs, left out for CHF, see cross_rates.py.
+
+    Returns:
+        str: The parameters as JSON with sorted keys, "{}" if there are none.
+    """
+    params = {}
+    if metric == "var":
+        params["confidence_level"] = confidence_level
+        if horizon != 1:
+            params["horizon"] = horizon
+    if base != "CHF":
+        params["base"] = base
+    return json.dumps(params, sort_keys=True)
+
+
+def _window_key(START, END):
+    start, end = window_bounds(START, END)
+    return start.value, end.value
+
+
+class ResultStore:
+    """
+    Columnar store of metric results, see the module docstring.
+    """
+
+    def __init__(self, path=RESULTS_PATH):
+        self.path = Path(path)
+        self.segments_dir = self.path.with_name(self.path.stem + "_segments")
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self._lock = threading.RLock()
+        self._signature = None
+        self._columns = None
+        self._dictionaries = None
+        self._groups = {}
+        self._currency_rows = {}
+        self._pending = []
+        self._timer = None
+
+    def _segments(self):
+        # File names start with the time they were written at
+        return sorted(self.segments_dir.glob("*.npz"))
+
+    def _file_signature(self):
+        signature = []
+        for path in [self.path, *self._segments()]:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            signature.append((path.name, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature) or None
+
+    def _read_table(self):
+        """
+        Decode the table and the segments written since, later results replacing earlier ones.
+
+        Called with the file lock held.
+        """
+        table = None
+        for path in [self.path, *self._segments()]:
+            try:
+                with np.load(path) as arrays:
+                    frame = _decode(arrays)
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Ignoring unreadable result file {path}: {e}")
+                continue
+            table = frame if table is None else _replace(table, frame)
+        return _decode(_empty_arrays()) if table is None else table
+
+    def _refresh(self):
+        """
+        Load the table and rebuild the indexes if any file changed since the last load.
+        """
+        signature = self._file_signature()
+        if signature == self._signature and self._columns is not None:
+            return
+
+        arrays = _empty_arrays()
+        if signature is not None:
+            with _file_lock(self.lock_path, shared=True):
+                signature = self._file_signature()
+                arrays = _encode(self._read_table())
+        columns = {name: arrays[name] for name in _empty_columns()}
+        dictionaries = {name: arrays[f"{name}_values"].tolist() for name in _ENCODED}
+
+        # Boundaries of the groups of rows sharing everything but the currency
+        groups = {}
+        n = len(columns["value"])
+        if n:
+            key_columns = [columns[name] for name in _SORT_ORDER[:-1]]
+            change = np.zeros(n, dtype=bool)
+            change[0] = True
+            for column in key_columns:
+                change[1:] |= column[1:] != column[:-1]
+            starts = np.flatnonzero(change)
+            ends = np.append(starts[1:], n)
+            for first, last in zip(starts.tolist(), ends.tolist()):
+                key = tuple(column[first].item() for column in key_columns)
+                groups[key] = (first, last)
+
+        # Rows of every currency, in table order
+        order = np.argsort(columns["currency"], kind="stable")
+        codes, counts = np.unique(columns["currency"][order], return_counts=True)
+        currency_rows = dict(zip(codes.tolist(), np.split(order, np.cumsum(counts)[:-1]))) if n else {}
+
+        self._signature = signature
+        self._columns, self._dictionaries = columns, dictionaries
+        self._groups, self._currency_rows = groups, currency_rows
+
+    def _code(self, name, value):
+        try:
+            return self._dictionaries[name].index(value)
+        except ValueError:
+            return None
+
+    def get(self, metric, START, END, params="{}", version=None):
+        """
+        Return the stored result of a metric over a date range.
+
+        Args:
+            metric (str): One of METRICS.
+            START (int or date-like): Start year or date.
+            END (int or date-like): End year or date.
+            params (str): Parameters of the metric, see metric_params.
+            version (str): Data version, defaults to the current one.
+
+        Returns:
+            dict: Currencies and their values, or None if the result is not stored.
+        """
+        version = version or data_version()
+        start, end = _window_key(START, END)
+        with self._lock:
+            # The latest queued result wins over the table
+            for entry in reversed(self._pending):
+                if entry[:5] == (metric, start, end, params, version):
+                    return dict(entry[5])
+
+            self._refresh()
+            codes = [self._code(name, value) for name, value in zip(_ENCODED[1:], (metric, params, version))]
+            if None in codes:
+                return None
+            metric_code, params_code, version_code = codes
+
+            rows = self._groups.get((version_code, metric_code, params_code, start, end))
+            if rows is None:
+                return None
+            first, last = rows
+            currencies = self._dictionaries["currency"]
+            return dict(zip(
+                (currencies[code] for code in self._columns["currency"][first:last].tolist()),
+                self._columns["value"][first:last].tolist(),
+            ))
+
+    def put(self, metric, START, END, results, params="{}", version=None, flush=False):
+        """
+        Store the result of a metric over a date range, replacing an earlier one.
+
+        Args:
+            metric (str): One of METRICS.
+            START (int or date-like): Start year or date.
+            END (int or date-like): End year or date.
+            results (dict): Currencies and their values.
+            params (str): Parameters of the metric, see metric_params.
+            version (str): Data version, defaults to the current one.
+            flush (bool): Write to disk now, otherwise with the next background flush. Code that
+                puts results in worker processes should flush before the worker returns.
+        """
+        start, end = _window_key(START, END)
+        version = version or data_version()
+        with self._lock:
+            self._pending.append((metric, start, end, params, version, dict(results)))
+            if flush:
+                self.flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(FLUSH_DELAY, self._background_flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """
+        Write the pending results as a new segment, merging the segments into the table if there are too many.
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return
+
+            # Only the last pending result of every key counts
+            pending = {entry[:5]: entry[5] for entry in self._pending}
+            rows = [
+                (currency, metric, start, end, params, value, version)
+                for (metric, start, end, params, version), results in pending.items()
+                for currency, value in results.items()
+            ]
+            new = pd.DataFrame(rows, columns=_COLUMNS)
+
+            if len(new):
+                with _file_lock(self.lock_path):
+                    _write(self.segments_dir / f"{time.time_ns():020d}-{os.getpid()}.npz", _encode(new))
+                    if len(self._segments()) > MAX_SEGMENTS:
+                        self._compact()
+
+            self._pending.clear()
+            self._signature = None
+
+    def _compact(self, version=None):
+        """
+        Merge the segments into the table, keeping only the rows of a data version if given.
+
+        Called with the file lock held.
+        """
+        segments = self._segments()
+        table = self._read_table()
+        if version is not None:
+            table = table[table["version"] == version]
+        _write(self.path, _encode(table))
+        for path in segments:
+            path.unlink(missing_ok=True)
+
+    def prune(self, version=None):
+        """
+        Drop the results of every data version but one, e.g. after the processed data changed.
+
+        Args:
+            version (str): Data version to keep, defaults to the current one.
+        """
+        version = version or data_version()
+        with self._lock:
+            self._pending = [entry for entry in self._pending if entry[4] == version]
+            if self._file_signature() is not None:
+                with _file_lock(self.lock_path):
+                    self._compact(version)
+            self._signature = None
+
+    def _background_flush(self):
+        try:
+            self.flush()
+        except Exception as e:
+            logger.warning(f"Could not write the result store {self.path}: {e}")
+
+    def _frame(self, rows=None):
+        """
+        Decode the table, or some of its rows, to a DataFrame with text columns.
+        """
+        frame = {}
+        for name in _COLUMNS:
+            column = self._columns[name] if rows is None else self._columns[name][rows]
+            if name in _ENCODED:
+                column = np.asarray(self._dictionaries[name], dtype=object)[column] if len(column) else column.astype(object)
+            frame[name] = column
+        return pd.DataFrame(frame)
+
+    def query(self, currency=None, metric=None, START=None, END=None, version=None):
+        """
+        Select stored results, e.g. every VaR of the Japanese Yen across all windows.
+
+        Args:
+            currency (str): Currency column, e.g. "CHF_JPY Historical Data", all if None.
+            metric (str): One of METRICS, all if None.
+            START (int or date-like): Start year or date of the window, all if None.
+            END (int or date-like): End year or date of the window, all if None.
+            version (str): Data version, defaults to the current one, "all" for every stored version.
+
+        Returns:
+            pd.DataFrame: One row per result, with start and end as timestamps.
+        """
+        version = version or data_version()
+        with self._lock:
+            # Queued results are only in the table once written
+            self.flush()
+            self._refresh()
+            columns = self._columns
+
+            if currency is None:
+                rows = np.arange(len(columns["value"]))
+            else:
+                code = self._code("currency", currency)
+                rows = self._currency_rows.get(code, np.empty(0, dtype="int64"))
+
+            conditions = [("metric", metric), ("version", None if version == "all" else version)]
+            for name, value in conditions:
+                if value is not None:
+                    rows = rows[columns[name][rows] == self._code(name, value)]
+            if START is not None:
+                rows = rows[columns["start"][rows] == _window_key(START, START)[0]]
+            if END is not None:
+                rows = rows[columns["end"][rows] == _window_key(END, END)[1]]
+
+            frame = self._frame(rows)
+
+        frame["start"] = pd.to_datetime(frame["start"])
+        frame["end"] = pd.to_datetime(frame["end"])
+        return frame
+
+    def top(self, metric, START, END, n=5, params="{}", version=None):
+        """
+        Rank the riskiest currencies of a stored result.
+
+        Args:
+            metric (str): One of METRICS.
+            START (int or date-like): Start year or date.
+            END (int or date-like): End year or date.
+            n (int): Number of currencies.
+            params (str): Parameters of the metric, see metric_params.
+            version (str): Data version, defaults to the current one.
+
+        Returns:
+            pd.Series: The n riskiest currencies and their values, riskiest first, or None if not stored.
+        """
+        results = self.get(metric, START, END, params, version)
+        if results is None:
+            return None
+        series = pd.Series(results, dtype="float64")
+        return series.sort_values(ascending=not RISKIER_IS_HIGHER[metric]).head(n)
+
+
+def _encode(table):
+    """
+    Encode a decoded table to the sorted, dictionary-encoded arrays of a result file.
+    """
+    arrays = {}
+    for name in _ENCODED:
+        codes, values = pd.factorize(table[name], sort=True)
+        arrays[name] = codes.astype("int32")
+        arrays[f"{name}_values"] = np.asarray(values, dtype=str)
+    arrays["start"] = table["start"].to_numpy(dtype="int64")
+    arrays["end"] = table["end"].to_numpy(dtype="int64")
+    arrays["value"] = table["value"].to_numpy(dtype="float64")
+
+    order = np.lexsort([arrays[name] for name in reversed(_SORT_ORDER)])
+    for name in _empty_columns():
+        arrays[name] = arrays[name][order]
+    return arrays
+
+
+def _decode(arrays):
+    """
+    Decode the arrays of a result file to a table with text columns.
+    """
+    frame = {}
+    for name in _COLUMNS:
+        column = arrays[name]
+        if name in _ENCODED:
+            column = np.asarray(arrays[f"{name}_values"].tolist(), dtype=object)[column] if len(column) else column.astype(object)
+        frame[name] = column
+    return pd.DataFrame(frame)
+
+
+def _replace(table, new):
+    """
+    Replace all rows of the keys of the new results, later results win over earlier ones.
+    """
+    group = _SORT_ORDER[:-1]
+    replaced = pd.MultiIndex.from_frame(table[group]).isin(pd.MultiIndex.from_frame(new[group]))
+    frames = [frame for frame in (table[~replaced], new) if len(frame)]
+    table = pd.concat(frames, ignore_index=True) if frames else new
+    return table.drop_duplicates(subset=_SORT_ORDER, keep="last")
+
+
+def _write(path, arrays):
+    """
+    Write a result file next to its target and swap it in, so readers never see a partial file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def _file_lock(path, shared=False):
+    """
+    Hold an advisory lock on a file, shared between readers or exclusive for a writer, across processes.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        # Closing the file releases the lock
+        yield
+
+
+def _empty_columns():
+    return {
+        "currency": np.empty(0, dtype="int32"),
+        "metric": np.empty(0, dtype="int32"),
+        "start": np.empty(0, dtype="int64"),
+        "end": np.empty(0, dtype="int64"),
+        "params": np.empty(0, dtype="int32"),
+        "value": np.empty(0, dtype="float64"),
+        "version": np.empty(0, dtype="int32"),
+    }
+
+
+def _empty_arrays():
+    arrays = _empty_columns()
+    arrays.update({f"{name}_values": np.empty(0, dtype=str) for name in _ENCODED})
+    return arrays
+
+
+# Shared stores, keyed by file
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+
+def _flush_stores():
+    with _STORES_LOCK:
+        stores = list(_STORES.values())
+    for store in stores:
+        try:
+            store.flush()
+        except Exception as e:
+            logger.warning(f"Could not write the result store {store.path}: {e}")
+
+
+def _after_fork(store):
+    # The parent writes its own pending results, and the flush timer did not survive the fork
+    store._lock = threading.RLock()
+    store._pending = []
+    store._timer = None
+    util.Finalize(store, _flush_stores, exitpriority=10)
+
+
+# Write what is still queued when the process exits
+atexit.register(_flush_stores)
+
+
+def result_store(path=RESULTS_PATH):
+    """
+    Return the shared store of a results file.
+
+    Args:
+        path (Path): The results file.
+
+    Returns:
+        ResultStore: The store, created on first use.
+    """
+    key = Path(path).resolve()
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = _STORES[key] = ResultStore(key)
+            # Multiprocessing workers do not run atexit handlers but the finalizers of multiprocessing.util
+            util.Finalize(store, _flush_stores, exitpriority=10)
+            util.register_after_fork(store, _after_fork)
+        return store
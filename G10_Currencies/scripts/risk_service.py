@@ -0,0 +1,397 @@
+import sys
+import json
+import time
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+import typer
+from loguru import logger
+
+# Add the project root to sys.path when run as a script
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if __package__ in (None, ""):
+    sys.path.append(str(PROJECT_ROOT))
+
+from scripts.panel import load_panel
+from scripts.cross_rates import BASE_CURRENCY, base_panel, split_pair
+from scripts.metrics import METRICS, date_positions
+from scripts.range_index import prefix_index
+from scripts.drawdown_index import drawdown_index
+from scripts.correlation import calculate_correlation, portfolio_risk
+from scripts.result_cache import cached_metric, data_version
+from scripts.instrumentation import prometheus_text
+from scripts.lazy import lazy_import
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+"""
+HTTP service answering metric and exchange rate queries from memory.
+
+The price panel and its range indexes are loaded once at startup; requests
+are answered by the cached metric engine (see result_cache.py) and the
+encoded responses are kept in a least recently used cache, keyed by the data
+version so that rerunning clean_data never serves stale bodies. The data
+version is looked up at most once per VERSION_TTL seconds, and only metrics
+of whole-year ranges at the usual confidence levels are written to the
+persistent result store, the arbitrary dates and levels of ad-hoc queries
+stay in memory.
+
+- GET /metrics                      names of the metrics
+- GET /metrics/<name>?start=&end=&confidence=&horizon=&base=
+                                    the metric of every currency, start and end
+                                    are years or ISO dates, base the home
+                                    currency of the resident (CHF by default)
+- GET /correlation?start=&end=&method=&base=
+                                    correlation matrix of the pairs, method is
+                                    sample (default) or ewma
+- GET /portfolio-var?start=&end=&weights=&confidence=&method=&base=
+                                    parametric VaR of a portfolio of the pairs
+                                    and every pair's contribution, weights as
+                                    CHF_USD:0.6,CHF_EUR:0.4 (equal by default)
+- GET /pairs?base=                  names of the pairs of a base currency
+- GET /rates/<pair>?start=&end=     dates and prices of a pair, e.g. CHF_USD or
+                                    the cross EUR_USD
+- GET /stats                        stage timings in the Prometheus text format
+- GET /health                       data version and number of pairs
+
+Responses are JSON. With ?format=arrow, or an Accept header asking for
+application/vnd.apache.arrow.stream, tables are sent as an Arrow IPC stream
+if pyarrow is installed.
+"""
+
+ARROW_CONTENT_TYPE = "application/vnd.apache.arrow.stream"
+
+# Maximum number of cached response bodies
+RESPONSE_CACHE_SIZE = 4096
+
+# Seconds a data version is reused before the processed files are listed again
+VERSION_TTL = 1.0
+
+# VaR confidence levels whose results are stored, see metric_response
+PERSISTED_CONFIDENCE_LEVELS = (0.95, 0.99)
+
+_VERSION = [None, 0.0]
+_VERSION_LOCK = threading.Lock()
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def current_version():
+    """
+    The data version, listing the processed files at most once per VERSION_TTL seconds.
+
+    Returns:
+        str: See result_store.data_version.
+    """
+    now = time.monotonic()
+    with _VERSION_LOCK:
+        if _VERSION[0] is None or now - _VERSION[1] > VERSION_TTL:
+            _VERSION[:] = [data_version(), now]
+        return _VERSION[0]
+
+
+def _bound(value, name):
+    # A year or an ISO date
+    if value is None:
+        raise HTTPError(400, f"Missing query parameter: {name}")
+    try:
+        return int(value) if value.isdigit() else pd.Timestamp(value)
+    except ValueError:
+        raise HTTPError(400, f"Invalid {name}: {value}")
+
+
+def _base_panel(base):
+    try:
+        return base_panel(base)
+    except ValueError as e:
+        raise HTTPError(404, str(e))
+
+
+def _pair_column(panel, pair):
+    for column in (pair, f"{pair} Historical Data"):
+        if column in panel.columns:
+            return column
+    raise HTTPError(404, f"Unknown pair: {pair}")
+
+
+def _arrow_table(columns):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise HTTPError(406, "Arrow responses need pyarrow, which is not installed.")
+
+    sink = pa.BufferOutputStream()
+    table = pa.table(columns)
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def metric_response(name, query, arrow=False):
+    """
+    Compute the body of a /metrics/<name> request.
+
+    Returns:
+        tuple: (content type, body).
+    """
+    if name not in METRICS:
+        raise HTTPError(404, f"Unknown metric: {name}")
+    START = _bound(query.get("start"), "start")
+    END = _bound(query.get("end"), "end")
+    try:
+        confidence_level = float(query.get("confidence", 0.95))
+        horizon = query.get("horizon", "1")
+        horizon = int(horizon) if horizon.isdigit() else horizon
+        base = query.get("base", BASE_CURRENCY)
+        _base_panel(base)
+        persist = (isinstance(START, int) and isinstance(END, int)
+                   and (name != "var" or (horizon == 1 and confidence_level in PERSISTED_CONFIDENCE_LEVELS)))
+        results = cached_metric(name, START, END, confidence_level, horizon, base, current_version(), persist)
+    except ValueError as e:
+        raise HTTPError(400, str(e))
+
+    if arrow:
+        return ARROW_CONTENT_TYPE, _arrow_table({
+            "currency": list(results), name: np.fromiter(results.values(), dtype="float64", count=len(results)),
+        })
+    payload = {"metric": name, "start": str(START), "end": str(END), "base": base, "results": results}
+    if name == "var":
+        payload.update(confidence_level=confidence_level, horizon=horizon)
+    return "application/json", json.dumps(payload).encode()
+
+
+def _weights(value, panel):
+    # "CHF_USD:0.6,CHF_EUR:0.4", keyed by the panel's column names
+    weights = {}
+    for item in value.split(","):
+        pair, _, weight = item.partition(":")
+        try:
+            weights[_pair_column(panel, pair.strip())] = float(weight)
+        except ValueError:
+            raise HTTPError(400, f"Invalid weight: {item}")
+    return weights
+
+
+def correlation_response(query, arrow=False):
+    """
+    Compute the body of a /correlation request.
+
+    Returns:
+        tuple: (content type, body).
+    """
+    START = _bound(query.get("start"), "start")
+    END = _bound(query.get("end"), "end")
+    base = query.get("base", BASE_CURRENCY)
+    panel = _base_panel(base)
+    try:
+        correlation = calculate_correlation(START, END, query.get("method", "sample"), panel=panel)
+    except ValueError as e:
+        raise HTTPError(400, str(e))
+
+    currencies = list(correlation.columns)
+    if arrow:
+        columns = {"currency": currencies}
+        columns.update((currency, correlation[currency].to_numpy()) for currency in currencies)
+        return ARROW_CONTENT_TYPE, _arrow_table(columns)
+    # JSON has no NaN, the correlation of a pair without variance is null
+    matrix = [[None if np.isnan(value) else value for value in row] for row in correlation.to_numpy().tolist()]
+    payload = {"start": str(START), "end": str(END), "base": base, "currencies": currencies, "correlation": matrix}
+    return "application/json", json.dumps(payload).encode()
+
+
+def portfolio_var_response(query, arrow=False):
+    """
+    Compute the body of a /portfolio-var request.
+
+    Returns:
+        tuple: (content type, body).
+    """
+    START = _bound(query.get("start"), "start")
+    END = _bound(query.get("end"), "end")
+    base = query.get("base", BASE_CURRENCY)
+    panel = _base_panel(base)
+    weights = _weights(query["weights"], panel) if "weights" in query else None
+    try:
+        confidence_level = float(query.get("confidence", 0.95))
+        results = portfolio_risk(panel, START, END, weights, confidence_level, query.get("method", "sample"))
+    except ValueError as e:
+        raise HTTPError(400, str(e))
+    if results is None:
+        raise HTTPError(404, f"Not enough common dates between {START} and {END}")
+
+    if arrow:
+        return ARROW_CONTENT_TYPE, _arrow_table({
+            "currency": list(results), "var": np.fromiter(results.values(), dtype="float64", count=len(results)),
+        })
+    payload = {
+        "start": str(START), "end": str(END), "base": base, "confidence_level": confidence_level,
+        "results": {name: float(value) for name, value in results.items()},
+    }
+    return "application/json", json.dumps(payload).encode()
+
+
+def rates_response(pair, query, arrow=False):
+    """
+    Compute the body of a /rates/<pair> request.
+
+    Returns:
+        tuple: (content type, body).
+    """
+    # Crosses are answered from the panel of their base currency
+    try:
+        base, _ = split_pair(pair)
+    except ValueError:
+        raise HTTPError(404, f"Unknown pair: {pair}")
+    panel = _base_panel(base)
+    column = _pair_column(panel, pair)
+
+    # Slice the in-memory arrays by binary search instead of filtering the frame
+    index = prefix_index(panel)
+    first, last = 0, len(index.dates) - 1
+    if "start" in query or "end" in query:
+        first, last = date_positions(
+            index.dates,
+            _bound(query.get("start", "1900"), "start"),
+            _bound(query.get("end", "2200"), "end"),
+        )
+    prices = index.prices[first:last + 1, panel.columns.get_loc(column)]
+    dates = index.dates[first:last + 1]
+    valid = ~np.isnan(prices)
+    dates, prices = dates[valid], prices[valid]
+
+    if arrow:
+        return ARROW_CONTENT_TYPE, _arrow_table({"date": dates, "price": prices})
+    payload = {
+        "pair": column,
+        "dates": np.datetime_as_string(dates, unit="s").tolist(),
+        "prices": prices.tolist(),
+    }
+    return "application/json", json.dumps(payload).encode()
+
+
+class RiskHandler(BaseHTTPRequestHandler):
+    response_cache = OrderedDict()
+    cache_lock = threading.Lock()
+    cache_size = RESPONSE_CACHE_SIZE
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    def _send(self, status, body, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self, path, query, arrow):
+        parts = [part for part in path.split("/") if part]
+        if parts == ["health"]:
+            return "application/json", json.dumps({
+                "status": "ok", "version": current_version(), "pairs": len(load_panel().columns),
+            }).encode()
+        if parts == ["stats"]:
+            return "text/plain; version=0.0.4", prometheus_text().encode()
+        if parts == ["metrics"]:
+            return "application/json", json.dumps(METRICS).encode()
+        if parts == ["pairs"]:
+            return "application/json", json.dumps(list(_base_panel(query.get("base", BASE_CURRENCY)).columns)).encode()
+        if parts == ["correlation"]:
+            return correlation_response(query, arrow)
+        if parts == ["portfolio-var"]:
+            return portfolio_var_response(query, arrow)
+        if len(parts) == 2 and parts[0] == "metrics":
+            return metric_response(parts[1], query, arrow)
+        if len(parts) == 2 and parts[0] == "rates":
+            return rates_response(parts[1], query, arrow)
+        raise HTTPError(404, f"Not found: {path}")
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        arrow = query.pop("format", None) == "arrow" or ARROW_CONTENT_TYPE in self.headers.get("Accept", "")
+        path = unquote(url.path)
+
+        # Health and stats change without the data, everything else is cached per data version
+        cacheable = path.strip("/") not in ("health", "stats")
+        key = (current_version(), path, tuple(sorted(query.items())), arrow)
+        if cacheable:
+            with self.cache_lock:
+                cached = self.response_cache.get(key)
+                if cached is not None:
+                    self.response_cache.move_to_end(key)
+            if cached is not None:
+                self._send(200, cached[1], cached[0])
+                return
+
+        try:
+            content_type, body = self._route(path, query, arrow)
+        except HTTPError as e:
+            self._send(e.status, json.dumps({"error": str(e)}).encode())
+            return
+        except Exception as e:
+            logger.exception(f"Error answering {self.path}")
+            self._send(500, json.dumps({"error": str(e)}).encode())
+            return
+
+        if cacheable:
+            with self.cache_lock:
+                self.response_cache[key] = (content_type, body)
+                while len(self.response_cache) > self.cache_size:
+                    self.response_cache.popitem(last=False)
+        self._send(200, body, content_type)
+
+
+class RiskServer(ThreadingHTTPServer):
+    # Room for bursts of concurrent clients, the default backlog of 5 drops connections
+    request_queue_size = 128
+    daemon_threads = True
+
+
+def create_server(host="127.0.0.1", port=8000):
+    """
+    Load the data and create the service, call serve_forever() on it to start serving.
+
+    Args:
+        host (str): Address to listen on.
+        port (int): Port to listen on, 0 picks a free port.
+
+    Returns:
+        RiskServer: The server, its address is in server_address.
+    """
+    # Load the panel and build the range indexes before the first request
+    panel = load_panel()
+    prefix_index(panel)
+    drawdown_index(panel)
+
+    handler = type("ConfiguredRiskHandler", (RiskHandler,), {"response_cache": OrderedDict(), "cache_lock": threading.Lock()})
+    return RiskServer((host, port), handler)
+
+
+app = typer.Typer()
+
+
+@app.command()
+def main(
+    host: str = "127.0.0.1",  # Address to listen on
+    port: int = 8000,  # Port to listen on
+):
+    server = create_server(host, port)
+    logger.info(f"Serving {len(load_panel().columns)} pairs on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    app()
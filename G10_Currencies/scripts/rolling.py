@@ -0,0 +1,337 @@
+import heapq
+import math
+from collections import Counter
+
+from scripts.metrics import METRICS, PERIODS_PER_YEAR
+from scripts.resample import infer_frequency, periods_per_year
+from scripts.lazy import lazy_import
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+"""
+Rolling and expanding versions of the metrics.
+
+Each function takes the chronologically sorted prices of one currency and
+returns one value per date: the metric over the last `window` prices (or over
+all prices so far if window is None). Values are NaN until a window is full.
+Every series is computed incrementally in a single pass:
+
+- volatility and depreciation from running sums and first/last prices,
+- VaR from two heaps holding the lower and upper part of the window's returns,
+- maximum drawdown from a two-stack queue of (max, min, drawdown) summaries.
+"""
+
+
+def combine_drawdowns(earlier, later):
+    """
+    Combine the (max, min, drawdown) summaries of two consecutive stretches of a series.
+
+    The drawdown is the worst ratio minus one between a value and any earlier
+    peak. Combining is associative, which lets summaries be merged in any
+    grouping as long as the order of the stretches is kept.
+
+    Args:
+        earlier (tuple): Summary of the earlier stretch.
+        later (tuple): Summary of the later stretch.
+
+    Returns:
+        tuple: Summary of both stretches together.
+    """
+    return (
+        max(earlier[0], later[0]),
+        min(earlier[1], later[1]),
+        min(earlier[2], later[2], later[1] / earlier[0] - 1),
+    )
+
+
+class _DrawdownQueue:
+    """
+    FIFO queue of values that reports the maximum drawdown of its content in O(1).
+
+    Pushed values go on the back stack, whose total summary is kept up to date.
+    When the front stack runs empty the back stack is moved over, storing with
+    every element the summary of itself and all later front elements.
+    """
+
+    __slots__ = ("front", "back", "back_summary")
+
+    def __init__(self):
+        self.front = []
+        self.back = []
+        self.back_summary = None
+
+    def __len__(self):
+        return len(self.front) + len(self.back)
+
+    def push(self, value):
+        summary = (value, value, 0.0)
+        self.back.append(value)
+        self.back_summary = summary if self.back_summary is None else combine_drawdowns(self.back_summary, summary)
+
+    def pop(self):
+        if not self.front:
+            suffix = None
+            while self.back:
+                value = self.back.pop()
+                summary = (value, value, 0.0)
+                suffix = summary if suffix is None else combine_drawdowns(summary, suffix)
+                self.front.append(suffix)
+            self.back_summary = None
+        self.front.pop()
+
+    def drawdown(self):
+        if not self.front:
+            return self.back_summary[2]
+        if self.back_summary is None:
+            return self.front[-1][2]
+        return combine_drawdowns(self.front[-1], self.back_summary)[2]
+
+
+class _OrderStatistics:
+    """
+    Multiset split into two heaps: the `size` smallest values and the rest.
+
+    The largest value of the lower heap and the smallest of the upper heap are
+    the size-th and (size+1)-th order statistics. Removed values are only
+    marked and dropped once they reach the top of their heap.
+    """
+
+    __slots__ = ("low", "high", "low_size", "high_size", "removed")
+
+    def __init__(self):
+        self.low = []  # max-heap, stored negated
+        self.high = []  # min-heap
+        self.low_size = 0
+        self.high_size = 0
+        self.removed = Counter()
+
+    def _prune(self, heap, sign):
+        while heap and self.removed[sign * heap[0]]:
+            self.removed[sign * heap[0]] -= 1
+            heapq.heappop(heap)
+
+    def add(self, value):
+        if self.low_size and value <= -self.low[0]:
+            heapq.heappush(self.low, -value)
+            self.low_size += 1
+        else:
+            heapq.heappush(self.high, value)
+            self.high_size += 1
+
+    def remove(self, value):
+        self.removed[value] += 1
+        if self.low_size and value <= -self.low[0]:
+            self.low_size -= 1
+            self._prune(self.low, -1)
+        else:
+            self.high_size -= 1
+            self._prune(self.high, 1)
+
+    def rebalance(self, size):
+        """
+        Move values between the heaps until the lower heap holds `size` values.
+        """
+        while self.low_size > size:
+            heapq.heappush(self.high, -heapq.heappop(self.low))
+            self.low_size -= 1
+            self.high_size += 1
+            self._prune(self.low, -1)
+        while self.low_size < size and self.high_size:
+            heapq.heappush(self.low, -heapq.heappop(self.high))
+            self.low_size += 1
+            self.high_size -= 1
+            self._prune(self.high, 1)
+
+    def quantile(self, q):
+        """
+        Linearly interpolated quantile, as np.percentile computes it.
+        """
+        count = self.low_size + self.high_size
+        position = (count - 1) * q
+        lower = math.floor(position)
+        self.rebalance(lower + 1)
+
+        value = -self.low[0]
+        if position > lower:
+            value += (position - lower) * (self.high[0] - value)
+        return value
+
+
+def _window_starts(n, window):
+    """
+    Position of the first price of the window ending at every position.
+    """
+    if window is None:
+        return np.zeros(n, dtype="int64")
+    return np.arange(n) - window + 1
+
+
+def rolling_depreciation(prices, window=None):
+    """
+    Percentage depreciation between the first and last price of every window.
+
+    Args:
+        prices (np.ndarray): Chronologically sorted prices of one currency.
+        window (int): Number of prices per window, None for an expanding window.
+
+    Returns:
+        np.ndarray: Depreciation in percent per date.
+    """
+    n = len(prices)
+    starts = _window_starts(n, window)
+
+    result = np.full(n, np.nan)
+    full = starts >= 0
+    start_rate = prices[starts[full]]
+    result[full] = (start_rate - prices[full]) / start_rate * 100
+    return result
+
+
+def rolling_volatility(prices, window=None, periods_per_year=PERIODS_PER_YEAR):
+    """
+    Annualized standard deviation of the log returns within every window.
+
+    Args:
+        prices (np.ndarray): Chronologically sorted prices of one currency.
+        window (int): Number of prices per window, None for an expanding window.
+        periods_per_year (int): Number of prices per year, see resample.periods_per_year.
+
+    Returns:
+        np.ndarray: Annualized volatility per date.
+    """
+    n = len(prices)
+    result = np.full(n, np.nan)
+    if n < 3:
+        return result
+
+    # Centre the returns first, this keeps the running sums from losing precision
+    log_returns = np.log(prices[1:] / prices[:-1])
+    log_returns -= log_returns.mean()
+
+    # Running sums, sums[i] covers the returns of the first i + 1 prices
+    sums = np.concatenate([[0.0], np.cumsum(log_returns)])
+    squares = np.concatenate([[0.0], np.cumsum(log_returns ** 2)])
+
+    ends = np.arange(n)
+    starts = _window_starts(n, window)
+    counts = ends - starts
+
+    full = (starts >= 0) & (counts >= 2)
+    s1 = sums[ends[full]] - sums[starts[full]]
+    s2 = squares[ends[full]] - squares[starts[full]]
+    variance = np.maximum(s2 - s1 ** 2 / counts[full], 0.0) / (counts[full] - 1)
+
+    result[full] = np.sqrt(variance) * np.sqrt(periods_per_year)
+    return result
+
+
+def rolling_var(prices, window=None, confidence_level=0.95):
+    """
+    Historical Value at Risk of holding the currency within every window.
+
+    Args:
+        prices (np.ndarray): Chronologically sorted prices of one currency.
+        window (int): Number of prices per window, None for an expanding window.
+        confidence_level (float): The confidence level for VaR calculation.
+
+    Returns:
+        np.ndarray: VaR in percent per date.
+    """
+    n = len(prices)
+    result = np.full(n, np.nan)
+
+    # Returns of the CHF value (1 / Price) of the currency
+    reciprocal = 1 / prices
+    returns = reciprocal[1:] / reciprocal[:-1] - 1
+    q = 1 - confidence_level
+
+    statistics = _OrderStatistics()
+    for end in range(1, n):
+        statistics.add(returns[end - 1])
+        if window is not None and end >= window:
+            # The window lost its first price, and with it its first return
+            statistics.remove(returns[end - window])
+        if window is None or end >= window - 1:
+            result[end] = statistics.quantile(q) * 100
+
+    return result
+
+
+def rolling_maximum_drawdown(prices, window=None):
+    """
+    Maximum drawdown of the reciprocal (1 / Price) within every window.
+
+    Args:
+        prices (np.ndarray): Chronologically sorted prices of one currency.
+        window (int): Number of prices per window, None for an expanding window.
+
+    Returns:
+        np.ndarray: Maximum drawdown in percent per date.
+    """
+    n = len(prices)
+    reciprocal = 1 / prices
+
+    if window is None:
+        rolling_max = np.maximum.accumulate(reciprocal)
+        drawdown = (reciprocal - rolling_max) / rolling_max * 100
+        return np.minimum.accumulate(drawdown)
+
+    result = np.full(n, np.nan)
+    queue = _DrawdownQueue()
+    for end in range(n):
+        queue.push(reciprocal[end])
+        if len(queue) > window:
+            queue.pop()
+        if len(queue) == window:
+            result[end] = queue.drawdown() * 100
+
+    return result
+
+
+def rolling_metric(panel, metric, window=None, confidence_level=0.95):
+    """
+    Compute a rolling or expanding metric for every currency of a price panel.
+
+    Every window is annualized with the frequency of the whole panel, the
+    windows are counted in prices and meant for series of one frequency.
+
+    Args:
+        panel (pd.DataFrame): Date-indexed price panel sorted by date.
+        metric (str): One of METRICS.
+        window (int): Number of prices per window, None for an expanding window.
+        confidence_level (float): The confidence level for VaR calculation.
+
+    Returns:
+        pd.DataFrame: The metric per date (rows) and currency (columns).
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric: {metric}")
+    if window is not None and window < 2:
+        raise ValueError("The window must contain at least two prices.")
+
+    yearly = periods_per_year(infer_frequency(panel.index)) if len(panel) > 1 else PERIODS_PER_YEAR
+
+    result = pd.DataFrame(np.nan, index=panel.index, columns=panel.columns)
+    for currency in panel.columns:
+        prices = panel[currency].dropna()
+        values = prices.to_numpy(dtype="float64")
+
+        if metric == "var":
+            series = rolling_var(values, window, confidence_level)
+        elif metric == "volatility":
+            series = rolling_volatility(values, window, yearly)
+        else:
+            series = _ROLLING_FUNCTIONS[metric](values, window)
+
+        result.loc[prices.index, currency] = series
+
+    return result
+
+
+_ROLLING_FUNCTIONS = {
+    "depreciation": rolling_depreciation,
+    "volatility": rolling_volatility,
+    "var": rolling_var,
+    "maximum_drawdown": rolling_maximum_drawdown,
+}
@@ -0,0 +1,222 @@
+from datetime import datetime
+
+from scripts.lazy import lazy_import
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+"""
+Schema of the raw and processed exchange rate files.
+
+Every file is read through read_raw or read_processed, which parse each
+column with an explicit type instead of letting pandas infer it:
+
+- Date: raw files hold MM/DD/YYYY (optionally with a time), processed files
+  ISO 8601 (YYYY-MM-DD). Integer columns are taken as epoch nanoseconds, as
+  stored in the binary panel. The format is fixed, dates are parsed in one
+  vectorized pass and a value that does not match it is an error.
+- Price, Open, High, Low: float64.
+- Vol.: float64, with Investing.com's K/M/B suffixes expanded.
+- Change %: float64 in percent, "-0.92%" becomes -0.92.
+
+Dates must be strictly monotonic, in either direction, and unique; files
+violating this raise a SchemaError instead of silently producing shifted
+windows.
+"""
+
+COLUMNS = ["Date", "Price", "Open", "High", "Low", "Vol.", "Change %"]
+
+FLOAT_COLUMNS = ["Price", "Open", "High", "Low"]
+
+# Formats of the Date column of raw files, the first one matching the first date is used
+RAW_DATE_FORMATS = ["%m/%d/%Y", "%m/%d/%Y %H:%M", "%m/%d/%Y %H:%M:%S"]
+
+# Processed files are written by pandas as YYYY-MM-DD, or YYYY-MM-DD HH:MM:SS for intraday data
+PROCESSED_DATE_FORMAT = "ISO8601"
+
+_VOLUME_SUFFIXES = {"K": 1e3, "M": 1e6, "B": 1e9}
+
+
+class SchemaError(ValueError):
+    """
+    A file does not match the expected schema.
+    """
+
+
+def sniff_date_format(value, formats=RAW_DATE_FORMATS):
+    """
+    Pick the format of a date string from a list of candidates.
+
+    Args:
+        value (str): A date as written in the file.
+        formats (list): Candidate strptime formats.
+
+    Returns:
+        str: The first format that parses the value.
+    """
+    for date_format in formats:
+        try:
+            datetime.strptime(value.strip(), date_format)
+            return date_format
+        except ValueError:
+            continue
+    raise SchemaError(f"Unknown date format: {value!r}")
+
+
+def parse_dates(values, date_format=None):
+    """
+    Parse a column of dates with one explicit format.
+
+    Args:
+        values (pd.Series or np.ndarray): Date strings, epoch nanoseconds or datetime64 values.
+        date_format (str): strptime format or "ISO8601", sniffed from RAW_DATE_FORMATS if None.
+
+    Returns:
+        pd.Series: datetime64[ns] dates.
+    """
+    values = pd.Series(values, copy=False)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype("datetime64[ns]")
+    if pd.api.types.is_integer_dtype(values):
+        return pd.Series(values.to_numpy(dtype="int64").view("datetime64[ns]"), index=values.index)
+    if values.empty:
+        return values.astype("datetime64[ns]")
+
+    if date_format is None:
+        date_format = sniff_date_format(values.iloc[0])
+    try:
+        return pd.to_datetime(values.str.strip(), format=date_format)
+    except ValueError as e:
+        raise SchemaError(f"Dates do not match {date_format}: {e}") from e
+
+
+def parse_percent(values):
+    """
+    Parse a column like "-0.92%" to floats in percent.
+    """
+    values = pd.Series(values, copy=False)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype("float64")
+    try:
+        return pd.to_numeric(values.str.rstrip("%").str.replace(",", "", regex=False)).astype("float64")
+    except ValueError as e:
+        raise SchemaError(f"Invalid percentage: {e}") from e
+
+
+def parse_volume(values):
+    """
+    Parse a column like "12.5K" to floats, empty values become NaN.
+    """
+    values = pd.Series(values, copy=False)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype("float64")
+
+    values = values.str.strip().str.replace(",", "", regex=False)
+    factors = values.str[-1:].map(_VOLUME_SUFFIXES).fillna(1.0)
+    try:
+        numbers = pd.to_numeric(values.str.rstrip("".join(_VOLUME_SUFFIXES)))
+    except ValueError as e:
+        raise SchemaError(f"Invalid volume: {e}") from e
+    return (numbers * factors).astype("float64")
+
+
+def validate_dates(dates, name="file"):
+    """
+    Check that dates are unique and sorted, ascending or descending.
+
+    Args:
+        dates (pd.Series): Parsed dates in file order.
+        name (str): Name of the file, for the error message.
+    """
+    values = dates.to_numpy(dtype="datetime64[ns]")
+    if len(values) < 2:
+        return
+
+    steps = np.diff(values.view("int64"))
+    duplicates = np.flatnonzero(steps == 0)
+    if len(duplicates):
+        raise SchemaError(f"{name}: duplicate date {pd.Timestamp(values[duplicates[0]]).date()}")
+    if not ((steps > 0).all() or (steps < 0).all()):
+        position = np.flatnonzero(np.sign(steps) != np.sign(steps[0]))[0] + 1
+        raise SchemaError(f"{name}: dates are not sorted at {pd.Timestamp(values[position])}")
+
+
+def apply_schema(df, date_format=None, name="file"):
+    """
+    Coerce the columns of a frame read as text to their types and validate its dates.
+
+    Args:
+        df (pd.DataFrame): Frame with the columns of COLUMNS, or a subset of them.
+        date_format (str): Format of the Date column, sniffed from RAW_DATE_FORMATS if None.
+        name (str): Name of the file, for error messages.
+
+    Returns:
+        pd.DataFrame: The same frame with typed columns.
+    """
+    if "Date" in df:
+        df["Date"] = parse_dates(df["Date"], date_format)
+        validate_dates(df["Date"], name)
+    for column in FLOAT_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype("float64")
+    if "Vol." in df:
+        df["Vol."] = parse_volume(df["Vol."])
+    if "Change %" in df:
+        df["Change %"] = parse_percent(df["Change %"])
+    return df
+
+
+def _read(source, date_format, columns=None, chunksize=None, name=None):
+    # Only the numeric price columns are parsed by the C reader, everything else stays text
+    dtype = {column: "float64" for column in FLOAT_COLUMNS}
+    dtype.update({column: "str" for column in ["Date", "Vol.", "Change %"]})
+    reader = pd.read_csv(source, usecols=columns, dtype=dtype, quotechar='"', thousands=",", chunksize=chunksize)
+
+    name = name or getattr(source, "name", "file")
+    if chunksize is None:
+        return apply_schema(reader, date_format, name)
+    return _typed_chunks(reader, date_format, name)
+
+
+def _typed_chunks(reader, date_format, name):
+    # Validate across chunk boundaries with the last two dates of the previous chunk
+    previous = None
+    for chunk in reader:
+        chunk = apply_schema(chunk, date_format, name)
+        if "Date" in chunk and not chunk.empty:
+            if previous is not None:
+                validate_dates(pd.concat([previous, chunk["Date"].iloc[:2]], ignore_index=True), name)
+            previous = chunk["Date"].iloc[-2:]
+        yield chunk
+
+
+def read_raw(source, columns=None, chunksize=None, name=None):
+    """
+    Load a raw Investing.com export.
+
+    Args:
+        source (Path or file-like): The raw CSV file.
+        columns (list): Columns to read, all if None.
+        chunksize (int): Read the file in chunks of this many rows instead of at once.
+        name (str): Name of the source in error messages, defaults to the file name.
+
+    Returns:
+        pd.DataFrame: The dataset with typed columns, or an iterator over such frames if chunksize is set.
+    """
+    return _read(source, None, columns, chunksize, name)
+
+
+def read_processed(source, columns=None, chunksize=None, name=None):
+    """
+    Load a processed dataset written by clean_data.
+
+    Args:
+        source (Path or file-like): The processed CSV file.
+        columns (list): Columns to read, all if None.
+        chunksize (int): Read the file in chunks of this many rows instead of at once.
+        name (str): Name of the source in error messages, defaults to the file name.
+
+    Returns:
+        pd.DataFrame: The dataset with typed columns, or an iterator over such frames if chunksize is set.
+    """
+    return _read(source, PROCESSED_DATE_FORMAT, columns, chunksize, name)
@@ -0,0 +1,197 @@
+import sys
+from pathlib import Path
+
+# Add the project root to sys.path when run as a script
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if __package__ in (None, ""):
+    sys.path.append(str(PROJECT_ROOT))
+
+from config import PROCESSED_DATA_DIR
+from scripts.schema import read_processed
+from scripts.metrics import PERIODS_PER_YEAR, window_bounds
+from scripts.resample import infer_frequency, periods_per_year
+from scripts.lazy import lazy_import
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+"""
+Compact container for the prices of a single pair.
+
+A CurrencySeries holds nothing but two contiguous arrays, int64 epoch
+nanosecond dates and float64 prices in chronological order, 16 bytes per
+observation. Slicing by date range takes two binary searches and returns
+views of the same arrays, and the returns and the periods per year are only
+computed when first asked for; a slice of a series whose returns are already
+known shares them too.
+
+The metric functions of metrics.py accept a CurrencySeries as well as a 2-D
+price array and return a single float for it, volatility and the one-period
+VaR are computed from the cached returns, e.g.
+
+    series = read_series(PROCESSED_DATA_DIR / "CHF_JPY Historical Data.csv")
+    volatility(series.slice(2007, 2009))
+"""
+
+
+class CurrencySeries:
+    """
+    Dates and prices of one pair, see the module docstring.
+
+    Args:
+        name (str): Name of the pair, e.g. "CHF_JPY Historical Data".
+        dates (np.ndarray): Strictly increasing datetime64 or int64 epoch nanosecond dates.
+        prices (np.ndarray): Prices without missing values, one per date.
+    """
+
+    __slots__ = ("name", "dates", "prices", "_returns", "_log_returns", "_periods_per_year")
+
+    def __init__(self, name, dates, prices):
+        dates = np.asarray(dates)
+        if dates.dtype.kind == "M":
+            dates = dates.astype("datetime64[ns]").view("int64")
+        self.name = name
+        self.dates = np.ascontiguousarray(dates, dtype="int64")
+        self.prices = np.ascontiguousarray(prices, dtype="float64")
+        if self.dates.shape != self.prices.shape or self.dates.ndim != 1:
+            raise ValueError("Dates and prices must be 1-D arrays of the same length.")
+        self._returns = None
+        self._log_returns = None
+        self._periods_per_year = None
+
+    @classmethod
+    def from_panel(cls, panel, column):
+        """
+        Take the prices of one column of a price panel, skipping its missing prices.
+
+        Args:
+            panel (pd.DataFrame): Date-indexed price panel sorted by date.
+            column (str): Column of the pair.
+
+        Returns:
+            CurrencySeries: The series of the column.
+        """
+        prices = panel[column].to_numpy(dtype="float64")
+        valid = ~np.isnan(prices)
+        dates = panel.index.to_numpy(dtype="datetime64[ns]").view("int64")
+        return cls(column, dates[valid], prices[valid])
+
+    def __len__(self):
+        return len(self.prices)
+
+    def __repr__(self):
+        if not len(self):
+            return f"CurrencySeries({self.name!r}, empty)"
+        first, last = self.datetimes[[0, -1]].astype("datetime64[D]")
+        return f"CurrencySeries({self.name!r}, {len(self)} prices from {first} to {last})"
+
+    @property
+    def datetimes(self):
+        """
+        The dates as a datetime64[ns] view.
+        """
+        return self.dates.view("datetime64[ns]")
+
+    @property
+    def nbytes(self):
+        """
+        Bytes held by the dates and prices.
+        """
+        return self.dates.nbytes + self.prices.nbytes
+
+    @property
+    def periods_per_year(self):
+        """
+        Periods per year of the series' frequency, inferred from its dates on first use.
+        """
+        if self._periods_per_year is None:
+            self._periods_per_year = periods_per_year(infer_frequency(self.dates)) if len(self) > 1 else PERIODS_PER_YEAR
+        return self._periods_per_year
+
+    @property
+    def returns(self):
+        """
+        Simple returns between consecutive prices, computed on first use.
+        """
+        if self._returns is None:
+            self._returns = self.prices[1:] / self.prices[:-1] - 1
+        return self._returns
+
+    @property
+    def log_returns(self):
+        """
+        Log returns between consecutive prices, computed on first use.
+        """
+        if self._log_returns is None:
+            self._log_returns = np.log(self.prices[1:] / self.prices[:-1])
+        return self._log_returns
+
+    def slice(self, START, END):
+        """
+        Select the prices within a date range without copying them.
+
+        Args:
+            START (int or date-like): Start year or date.
+            END (int or date-like): End year or date.
+
+        Returns:
+            CurrencySeries: A series sharing the arrays, and the known returns, of this one.
+        """
+        start, end = window_bounds(START, END)
+        first = np.searchsorted(self.dates, start.value, side="left")
+        last = max(np.searchsorted(self.dates, end.value, side="right"), first)
+
+        sliced = CurrencySeries.__new__(CurrencySeries)
+        sliced.name = self.name
+        sliced.dates = self.dates[first:last]
+        sliced.prices = self.prices[first:last]
+        # Returns i of the slice are returns first + i of this series
+        sliced._returns = None if self._returns is None else self._returns[first:max(last - 1, first)]
+        sliced._log_returns = None if self._log_returns is None else self._log_returns[first:max(last - 1, first)]
+        # The frequency of a slice can differ from that of the whole series
+        sliced._periods_per_year = None
+        return sliced
+
+    def as_column(self):
+        """
+        The prices as a one-column 2-D view, the input of the metric functions.
+        """
+        return self.prices[:, None]
+
+    def to_series(self):
+        """
+        The prices as a date-indexed pd.Series.
+        """
+        return pd.Series(self.prices, index=pd.DatetimeIndex(self.datetimes, name="Date"), name=self.name, copy=False)
+
+
+def read_series(csv_file):
+    """
+    Load the prices of a processed dataset, without any of its other columns.
+
+    Args:
+        csv_file (Path): A processed CSV file written by clean_data.
+
+    Returns:
+        CurrencySeries: The series, named after the file.
+    """
+    df = read_processed(csv_file, columns=["Date", "Price"]).dropna(subset=["Price"])
+    dates = df["Date"].to_numpy(dtype="datetime64[ns]").view("int64")
+    prices = df["Price"].to_numpy(dtype="float64")
+
+    # Processed files are newest first
+    order = np.argsort(dates, kind="stable")
+    return CurrencySeries(Path(csv_file).stem, dates[order], prices[order])
+
+
+def load_series(data_dir=PROCESSED_DATA_DIR):
+    """
+    Load every processed dataset as a CurrencySeries.
+
+    Args:
+        data_dir (Path): Directory containing the processed CSV files.
+
+    Returns:
+        dict: Pair names and their series, sorted by name.
+    """
+    return {series.name: series for series in map(read_series, sorted(Path(data_dir).glob("*.csv")))}
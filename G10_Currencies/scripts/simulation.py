@@ -0,0 +1,299 @@
+import sys
+import math
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from statistics import NormalDist
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Add the project root to sys.path when run as a script
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if __package__ in (None, ""):
+    sys.path.append(str(PROJECT_ROOT))
+
+from scripts.cross_rates import BASE_CURRENCY, base_panel
+from scripts.metrics import _returns, date_window
+from scripts.resample import ewma_decay, infer_frequency
+from scripts.instrumentation import stage, timed
+from scripts.lazy import lazy_import
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+"""
+Simulated Value at Risk and Expected Shortfall.
+
+Returns of holding each currency in CHF (1 / Price) over `horizon` periods are
+simulated with one of three methods:
+
+- "parametric": normally distributed returns with the sample mean and volatility,
+- "filtered": filtered historical simulation, standardized returns resampled and
+  scaled to the current EWMA volatility,
+- "bootstrap": circular block bootstrap of the historical returns, blocks of
+  `block_size` consecutive returns keep their autocorrelation over the horizon.
+
+The horizon is a whole number of periods of the data, value_at_risk converts
+durations such as "10D" with resample.horizon_periods. The EWMA volatility of
+the filtered method is computed once per currency and shared by its chunks.
+
+Paths are generated in chunks of CHUNK_PATHS as 2-D arrays. Every chunk has
+its own np.random.Generator, seeded from (seed, currency, chunk), so the
+result is the same whether the chunks run in one process or are spread over a
+process pool with any number of workers.
+"""
+
+METHODS = ["parametric", "filtered", "bootstrap"]
+
+# Paths simulated per task, each task gets its own random generator
+CHUNK_PATHS = 100_000
+
+DEFAULT_PATHS = 1_000_000
+
+# RiskMetrics decay factor of daily data for the volatility of the filtered method,
+# calculate_simulated_var uses that of the data's frequency, see resample.ewma_decay
+DEFAULT_DECAY = 0.94
+
+# Decay factors of at most 10^-MAX_EXPONENT over a block of the EWMA recursion
+MAX_EXPONENT = 250
+
+
+def ewma_volatility(returns, decay):
+    """
+    EWMA volatility before every return, and the forecast after the last one.
+
+    The recursion v[t + 1] = decay * v[t] + (1 - decay) * r[t]² is run by
+    scipy.signal.lfilter if scipy is installed. Otherwise it is unrolled over
+    blocks, within which v[t0 + k + 1] = decay^(k + 1) * (v[t0] + (1 - decay) *
+    sum(decay^-(j + 1) * r[t0 + j]², j <= k)) is a cumulative sum; the blocks
+    are short enough for decay^-k to stay within the float64 range.
+
+    Args:
+        returns (np.ndarray): Chronologically sorted returns, without NaN.
+        decay (float): Decay factor, 0 < decay <= 1.
+
+    Returns:
+        np.ndarray: len(returns) + 1 volatilities.
+    """
+    returns = np.asarray(returns, dtype="float64")
+    squared = returns ** 2
+    variance = np.empty(len(returns) + 1)
+    variance[0] = returns.var()
+
+    try:
+        from scipy.signal import lfilter
+    except ImportError:
+        lfilter = None
+    if lfilter is not None:
+        variance[1:], _ = lfilter([1 - decay], [1, -decay], squared, zi=[decay * variance[0]])
+        return np.sqrt(variance)
+
+    block = max(1, int(MAX_EXPONENT / -math.log10(decay)) if decay < 1 else len(squared))
+    for start in range(0, len(squared), block):
+        chunk = squared[start:start + block]
+        powers = decay ** np.arange(1, len(chunk) + 1)
+        variance[start + 1:start + 1 + len(chunk)] = powers * (
+            variance[start] + (1 - decay) * np.cumsum(chunk / powers)
+        )
+    return np.sqrt(variance)
+
+
+def simulate_chunk(returns, method, size, seed_key, horizon=1, block_size=3, decay=DEFAULT_DECAY,
+                   volatility=None):
+    """
+    Simulate the returns of one currency over the horizon.
+
+    Args:
+        returns (np.ndarray): Chronologically sorted historical returns, without NaN.
+        method (str): One of METHODS.
+        size (int): Number of paths.
+        seed_key (tuple): (seed, currency, chunk), seeds the random generator of this chunk.
+        horizon (int): Number of periods per path.
+        block_size (int): Returns per block of the "bootstrap" method.
+        decay (float): Decay factor of the EWMA volatility of the "filtered" method.
+        volatility (np.ndarray): ewma_volatility of the demeaned returns, computed from decay if None.
+
+    Returns:
+        np.ndarray: Compounded return of every path.
+    """
+    seed, *key = seed_key
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=tuple(key)))
+
+    if method == "parametric":
+        paths = rng.normal(returns.mean(), returns.std(ddof=1), size=(size, horizon))
+    elif method == "filtered":
+        mean = returns.mean()
+        if volatility is None:
+            volatility = ewma_volatility(returns - mean, decay)
+        standardized = (returns - mean) / volatility[:-1]
+        paths = mean + volatility[-1] * rng.choice(standardized, size=(size, horizon))
+    elif method == "bootstrap":
+        n = len(returns)
+        blocks = math.ceil(horizon / block_size)
+        starts = rng.integers(0, n, size=(size, blocks, 1))
+        positions = (starts + np.arange(block_size)) % n
+        paths = returns[positions.reshape(size, blocks * block_size)[:, :horizon]]
+    else:
+        raise ValueError(f"Unknown method: {method}")
+
+    if horizon == 1:
+        return paths[:, 0]
+    return np.prod(1 + paths, axis=1) - 1
+
+
+def tail_statistics(simulated, confidence_level=0.95, interval=0.95):
+    """
+    VaR and Expected Shortfall of simulated returns, with a confidence interval for the VaR.
+
+    The interval is distribution-free: its bounds are the order statistics
+    whose ranks are the binomial quantiles of the number of paths below the VaR.
+
+    Args:
+        simulated (np.ndarray): Simulated returns.
+        confidence_level (float): The confidence level for VaR calculation.
+        interval (float): Coverage of the confidence interval of the VaR.
+
+    Returns:
+        dict: var, expected_shortfall, var_lower and var_upper, in percent.
+    """
+    n = len(simulated)
+    q = 1 - confidence_level
+    var = np.percentile(simulated, q * 100)
+
+    z = NormalDist().inv_cdf(0.5 + interval / 2)
+    spread = z * math.sqrt(n * q * (1 - q))
+    lower = min(max(math.floor(n * q - spread), 0), n - 1)
+    upper = min(max(math.ceil(n * q + spread), 0), n - 1)
+    bounds = np.partition(simulated, [lower, upper])
+
+    return {
+        "var": var * 100,
+        "expected_shortfall": simulated[simulated <= var].mean() * 100,
+        "var_lower": bounds[lower] * 100,
+        "var_upper": bounds[upper] * 100,
+    }
+
+
+def currency_returns(prices):
+    """
+    Returns of the CHF value (1 / Price) of every currency, missing prices skipped.
+
+    Args:
+        prices (pd.DataFrame): Date-indexed price panel sorted by date.
+
+    Returns:
+        dict: Currencies and their chronologically sorted returns.
+    """
+    values = prices.to_numpy(dtype="float64")
+    returns = _returns(1 / values) if len(values) > 1 else np.empty((0, values.shape[1]))
+    return {currency: column[~np.isnan(column)] for currency, column in zip(prices.columns, returns.T)}
+
+
+def simulate_var(returns, method="bootstrap", confidence_level=0.95, paths=DEFAULT_PATHS, horizon=1,
+                 block_size=3, decay=DEFAULT_DECAY, seed=0, workers=1, interval=0.95):
+    """
+    Simulate the VaR and Expected Shortfall of every currency.
+
+    Args:
+        returns (dict): Currencies and their chronologically sorted returns.
+        method (str): One of METHODS.
+        confidence_level (float): The confidence level for VaR calculation.
+        paths (int): Number of simulated paths per currency.
+        horizon (int): Number of periods per path, a whole number of at least one.
+        block_size (int): Returns per block of the "bootstrap" method.
+        decay (float): Decay factor of the "filtered" method.
+        seed (int): Seed of the simulation, results do not depend on the number of workers.
+        workers (int): Number of worker processes.
+        interval (float): Coverage of the confidence interval of the VaR.
+
+    Returns:
+        pd.DataFrame: One row per currency with var, expected_shortfall, var_lower and var_upper.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method: {method}")
+    if isinstance(horizon, bool) or not isinstance(horizon, (int, np.integer)) or horizon < 1:
+        raise ValueError(f"The horizon must be a whole number of periods, at least one, got {horizon!r}.")
+
+    currencies = [currency for currency, values in returns.items() if len(values) >= 2]
+    chunks = [min(CHUNK_PATHS, paths - start) for start in range(0, paths, CHUNK_PATHS)]
+
+    # The EWMA volatility depends only on the currency, not on the chunk
+    volatilities = {
+        currency: ewma_volatility(returns[currency] - returns[currency].mean(), decay) if method == "filtered" else None
+        for currency in currencies
+    }
+    tasks = [
+        (returns[currency], method, size, (seed, index, chunk), horizon, block_size, decay, volatilities[currency])
+        for index, currency in enumerate(currencies)
+        for chunk, size in enumerate(chunks)
+    ]
+
+    # Chunks come back in task order, whichever worker simulated them
+    if workers <= 1:
+        simulated = [simulate_chunk(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            simulated = list(executor.map(simulate_chunk, *zip(*tasks)))
+
+    results = {}
+    for index, currency in enumerate(currencies):
+        currency_paths = np.concatenate(simulated[index * len(chunks):(index + 1) * len(chunks)])
+        results[currency] = tail_statistics(currency_paths, confidence_level, interval)
+
+    results = pd.DataFrame.from_dict(results, orient="index", columns=["var", "expected_shortfall", "var_lower", "var_upper"])
+    results.index.name = "Currency"
+    return results
+
+
+@timed
+def calculate_simulated_var(START, END, method="bootstrap", confidence_level=0.95, paths=DEFAULT_PATHS,
+                            horizon=1, block_size=3, seed=0, workers=1, base=BASE_CURRENCY, decay=None):
+    """
+    Calculate the simulated VaR and Expected Shortfall for each currency.
+
+    Args:
+        START (int or date-like): Start year or date.
+        END (int or date-like): End year or date.
+        method (str): One of METHODS.
+        confidence_level (float): The confidence level for VaR calculation (default is 0.95).
+        paths (int): Number of simulated paths per currency.
+        horizon (int): Number of periods of the data per path, e.g. 3 for a quarter of monthly data.
+            Whole periods only, calculate_var also takes durations such as "10D".
+        block_size (int): Returns per block of the "bootstrap" method.
+        seed (int): Seed of the simulation.
+        workers (int): Number of worker processes.
+        base (str): Home currency of the resident, the pairs are triangulated to it (default is CHF).
+        decay (float): Decay factor of the "filtered" method, defaults to that of the data's frequency.
+
+    Returns:
+        pd.DataFrame: One row per currency with var, expected_shortfall, var_lower and var_upper.
+    """
+    # Load the shared price panel
+    with stage("load") as record:
+        panel = base_panel(base)
+        record.rows = len(panel)
+    if panel.empty:
+        logger.error("No processed datasets found.")
+        return
+
+    with stage("filter"):
+        window = date_window(panel, START, END)
+        returns = currency_returns(window)
+    if decay is None:
+        decay = ewma_decay(infer_frequency(window.index)) if len(window) > 1 else DEFAULT_DECAY
+
+    with stage("compute", rows=paths * len(returns)):
+        results = simulate_var(returns, method, confidence_level, paths, horizon, block_size, decay, seed, workers)
+
+    # Display results
+    print(f"\nSimulated Value at Risk (VaR) Results ({method}, {paths:,} paths):")
+    for currency, row in results.iterrows():
+        print(f"{currency}: VaR {row['var']:.2f}% [{row['var_lower']:.2f}%, {row['var_upper']:.2f}%], "
+              f"ES {row['expected_shortfall']:.2f}%")
+    return results
+
+
+if __name__ == "__main__":
+    # Set up logging
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+    calculate_simulated_var(2000, 2024, workers=4)
@@ -0,0 +1,309 @@
+import sys
+import math
+from collections import Counter
+from pathlib import Path
+
+# Add the project root to sys.path when run as a script
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if __package__ in (None, ""):
+    sys.path.append(str(PROJECT_ROOT))
+
+from config import RAW_DATA_DIR
+from scripts.schema import read_raw
+from scripts.metrics import METRICS, PERIODS_PER_YEAR, window_bounds
+from scripts.resample import FREQUENCIES, frequency_from_counts, periods_per_year, spacing_classes
+from scripts.rolling import combine_drawdowns
+from scripts.lazy import lazy_import
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+"""
+One-pass metrics for raw files that do not fit into memory.
+
+A raw file is read in chunks of `chunksize` rows and every chunk is filtered to
+the date range and folded into a StreamingMetrics accumulator, so memory use
+depends on the chunk size and not on the length of the file:
+
+- depreciation from the first and last price,
+- volatility from the count, mean and sum of squared deviations of the log
+  returns, merged chunk by chunk (Welford / Chan), and annualized with the
+  frequency of all dates read, from the gaps counted per spacing class,
+- maximum drawdown from (max, min, drawdown) summaries of the chunks,
+- VaR from a QuantileSketch, a mergeable sketch whose quantiles are within a
+  relative error of the exact historical VaR.
+
+Files may be sorted newest first, as exported by Investing.com, or oldest
+first; the order only has to be the same throughout a file.
+"""
+
+# Rows per chunk, about 10 MB of parsed data
+DEFAULT_CHUNKSIZE = 200_000
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with relative accuracy (DDSketch).
+
+    Values are counted in logarithmic buckets, bucket i holding the values in
+    (gamma^(i-1), gamma^i]. Any quantile is returned with a relative error of
+    at most `relative_accuracy`, and sketches of separate chunks or files can
+    be merged without losing accuracy.
+
+    Args:
+        relative_accuracy (float): Maximum relative error of the quantiles.
+    """
+
+    __slots__ = ("relative_accuracy", "gamma", "log_gamma", "positive", "negative", "zeros", "count")
+
+    def __init__(self, relative_accuracy=0.001):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.positive = Counter()
+        self.negative = Counter()  # Buckets of the absolute values
+        self.zeros = 0
+        self.count = 0
+
+    def _add_to(self, buckets, values):
+        indices, counts = np.unique(np.ceil(np.log(values) / self.log_gamma).astype("int64"), return_counts=True)
+        buckets.update(dict(zip(indices.tolist(), counts.tolist())))
+
+    def add(self, values):
+        """
+        Add an array of values, NaN values are ignored.
+        """
+        values = np.asarray(values, dtype="float64")
+        values = values[~np.isnan(values)]
+        if values.size:
+            self._add_to(self.positive, values[values > 0])
+            self._add_to(self.negative, -values[values < 0])
+            self.zeros += int((values == 0).sum())
+            self.count += values.size
+
+    def merge(self, other):
+        """
+        Add the content of another sketch with the same accuracy.
+        """
+        if other.gamma != self.gamma:
+            raise ValueError("Only sketches with the same relative accuracy can be merged.")
+        self.positive.update(other.positive)
+        self.negative.update(other.negative)
+        self.zeros += other.zeros
+        self.count += other.count
+
+    def _value(self, index):
+        # Centre of bucket i, within the relative accuracy of every value in it
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def _value_at_rank(self, rank):
+        # Walk the buckets in ascending order of their values
+        seen = 0
+        for index in sorted(self.negative, reverse=True):
+            seen += self.negative[index]
+            if seen > rank:
+                return -self._value(index)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.positive):
+            seen += self.positive[index]
+            if seen > rank:
+                return self._value(index)
+        return self._value(max(self.positive))
+
+    def quantile(self, q):
+        """
+        Approximate q-quantile of the added values, NaN if the sketch is empty.
+
+        Interpolates linearly between the two closest ranks, as np.percentile does.
+        """
+        if not self.count:
+            return np.nan
+
+        position = q * (self.count - 1)
+        lower = math.floor(position)
+        value = self._value_at_rank(lower)
+        if position > lower:
+            value += (position - lower) * (self._value_at_rank(lower + 1) - value)
+        return value
+
+
+class StreamingMetrics:
+    """
+    Accumulate the metrics of one currency over chunks of its price series.
+
+    Args:
+        confidence_level (float): The confidence level for VaR calculation.
+        relative_accuracy (float): Relative accuracy of the VaR sketch.
+        periods_per_year (int): Prices per year to annualize the volatility, inferred from all dates if None.
+    """
+
+    __slots__ = (
+        "confidence_level", "periods_per_year", "newest_first", "previous", "first", "last",
+        "count", "mean", "m2", "drawdown", "sketch", "gaps",
+    )
+
+    def __init__(self, confidence_level=0.95, relative_accuracy=0.001, periods_per_year=None):
+        self.confidence_level = confidence_level
+        self.periods_per_year = periods_per_year
+        self.newest_first = None
+        self.previous = None  # (date, price) of the last row seen
+        self.first = None  # (date, price) of the oldest row
+        self.last = None  # (date, price) of the newest row
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.drawdown = None
+        self.sketch = QuantileSketch(relative_accuracy)
+        self.gaps = np.zeros(len(FREQUENCIES), dtype="int64")
+
+    def update(self, dates, prices):
+        """
+        Add the next chunk of a series, in the same order as the previous chunks.
+
+        Args:
+            dates (np.ndarray): Dates of the chunk.
+            prices (np.ndarray): Prices of the chunk, NaN prices are skipped.
+        """
+        valid = ~np.isnan(prices)
+        dates, prices = dates[valid], prices[valid]
+        if not len(prices):
+            return
+
+        # Continue from the last row of the previous chunk
+        if self.previous is not None:
+            dates = np.concatenate([[self.previous[0]], dates])
+            prices = np.concatenate([[self.previous[1]], prices])
+        self.previous = (dates[-1], prices[-1])
+
+        # Gaps between the dates of the chunk and the last row before it
+        self.gaps += np.bincount(spacing_classes(dates), minlength=len(FREQUENCIES))
+        if self.newest_first is None and dates[0] != dates[-1]:
+            self.newest_first = bool(dates[0] > dates[-1])
+        if self.newest_first:
+            dates, prices = dates[::-1], prices[::-1]
+
+        if self.first is None or dates[0] < self.first[0]:
+            self.first = (dates[0], prices[0])
+        if self.last is None or dates[-1] > self.last[0]:
+            self.last = (dates[-1], prices[-1])
+
+        if len(prices) > 1:
+            self._add_returns(prices)
+        self._add_drawdown(1 / prices)
+
+    def _add_returns(self, prices):
+        # Merge the chunk's mean and squared deviations of the log returns (Chan et al.)
+        log_returns = np.log(prices[1:] / prices[:-1])
+        count, mean = len(log_returns), log_returns.mean()
+        m2 = ((log_returns - mean) ** 2).sum()
+
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta ** 2 * self.count * count / total
+        self.count = total
+
+        # Returns of the CHF value (1 / Price) of the currency
+        self.sketch.add(prices[:-1] / prices[1:] - 1)
+
+    def _add_drawdown(self, reciprocal):
+        rolling_max = np.maximum.accumulate(reciprocal)
+        summary = (reciprocal.max(), reciprocal.min(), ((reciprocal - rolling_max) / rolling_max).min())
+
+        # Newest first, every chunk lies before the rows seen so far
+        if self.drawdown is None:
+            self.drawdown = summary
+        elif self.newest_first:
+            self.drawdown = combine_drawdowns(summary, self.drawdown)
+        else:
+            self.drawdown = combine_drawdowns(self.drawdown, summary)
+
+    def results(self):
+        """
+        Return the metrics of the series seen so far.
+
+        Returns:
+            dict: Metric names and values, NaN where there is not enough data.
+        """
+        if self.first is None:
+            return dict.fromkeys(METRICS, np.nan)
+
+        start_rate, end_rate = self.first[1], self.last[1]
+        yearly = self.periods_per_year
+        if yearly is None:
+            yearly = periods_per_year(frequency_from_counts(self.gaps)) if self.gaps.sum() else PERIODS_PER_YEAR
+        volatility = np.sqrt(self.m2 / (self.count - 1) * yearly) if self.count > 1 else np.nan
+        return {
+            "depreciation": (start_rate - end_rate) / start_rate * 100,
+            "volatility": volatility,
+            "var": self.sketch.quantile(1 - self.confidence_level) * 100,
+            "maximum_drawdown": self.drawdown[2] * 100,
+        }
+
+
+def iter_chunks(csv_file, START=None, END=None, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Read a raw file in chunks, keeping only the rows within a date range.
+
+    Args:
+        csv_file (Path): The raw CSV file.
+        START (int or date-like): Start year or date, None for no lower bound.
+        END (int or date-like): End year or date, None for no upper bound.
+        chunksize (int): Rows per chunk.
+
+    Yields:
+        pd.DataFrame: Parsed rows within the date range.
+    """
+    start, end = window_bounds(
+        pd.Timestamp.min if START is None else START,
+        pd.Timestamp.max if END is None else END,
+    )
+    for chunk in read_raw(csv_file, chunksize=chunksize):
+        chunk = chunk[(chunk["Date"] >= start) & (chunk["Date"] <= end)]
+        if not chunk.empty:
+            yield chunk
+
+
+def stream_metrics(csv_file, START=None, END=None, confidence_level=0.95, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Compute all metrics of one raw file in a single pass over its chunks.
+
+    Args:
+        csv_file (Path): The raw CSV file.
+        START (int or date-like): Start year or date, None for the whole file.
+        END (int or date-like): End year or date, None for the whole file.
+        confidence_level (float): The confidence level for VaR calculation.
+        chunksize (int): Rows per chunk.
+
+    Returns:
+        dict: Metric names and values.
+    """
+    metrics = StreamingMetrics(confidence_level)
+    for chunk in iter_chunks(csv_file, START, END, chunksize):
+        metrics.update(chunk["Date"].to_numpy(), chunk["Price"].to_numpy(dtype="float64"))
+    return metrics.results()
+
+
+def stream_all_metrics(START=None, END=None, confidence_level=0.95, chunksize=DEFAULT_CHUNKSIZE, data_dir=RAW_DATA_DIR):
+    """
+    Compute all metrics of every raw file, one file and one chunk at a time.
+
+    Args:
+        START (int or date-like): Start year or date, None for the whole files.
+        END (int or date-like): End year or date, None for the whole files.
+        confidence_level (float): The confidence level for VaR calculation.
+        chunksize (int): Rows per chunk.
+        data_dir (Path): Directory containing the raw CSV files.
+
+    Returns:
+        pd.DataFrame: One row per currency, one column per metric, like compute_metrics.
+    """
+    results = {
+        csv_file.stem: stream_metrics(csv_file, START, END, confidence_level, chunksize)
+        for csv_file in sorted(Path(data_dir).glob("*.csv"))
+    }
+    results = pd.DataFrame.from_dict(results, orient="index", columns=METRICS, dtype="float64")
+    results.index.name = "Currency"
+    return results
@@ -0,0 +1,241 @@
+import sys
+from pathlib import Path
+from typing import List, Optional
+import typer
+from loguru import logger
+
+# Add the project root to sys.path when run as a script
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if __package__ in (None, ""):
+    sys.path.append(str(PROJECT_ROOT))
+
+from scripts.panel import load_panel_arrays
+from scripts.cross_rates import BASE_CURRENCY, base_panel
+from scripts.metrics import METRICS, date_positions, depreciation, maximum_drawdown, value_at_risk, volatility
+from scripts.resample import horizon_periods, infer_frequency, periods_per_year
+from scripts.backends import BACKENDS, get_backend
+from scripts.result_store import data_version, metric_params, result_store
+from scripts.instrumentation import stage, timed
+from scripts.lazy import lazy_import
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+"""
+Metric sweep over currencies x windows x metrics x confidence levels.
+
+The price panel is partitioned into tasks by currency block (a range of
+columns) and date block (the rows spanned by a group of windows, windows are
+grouped in order of their start until the group spans more than `date_block`
+rows). Every task computes all metrics of its windows on its block only, and
+runs on one of the execution backends of scripts/backends.py: serial,
+threads, processes or a dask cluster. The CHF panel is handed to the
+backends as the memory-mapped prices.npy written by clean_data, so process
+workers map its column blocks from the file instead of receiving a copy.
+
+The metrics are computed column by column, on the same block with the same
+memory layout whatever the backend and the partitioning, so the results are
+identical across backends.
+
+    python scripts/sweep.py --start 2000 --end 2024 --backend process --workers 8
+"""
+
+# Currencies per task
+DEFAULT_CURRENCY_BLOCK = 256
+
+
+def year_windows(start, end):
+    """
+    Every year range between two years, e.g. (2000, 2000), (2000, 2001), ... (2024, 2024).
+    """
+    return [(START, END) for START in range(start, end + 1) for END in range(START, end + 1)]
+
+
+def _sweep_block(block, windows, metric_columns, scales):
+    """
+    Compute every metric of some windows on a block of the panel.
+
+    Args:
+        block (np.ndarray): Rows of a date block and columns of a currency block.
+        windows (list): (first, last) row positions within the block.
+        metric_columns (list): (metric, confidence level) pairs, the level is None but for VaR.
+        scales (list): (periods per year, VaR holding period in rows) of every window.
+
+    Returns:
+        np.ndarray: Array of shape (windows, metric columns, currencies).
+    """
+    results = np.full((len(windows), len(metric_columns), block.shape[1]), np.nan)
+    for k, ((first, last), (periods, horizon)) in enumerate(zip(windows, scales)):
+        # The same memory layout in every backend, so reductions add up in the same order
+        prices = np.asfortranarray(block[first:last + 1])
+        for m, (metric, confidence_level) in enumerate(metric_columns):
+            if metric == "var":
+                results[k, m] = value_at_risk(prices, confidence_level, horizon)
+            elif metric == "volatility":
+                results[k, m] = volatility(prices, periods)
+            elif metric == "depreciation":
+                results[k, m] = depreciation(prices)
+            else:
+                results[k, m] = maximum_drawdown(prices)
+    return results
+
+
+def sweep_tasks(dates, n_columns, windows, currency_block=DEFAULT_CURRENCY_BLOCK, date_block=None):
+    """
+    Partition a sweep into tasks by currency block and date block.
+
+    Args:
+        dates (np.ndarray): Sorted datetime64[ns] dates of the panel.
+        n_columns (int): Number of currencies.
+        windows (list): (START, END) pairs of years or dates.
+        currency_block (int): Currencies per task.
+        date_block (int): Maximum rows per task, a window longer than that gets a task of its own. No limit if None.
+
+    Returns:
+        tuple: (tasks, groups), tasks as (rows, cols, windows within the rows), groups as the window indexes of every date block.
+    """
+    # Windows in order of their rows, empty windows are left out
+    positions = [date_positions(dates, START, END) for START, END in windows]
+    order = sorted((i for i, (first, last) in enumerate(positions) if first <= last), key=lambda i: positions[i])
+
+    # Consecutive windows share a date block while it stays within date_block rows
+    blocks = []
+    for i in order:
+        first, last = positions[i]
+        if blocks and (date_block is None or max(blocks[-1][1], last + 1) - blocks[-1][0] <= date_block):
+            blocks[-1][1] = max(blocks[-1][1], last + 1)
+            blocks[-1][2].append(i)
+        else:
+            blocks.append([first, last + 1, [i]])
+
+    tasks, groups = [], []
+    for lo, hi, members in blocks:
+        relative = [(positions[i][0] - lo, positions[i][1] - lo) for i in members]
+        for column in range(0, n_columns, currency_block):
+            tasks.append((slice(lo, hi), slice(column, min(column + currency_block, n_columns)), relative))
+            groups.append(members)
+    return tasks, groups
+
+
+@timed
+def run_sweep(windows, metrics=METRICS, confidence_levels=(0.95,), backend="serial", workers=1,
+              currency_block=DEFAULT_CURRENCY_BLOCK, date_block=None, horizon=1, base=BASE_CURRENCY,
+              address=None, store=False):
+    """
+    Compute metrics for every currency and window on an execution backend.
+
+    Args:
+        windows (list): (START, END) pairs of years or dates, see year_windows.
+        metrics (list): Metrics to compute, defaults to all METRICS.
+        confidence_levels (list): Confidence levels of the VaR.
+        backend (str): One of BACKENDS.
+        workers (int): Number of threads, processes or local dask workers.
+        currency_block (int): Currencies per task.
+        date_block (int): Maximum rows per task, no limit if None.
+        horizon (int or str): VaR holding period, see resample.horizon_periods.
+        base (str): Base currency, see cross_rates.py.
+        address (str): Scheduler of an existing dask cluster, a local cluster if None.
+        store (bool): Also write the results to the result store.
+
+    Returns:
+        pd.DataFrame: One row per currency, metric, confidence level and window with its value.
+    """
+    # Load the shared price panel
+    with stage("load") as record:
+        panel = base_panel(base)
+        record.rows = len(panel)
+    arrays = load_panel_arrays() if base == BASE_CURRENCY else None
+    if arrays is not None and list(arrays[2]) == list(panel.columns):
+        values = arrays[1]
+    else:
+        values = panel.to_numpy(dtype="float64")
+    dates = panel.index.to_numpy(dtype="datetime64[ns]")
+
+    metric_columns = [
+        (metric, confidence_level)
+        for metric in metrics
+        for confidence_level in (confidence_levels if metric == "var" else [None])
+    ]
+
+    with stage("filter") as record:
+        tasks, groups = sweep_tasks(dates, values.shape[1], windows, currency_block, date_block)
+        record.rows = len(tasks)
+
+    # Frequency of every window as in compute_metrics, the shipped monthly frequency if there are too few dates to tell
+    scales = []
+    for START, END in windows:
+        first, last = date_positions(dates, START, END)
+        native = infer_frequency(dates[first:last + 1]) if last > first else "MS"
+        scales.append((periods_per_year(native), horizon_periods(horizon, native)))
+
+    with stage("compute", rows=len(values) * values.shape[1]):
+        blocks = get_backend(backend, workers, address).run(_sweep_block, values, [
+            (rows, cols, (relative, metric_columns, [scales[i] for i in members]))
+            for (rows, cols, relative), members in zip(tasks, groups)
+        ])
+
+    # Windows x metric columns x currencies, NaN for empty windows
+    results = np.full((len(windows), len(metric_columns), values.shape[1]), np.nan)
+    for (_, cols, _), members, block in zip(tasks, groups, blocks):
+        results[members, :, cols] = block
+
+    # One row per non-missing value
+    k, m, c = np.unravel_index(np.flatnonzero(~np.isnan(results)), results.shape)
+    frame = pd.DataFrame({
+        "currency": np.asarray(panel.columns, dtype=object)[c],
+        "metric": np.array([metric for metric, _ in metric_columns], dtype=object)[m],
+        "confidence_level": np.array([level or np.nan for _, level in metric_columns])[m],
+        "start": np.array([START for START, _ in windows], dtype=object)[k],
+        "end": np.array([END for _, END in windows], dtype=object)[k],
+        "value": results[k, m, c],
+    })
+
+    if store:
+        version = data_version()
+        for k, (START, END) in enumerate(windows):
+            for m, (metric, confidence_level) in enumerate(metric_columns):
+                valid = ~np.isnan(results[k, m])
+                stored = dict(zip(panel.columns[valid], results[k, m, valid].tolist()))
+                params = metric_params(metric, confidence_level, horizon, base)
+                result_store().put(metric, START, END, stored, params, version, flush=False)
+        result_store().flush()
+
+    return frame
+
+
+app = typer.Typer()
+
+
+@app.command()
+def main(
+    start: int = typer.Option(2000, help="First year of the windows."),
+    end: int = typer.Option(2024, help="Last year of the windows."),
+    metric: List[str] = typer.Option(METRICS, help="Metric to compute, can be repeated."),
+    confidence_level: List[float] = typer.Option([0.95], help="Confidence level for VaR, can be repeated."),
+    backend: str = typer.Option("serial", help=f"Execution backend, one of {', '.join(BACKENDS)}."),
+    workers: int = typer.Option(1, min=1, help="Number of threads, processes or dask workers."),
+    currency_block: int = typer.Option(DEFAULT_CURRENCY_BLOCK, min=1, help="Currencies per task."),
+    date_block: Optional[int] = typer.Option(None, min=1, help="Maximum rows per task."),
+    base: str = typer.Option(BASE_CURRENCY, help="Base currency of the pairs."),
+    address: Optional[str] = typer.Option(None, help="Scheduler of a dask cluster, a local one if not given."),
+    store: bool = typer.Option(False, help="Also write the results to the result store."),
+    output_path: Optional[Path] = typer.Option(None, help="Also save the results to this CSV file."),
+):
+    unknown = set(metric) - set(METRICS)
+    if unknown:
+        logger.error(f"Unknown metrics: {', '.join(sorted(unknown))}")
+        raise typer.Exit(1)
+    if backend not in BACKENDS:
+        logger.error(f"Unknown backend: {backend}")
+        raise typer.Exit(1)
+
+    windows = year_windows(start, end)
+    frame = run_sweep(windows, metric, confidence_level, backend, workers, currency_block, date_block,
+                      base=base, address=address, store=store)
+    if output_path is not None:
+        frame.to_csv(output_path, index=False)
+    logger.success(f"Computed {len(frame):,} results for {len(windows)} windows on the {backend} backend.")
+
+
+if __name__ == "__main__":
+    app()
@@ -1,63 +1,65 @@
 import sys
-import pandas as pd
-import numpy as np
 from pathlib import Path
-from datetime import datetime
 import logging
 
-# Set up logging
-logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-# Add the project root to sys.path
+# Add the project root to sys.path when run as a script
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
-sys.path.append(str(PROJECT_ROOT))
+if __package__ in (None, ""):
+    sys.path.append(str(PROJECT_ROOT))
 
-from config import PROCESSED_DATA_DIR
+from scripts.cross_rates import BASE_CURRENCY, base_panel
+from scripts.result_cache import cached_metric
+from scripts.instrumentation import stage, timed
+from scripts.simulation import METHODS, currency_returns, simulate_var
+from scripts.metrics import date_window
+from scripts.resample import ewma_decay, horizon_periods, infer_frequency
+from scripts.lazy import lazy_import
 
-def calculate_var(START, END, confidence_level=0.95):
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+@timed
+def calculate_var(START, END, confidence_level=0.95, method="historical", horizon=1, base=BASE_CURRENCY, **simulation):
     """
-    Calculate the Value at Risk (VaR) for each currency using the historical method.
+    Calculate the Value at Risk (VaR) for each currency, from the historical returns or a simulation of them.
 
     Args:
         START (int): Start year for analysis.
         END (int): End year for analysis.
         confidence_level (float): The confidence level for VaR calculation (default is 0.95).
+        method (str): "historical" or one of the simulation METHODS ("parametric", "filtered", "bootstrap").
+        horizon (int or str): Holding period in periods of the data, or a duration such as "10D" or "1MS".
+        base (str): Home currency of the resident, the pairs are triangulated to it (default is CHF).
+        **simulation: Further arguments of simulation.simulate_var for the simulation methods, e.g. paths, seed or workers,
+            the decay of the filtered method defaults to that of the data's frequency.
     Returns:
         dict: A dictionary with currencies as keys and their VaR as values.
     """
-    # List all processed CSV files
-    csv_files = list(PROCESSED_DATA_DIR.glob("*.csv"))
-    if not csv_files:
+    # Load the shared price panel
+    with stage("load") as record:
+        panel = base_panel(base)
+        record.rows = len(panel)
+    if panel.empty:
         logger.error("No processed datasets found.")
         return
 
-    var_results = {}
-
-    # Process each dataset
-    for csv_file in csv_files:
-        try:
-            # Load the dataset
-            df = pd.read_csv(csv_file, parse_dates=["Date"])
-
-            # Convert START and END years to datetime objects
-            START_YEAR = datetime(START, 1, 1)
-            END_YEAR = datetime(END, 12, 31)
-
-            # Filter the dataset by date range
-            df = df[(df["Date"] >= START_YEAR) & (df["Date"] <= END_YEAR)]
-
-            # Calculate daily returns
-            df["Return"] = df["Price"].pct_change()
-            returns = df["Return"].dropna()
-
-            # Calculate VaR
-            var_percentile = (1 - confidence_level) * 100
-            var = np.percentile(returns, var_percentile)
-            var_results[csv_file.stem] = var * 100  # Convert to percentage
-
-        except Exception as e:
-            logger.error(f"Error processing file {csv_file}: {e}")
+    # Calculate the historical VaR for all currencies at once, reusing earlier results
+    if method == "historical":
+        with stage("compute", rows=len(panel)):
+            var_results = cached_metric("var", START, END, confidence_level, horizon, base)
+    elif method in METHODS:
+        with stage("compute", rows=len(panel)):
+            window = date_window(panel, START, END)
+            returns = currency_returns(window)
+            # Frequency of the window as in compute_metrics, the shipped monthly frequency if there are too few dates to tell
+            frequency = infer_frequency(window.index) if len(window) > 1 else "MS"
+            periods = horizon_periods(horizon, frequency)
+            simulation.setdefault("decay", ewma_decay(frequency))
+            var_results = simulate_var(returns, method, confidence_level, horizon=periods, **simulation)["var"].to_dict()
+    else:
+        raise ValueError(f"Unknown method: {method}")
 
     # Display results
     if var_results:
@@ -67,4 +69,6 @@ def calculate_var(START, END, confidence_level=0.95):
     return var_results
 
 if __name__ == "__main__":
+    # Set up logging
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
     calculate_var(2000, 2024)
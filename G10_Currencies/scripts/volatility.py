@@ -1,60 +1,44 @@
 import sys
-import pandas as pd
 from pathlib import Path
-from datetime import datetime
-import numpy as np
 import logging
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-# Add the project root to sys.path
+# Add the project root to sys.path when run as a script
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
-sys.path.append(str(PROJECT_ROOT))
+if __package__ in (None, ""):
+    sys.path.append(str(PROJECT_ROOT))
 
-from config import PROCESSED_DATA_DIR
+from scripts.cross_rates import BASE_CURRENCY, base_panel
+from scripts.result_cache import cached_metric
+from scripts.instrumentation import stage, timed
+from scripts.lazy import lazy_import
 
-def calculate_volatility(START, END):
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+@timed
+def calculate_volatility(START, END, base=BASE_CURRENCY):
     """
     Analyze the standard deviation of exchange rates (volatility) for each currency.
+
+    Args:
+        START (int or date-like): Start year, or an exact start date.
+        END (int or date-like): End year, or an exact end date.
+        base (str): Home currency of the resident, the pairs are triangulated to it (default is CHF).
     """
 
-    # List all processed CSV files
-    csv_files = list(PROCESSED_DATA_DIR.glob("*.csv"))
-    if not csv_files:
+    # Load the shared price panel
+    with stage("load") as record:
+        panel = base_panel(base)
+        record.rows = len(panel)
+    if panel.empty:
         logger.error("No processed datasets found.")
         return
 
-    # Initialize a dictionary to store volatility results
-    volatility_results = {}
-
-    # Process each dataset
-    for csv_file in csv_files:
-        try:
-            # Load the dataset
-            df = pd.read_csv(csv_file, parse_dates=["Date"])
-
-            # Convert START and END to datetime objects
-            START_YEAR = datetime(START, 1, 1)
-            END_YEAR = datetime(END, 12, 31)
-
-            # Filter the dataset to the specified date range
-            df = df[(df["Date"] >= START_YEAR) & (df["Date"] <= END_YEAR)]
-
-            # Calculate monthly log returns
-            df["Log Return"] = np.log(df["Price"] / df["Price"].shift(1))
-
-            # Calculate the standard deviation of log returns (volatility)
-            monthly_std_dev = df["Log Return"].std()
-
-            # Annualize the standard deviation
-            annualized_std_dev = monthly_std_dev * np.sqrt(12)
-
-            volatility_results[csv_file.stem] = annualized_std_dev
-
-        except Exception as e:
-            logger.error(f"Error processing file {csv_file}: {e}")
+    # Calculate the annualized standard deviation of log returns for all currencies at once, reusing earlier results
+    with stage("compute", rows=len(panel)):
+        volatility_results = cached_metric("volatility", START, END, base=base)
 
     # Display or save the results
     if volatility_results:
@@ -64,4 +48,6 @@ def calculate_volatility(START, END):
     return volatility_results
 
 if __name__ == "__main__":
+    # Set up logging
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
     calculate_volatility(2000, 2024)
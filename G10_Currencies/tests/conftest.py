@@ -0,0 +1,18 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the project root to sys.path, the tests import config, scripts and benchmarks from it
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from scripts.panel import load_panel
+
+
+@pytest.fixture(scope="session")
+def panel():
+    """
+    The shipped processed price panel.
+    """
+    return load_panel()
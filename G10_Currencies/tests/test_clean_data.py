@@ -0,0 +1,181 @@
+import os
+
+import pandas as pd
+import pytest
+from loguru import logger
+
+from benchmarks.synthetic_data import generate_dataset
+from scripts import clean_data
+from scripts.result_store import result_store
+from scripts.schema import SchemaError, read_processed
+
+# Rows of the synthetic files, newest first
+PERIODS = 60
+
+
+@pytest.fixture(scope="module")
+def source(tmp_path_factory):
+    """
+    Lines of three synthetic raw files by file name, the header first.
+    """
+    directory = tmp_path_factory.mktemp("source")
+    generate_dataset(directory, pairs=3, periods=PERIODS)
+    return {csv_file.name: csv_file.read_text(encoding="utf-8").split("\n") for csv_file in sorted(directory.glob("*.csv"))}
+
+
+@pytest.fixture
+def dirs(tmp_path, monkeypatch):
+    """
+    Point clean_data at empty raw and processed directories and its own manifest.
+    """
+    raw_dir, processed_dir = tmp_path / "raw", tmp_path / "processed"
+    raw_dir.mkdir()
+    monkeypatch.setattr(clean_data, "RAW_DATA_DIR", raw_dir)
+    monkeypatch.setattr(clean_data, "PROCESSED_DATA_DIR", processed_dir)
+    monkeypatch.setattr(clean_data, "MANIFEST_PATH", tmp_path / "interim" / "ingest_manifest.json")
+    return raw_dir, processed_dir
+
+
+def _write_raw(raw_dir, name, lines, first=0, last=None):
+    # The header and rows first to last, newest first and without a trailing newline as exported
+    rows = lines[1:][first:last]
+    (raw_dir / name).write_text("\n".join([lines[0]] + rows), encoding="utf-8")
+    return raw_dir / name
+
+
+def _processed(processed_dir):
+    return {csv_file.name: read_processed(csv_file) for csv_file in sorted(processed_dir.glob("*.csv"))}
+
+
+def test_ingest_cuts_every_file_to_the_time_range_of_the_shortest(source, dirs):
+    raw_dir, processed_dir = dirs
+    names = list(source)
+    _write_raw(raw_dir, names[0], source[names[0]])
+    _write_raw(raw_dir, names[1], source[names[1]], last=PERIODS - 12)  # A year shorter, the reference
+    _write_raw(raw_dir, names[2], source[names[2]], first=3)  # Three months shorter
+
+    assert clean_data.ingest()
+
+    processed = _processed(processed_dir)
+    assert list(processed) == names
+    dates = pd.to_datetime([line[1:11] for line in source[names[0]][1:]], format="%m/%d/%Y")
+    start, end = dates[PERIODS - 13], dates[0]
+    assert clean_data.load_manifest()["window"] == [start.isoformat(), end.isoformat()]
+    for name, df in processed.items():
+        assert df["Date"].is_monotonic_decreasing
+        assert df["Date"].min() == start
+        assert df["Date"].max() == (dates[3] if name == names[2] else end)
+
+
+def test_incremental_ingest_matches_a_full_rebuild(source, dirs, monkeypatch, tmp_path):
+    raw_dir, processed_dir = dirs
+    names = list(source)
+
+    # The newest five rows are missing everywhere, the first file also lacks its four oldest rows
+    # and the others their eight oldest, so the first file's older rows lie before the window
+    _write_raw(raw_dir, names[0], source[names[0]], first=5, last=PERIODS - 4)
+    for name in names[1:]:
+        _write_raw(raw_dir, name, source[name], first=5, last=PERIODS - 8)
+    assert clean_data.ingest(incremental=True)
+
+    # Rows added to the top of every file, then to the bottom of the first
+    entries = clean_data.load_manifest()["files"]
+    _write_raw(raw_dir, names[0], source[names[0]], last=PERIODS - 4)
+    for name in names[1:]:
+        _write_raw(raw_dir, name, source[name], last=PERIODS - 8)
+    assert {clean_data.scan_raw_file(raw_dir / name, entries[name])[0] for name in names} == {"prepended"}
+    assert clean_data.ingest(incremental=True)
+
+    entries = clean_data.load_manifest()["files"]
+    _write_raw(raw_dir, names[0], source[names[0]])
+    assert clean_data.scan_raw_file(raw_dir / names[0], entries[names[0]])[0] == "appended"
+    assert clean_data.ingest(incremental=True)
+    incremental = _processed(processed_dir)
+
+    monkeypatch.setattr(clean_data, "PROCESSED_DATA_DIR", tmp_path / "rebuilt")
+    assert clean_data.ingest()
+    rebuilt = _processed(tmp_path / "rebuilt")
+
+    assert list(incremental) == list(rebuilt)
+    for name in rebuilt:
+        pd.testing.assert_frame_equal(incremental[name], rebuilt[name])
+
+
+def test_scan_detects_where_rows_were_added(source, dirs):
+    raw_dir, _ = dirs
+    lines = source[next(iter(source))]
+    csv_file = _write_raw(raw_dir, "CHF_AUD Historical Data.csv", lines, first=5, last=PERIODS - 5)
+    _, entry, _ = clean_data.scan_raw_file(csv_file)
+
+    # A new modification time alone
+    stat = csv_file.stat()
+    os.utime(csv_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    mode, touched, df = clean_data.scan_raw_file(csv_file, entry)
+    assert (mode, df) == ("unchanged", None)
+    assert touched["rows"] == entry["rows"]
+
+    _write_raw(raw_dir, csv_file.name, lines, first=2, last=PERIODS - 5)
+    mode, prepended, df = clean_data.scan_raw_file(csv_file, entry)
+    assert (mode, len(df), prepended["rows"]) == ("prepended", 3, entry["rows"] + 3)
+
+    _write_raw(raw_dir, csv_file.name, lines, first=5, last=PERIODS - 1)
+    mode, appended, df = clean_data.scan_raw_file(csv_file, entry)
+    assert (mode, len(df), appended["rows"]) == ("appended", 4, entry["rows"] + 4)
+
+    # A row re-sent at the top overlaps the ingested dates, the whole file is checked again
+    csv_file.write_text("\n".join([lines[0], lines[6]] + lines[6:PERIODS - 4]), encoding="utf-8")
+    with pytest.raises(SchemaError, match=f"{csv_file.name}: duplicate date"):
+        clean_data.scan_raw_file(csv_file, entry)
+
+
+def test_processed_files_of_deleted_raw_files_are_removed(source, dirs):
+    raw_dir, processed_dir = dirs
+    for name, lines in source.items():
+        _write_raw(raw_dir, name, lines)
+    assert clean_data.ingest(incremental=True)
+
+    removed = next(iter(source))
+    (raw_dir / removed).unlink()
+    assert clean_data.ingest(incremental=True)
+
+    assert sorted(csv_file.name for csv_file in processed_dir.glob("*.csv")) == sorted(source)[1:]
+    assert removed not in clean_data.load_manifest()["files"]
+
+
+def test_main_keeps_the_callers_log_sinks(source, dirs, monkeypatch, tmp_path):
+    raw_dir, processed_dir = dirs
+    for name, lines in source.items():
+        _write_raw(raw_dir, name, lines)
+    monkeypatch.setattr(clean_data, "result_store", lambda: result_store(tmp_path / "results.npz"))
+
+    messages = []
+    handler_id = logger.add(messages.append, format="{message}")
+    try:
+        clean_data.main(output_path=tmp_path / "merged_dataset.csv", incremental=False, workers=1, chunksize=0)
+        logger.info("After clean_data")
+    finally:
+        logger.remove(handler_id)
+
+    assert any(message.startswith("Merged dataset saved to") for message in messages)
+    assert messages[-1].strip() == "After clean_data"
+    assert (processed_dir / "panel" / "prices.npy").exists()
+
+
+def test_parallel_ingest_matches_a_serial_one(source, dirs, monkeypatch, tmp_path):
+    raw_dir, processed_dir = dirs
+    for name, lines in source.items():
+        _write_raw(raw_dir, name, lines)
+    # A file that fails to parse is skipped by either
+    broken = next(iter(source.values()))[:2] + ['"13/45/2024","1","1","1","1","","0.00%"']
+    _write_raw(raw_dir, "CHF_XXX Historical Data.csv", broken)
+
+    assert clean_data.ingest(workers=1)
+    serial = _processed(processed_dir)
+
+    monkeypatch.setattr(clean_data, "PROCESSED_DATA_DIR", tmp_path / "parallel")
+    assert clean_data.ingest(workers=2)
+    parallel = _processed(tmp_path / "parallel")
+
+    assert list(serial) == list(parallel) == list(source)
+    for name in serial:
+        pd.testing.assert_frame_equal(parallel[name], serial[name])
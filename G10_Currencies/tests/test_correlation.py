@@ -0,0 +1,129 @@
+import json
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.correlation import (
+    EWMACovariance, RollingCovariance, aligned_returns, correlation_from_covariance, covariance_matrix,
+    covariance_series, ewma_covariance, portfolio_risk, portfolio_var,
+)
+from scripts.metrics import date_window
+from scripts.resample import ewma_decay
+from scripts.risk_service import HTTPError, correlation_response, portfolio_var_response
+
+
+@pytest.fixture(scope="module")
+def returns():
+    """
+    Correlated daily returns of four currencies.
+    """
+    rng = np.random.default_rng(3)
+    mixing = rng.normal(0, 0.01, (4, 4))
+    values = rng.normal(0, 1, (250, 4)) @ mixing
+    return pd.DataFrame(values, index=pd.bdate_range("2020-01-01", periods=250), columns=list("abcd"))
+
+
+def test_covariance_matrix_matches_numpy(returns):
+    covariance = covariance_matrix(returns.to_numpy())
+
+    np.testing.assert_allclose(covariance, np.cov(returns.to_numpy(), rowvar=False), rtol=1e-12)
+    np.testing.assert_allclose(correlation_from_covariance(covariance), returns.corr().to_numpy(), rtol=1e-12)
+
+
+def test_ewma_updates_match_the_matrix_product(returns):
+    estimator = EWMACovariance(4, 0.94)
+    for row in returns.to_numpy():
+        estimator.update(row)
+
+    np.testing.assert_allclose(estimator.covariance, ewma_covariance(returns.to_numpy(), 0.94), rtol=1e-10)
+
+
+def test_covariance_series_yields_every_window(returns):
+    series = list(covariance_series(returns, window=20))
+
+    assert [date for date, _ in series] == list(returns.index[19:])
+    for end, (_, covariance) in zip(range(20, len(returns) + 1), series):
+        expected = np.cov(returns.to_numpy()[end - 20:end], rowvar=False)
+        np.testing.assert_allclose(covariance, expected, rtol=1e-8, atol=1e-14)
+
+
+def test_covariance_series_decays_with_the_frequency(returns):
+    # Business days, so the daily RiskMetrics factor
+    *_, (date, covariance) = covariance_series(returns)
+
+    assert date == returns.index[-1]
+
+    np.testing.assert_allclose(covariance, ewma_covariance(returns.to_numpy(), ewma_decay("B")), rtol=1e-10)
+
+
+def test_rolling_window_needs_two_observations():
+    with pytest.raises(ValueError):
+        RollingCovariance(2, 1)
+
+
+def test_portfolio_var_contributions_add_up(returns):
+    covariance = covariance_matrix(returns.to_numpy())
+    weights = np.array([0.4, 0.3, 0.2, 0.1])
+    var, contributions = portfolio_var(weights, covariance, 0.99)
+
+    assert var == pytest.approx(NormalDist().inv_cdf(0.01) * np.sqrt(weights @ covariance @ weights) * 100)
+    assert contributions.sum() == pytest.approx(var)
+
+
+def test_portfolio_var_without_variance_is_zero():
+    var, contributions = portfolio_var(np.zeros(3), np.eye(3))
+
+    assert var == 0
+    np.testing.assert_array_equal(contributions, np.zeros(3))
+
+
+def test_portfolio_risk_of_the_panel(panel):
+    columns = list(panel.columns[:2])
+    results = portfolio_risk(panel, 2007, 2009, dict.fromkeys(columns, 0.5), 0.95)
+
+    values = aligned_returns(date_window(panel, 2007, 2009)).to_numpy()
+    weights = np.array([0.5, 0.5] + [0.0] * (values.shape[1] - 2))
+    var, _ = portfolio_var(weights, covariance_matrix(values), 0.95, values.mean(axis=0))
+    assert list(results) == ["Portfolio"] + list(panel.columns)
+    assert results["Portfolio"] == pytest.approx(var)
+
+    assert portfolio_risk(panel, 2030, 2031) is None
+    with pytest.raises(ValueError, match="Unknown currencies: CHF_XXX"):
+        portfolio_risk(panel, 2007, 2009, {"CHF_XXX": 1.0})
+
+
+def test_correlation_response(panel):
+    content_type, body = correlation_response({"start": "2007", "end": "2009"})
+    payload = json.loads(body)
+
+    assert content_type == "application/json"
+    assert payload["currencies"] == list(panel.columns)
+    expected = aligned_returns(date_window(panel, 2007, 2009)).corr().to_numpy()
+    np.testing.assert_allclose(np.array(payload["correlation"], dtype="float64"), expected, rtol=1e-9)
+
+
+def test_portfolio_var_response(panel):
+    _, body = portfolio_var_response({"start": "2007", "end": "2009", "weights": "CHF_USD:0.6,CHF_EUR:0.4"})
+    payload = json.loads(body)
+
+    weights = {"CHF_USD Historical Data": 0.6, "CHF_EUR Historical Data": 0.4}
+    assert payload["results"] == pytest.approx(portfolio_risk(panel, 2007, 2009, weights))
+    assert payload["confidence_level"] == 0.95
+
+
+@pytest.mark.parametrize("response, query, status", [
+    (correlation_response, {"start": "2007"}, 400),
+    (correlation_response, {"start": "2007", "end": "2009", "method": "kendall"}, 400),
+    (correlation_response, {"start": "2007", "end": "2009", "base": "XXX"}, 404),
+    (portfolio_var_response, {"start": "2007", "end": "2009", "weights": "CHF_USD:heavy"}, 400),
+    (portfolio_var_response, {"start": "2007", "end": "2009", "weights": "CHF_XXX:1"}, 404),
+    (portfolio_var_response, {"start": "2007", "end": "2009", "confidence": "high"}, 400),
+    (portfolio_var_response, {"start": "2030", "end": "2031"}, 404),
+])
+def test_invalid_requests(response, query, status):
+    with pytest.raises(HTTPError) as error:
+        response(query)
+
+    assert error.value.status == status
@@ -0,0 +1,74 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.cross_rates import (
+    CrossRates, base_panel, calculate_risk_by_base, cross_rates, pair_column, split_pair,
+)
+from scripts.metrics import compute_metrics, date_window
+
+
+def test_pair_names():
+    assert pair_column("EUR", "USD") == "EUR_USD Historical Data"
+    assert split_pair("EUR_USD Historical Data") == ("EUR", "USD")
+    assert split_pair("CHF_JPY") == ("CHF", "JPY")
+
+
+def test_crosses_are_triangulated_through_chf(panel):
+    eur = base_panel("EUR", panel)
+
+    # USD per EUR is USD per CHF divided by EUR per CHF, and CHF per EUR its reciprocal
+    usd, euro = panel["CHF_USD Historical Data"], panel["CHF_EUR Historical Data"]
+    pd.testing.assert_series_equal(eur["EUR_USD Historical Data"], usd / euro, check_names=False)
+    pd.testing.assert_series_equal(eur["EUR_CHF Historical Data"], 1 / euro, check_names=False)
+    assert "EUR_EUR Historical Data" not in eur.columns
+    assert len(eur.columns) == len(panel.columns)
+
+
+def test_base_panels_are_shared(panel):
+    assert base_panel("CHF", panel) is panel
+    assert base_panel("EUR", panel) is base_panel("EUR", panel)
+    assert base_panel() is base_panel("CHF")
+
+
+def test_unknown_bases_are_errors(panel):
+    with pytest.raises(ValueError, match="Unknown currency: XXX"):
+        base_panel("XXX", panel)
+    with pytest.raises(ValueError, match="Cross rates need a panel of CHF pairs"):
+        CrossRates(base_panel("EUR", panel))
+
+
+def test_cross_matrix(panel):
+    crosses = cross_rates(panel)
+    matrix = crosses.matrix(2020, 2020)
+    n = len(crosses.currencies)
+
+    assert matrix.shape == (len(date_window(panel, 2020, 2020)), n, n)
+    np.testing.assert_allclose(matrix[:, range(n), range(n)], 1.0)
+    np.testing.assert_allclose(matrix * matrix.transpose(0, 2, 1), 1.0)
+
+    cross_panel = crosses.cross_panel(2020, 2020)
+    assert len(cross_panel.columns) == n * (n - 1)
+    usd = base_panel("USD", panel)
+    pd.testing.assert_frame_equal(cross_panel[usd.columns], date_window(usd, 2020, 2020), check_freq=False)
+
+
+def test_cross_rates_follow_the_panel(panel):
+    other = panel.iloc[::2]
+    with ThreadPoolExecutor(8) as executor:
+        pairs = list(executor.map(lambda frame: (frame, cross_rates(frame)), [panel, other] * 50))
+
+    for frame, crosses in pairs:
+        assert crosses.dates is frame.index
+
+
+def test_risk_by_base(panel, capsys):
+    results = calculate_risk_by_base(2007, 2009, "volatility")
+    chf = compute_metrics(date_window(panel, 2007, 2009), metrics=["volatility"])["volatility"]
+
+    assert list(results.index) == list(results.columns) == cross_rates(panel).currencies
+    assert np.isnan(np.diag(results.to_numpy())).all()
+    np.testing.assert_allclose(results.loc["CHF"].iloc[1:], chf.to_numpy(), rtol=1e-9)
+    assert "Riskiest currency to hold by base currency (volatility):" in capsys.readouterr().out
@@ -0,0 +1,106 @@
+import matplotlib
+import numpy as np
+import pytest
+
+from figures.exchange_rates import CurrencyChart
+from scripts.downsample import downsample, lttb_indices, minmax_indices
+
+matplotlib.use("Agg")
+
+
+@pytest.fixture(scope="module")
+def series():
+    """
+    A random walk on unevenly spaced x values.
+    """
+    rng = np.random.default_rng(6)
+    x = np.cumsum(rng.exponential(1.0, 20_000))
+    return x, np.cumsum(rng.normal(0, 1, len(x)))
+
+
+def test_minmax_keeps_the_extremes_of_every_bucket(series):
+    x, y = series
+    kept = minmax_indices(x, y, 100)
+
+    assert len(kept) <= 4 * 100
+    assert kept[0] == 0 and kept[-1] == len(x) - 1
+    assert (np.diff(kept) > 0).all()
+    # The kept points span the same range as the full series in every bucket
+    buckets = np.minimum(((x - x[0]) / (x[-1] - x[0]) * 100).astype("int64"), 99)
+    for bucket in np.unique(buckets):
+        full = y[buckets == bucket]
+        sample = y[kept][buckets[kept] == bucket]
+        assert (sample.min(), sample.max()) == (full.min(), full.max())
+
+
+def test_short_series_are_kept_whole(series):
+    x, y = series
+
+    np.testing.assert_array_equal(minmax_indices(x[:40], y[:40], 10), np.arange(40))
+    np.testing.assert_array_equal(lttb_indices(x[:40], y[:40], 40), np.arange(40))
+
+
+def test_lttb_keeps_one_point_per_bucket(series):
+    x, y = series
+    kept = lttb_indices(x, y, 500)
+
+    assert len(kept) == 500
+    assert kept[0] == 0 and kept[-1] == len(x) - 1
+    assert (np.diff(kept) > 0).all()
+    edges = np.linspace(1, len(x) - 1, 499).astype("int64")
+    assert (np.searchsorted(edges, kept[1:-1], side="right") == np.arange(1, 499)).all()
+
+
+def test_lttb_prefers_spikes():
+    x = np.arange(1000.0)
+    y = np.zeros(1000)
+    y[[137, 512, 871]] = [5.0, -7.0, 3.0]
+
+    assert {137, 512, 871} <= set(lttb_indices(x, y, 50).tolist())
+
+
+def test_downsample(series):
+    x, y = series
+    for method in ("minmax", "lttb"):
+        sample_x, sample_y = downsample(x, y, 200, method)
+        assert len(sample_x) == len(sample_y) <= 800
+        assert np.isin(sample_x, x).all()
+    with pytest.raises(ValueError, match="Unknown downsampling method: every"):
+        downsample(x, y, 200, "every")
+
+
+def test_chart_updates_in_place(panel):
+    first, second = panel.columns[:2]
+    chart = CurrencyChart()
+    chart.plot([first])
+    figure, line = chart.figure, chart.lines[first]
+
+    chart.plot([second])
+    assert chart.figure is figure
+    assert list(chart.lines) == [second]
+    prices = panel[second].dropna()
+    assert chart.ax.get_ylim()[0] <= prices.min() and chart.ax.get_ylim()[1] >= prices.max()
+    assert line not in chart.ax.lines
+
+    chart.plot([first, second], rebase=True)
+    for currency in (first, second):
+        assert chart.lines[currency].get_ydata()[0] == pytest.approx(100)
+
+
+def test_zooming_downsamples_the_visible_range(panel):
+    currency = panel.columns[0]
+    chart = CurrencyChart(figsize=(2, 2))
+    chart.plot([currency])
+    x, _ = chart.series[currency]
+
+    # A range with fewer points than pixels is drawn whole, with markers
+    chart.ax.set_xlim(x[10], x[20])
+    drawn = chart.lines[currency].get_xdata()
+    assert drawn[0] <= x[10] and drawn[-1] >= x[20]
+    assert len(drawn) == 13
+    assert chart.lines[currency].get_marker() == "o"
+
+
+def test_unknown_currencies_are_errors():
+    with pytest.raises(ValueError, match="Unknown currency: CHF_XXX"):
+        CurrencyChart().plot(["CHF_XXX"])
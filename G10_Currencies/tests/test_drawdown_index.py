@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.metrics import compute_metrics, date_window
+from scripts.drawdown_index import DrawdownIndex, drawdown_index
+
+WINDOWS = [(2000, 2024), (2007, 2009), (2015, 2015), (2003, 2019), ("2010-03-01", "2012-07-31")]
+
+
+@pytest.mark.parametrize("START, END", WINDOWS)
+def test_drawdown_index_matches_compute_metrics(panel, START, END):
+    expected = compute_metrics(date_window(panel, START, END))["maximum_drawdown"]
+
+    np.testing.assert_allclose(drawdown_index(panel).maximum_drawdown(START, END), expected, rtol=1e-9, atol=1e-12)
+
+
+def test_drawdown_index_skips_missing_prices(panel):
+    gappy = panel.copy()
+    gappy.iloc[::7, 0] = np.nan
+    expected = compute_metrics(date_window(gappy, 2005, 2020))["maximum_drawdown"]
+
+    np.testing.assert_allclose(drawdown_index(gappy).maximum_drawdown(2005, 2020), expected, rtol=1e-9, atol=1e-12)
+
+
+def test_every_range_matches_a_direct_scan():
+    # A length that is not a power of two, so the last leaves are padding
+    prices = np.exp(np.cumsum(np.random.default_rng(4).normal(0, 0.05, (37, 2)), axis=0))
+    prices[5:9, 1] = np.nan
+    index = DrawdownIndex(pd.DataFrame(prices, index=pd.date_range("2000-01-01", periods=37, freq="MS")))
+
+    for first in range(37):
+        for last in range(first, 37):
+            reciprocal = 1 / prices[first:last + 1]
+            drawdowns = np.nan_to_num(reciprocal / np.fmax.accumulate(reciprocal) - 1)
+            expected = np.where(np.isnan(reciprocal).all(axis=0), np.nan, drawdowns.min(axis=0) * 100)
+            np.testing.assert_allclose(index.query_positions(first, last), expected, atol=1e-12)
+
+
+def test_empty_windows_have_no_drawdown(panel):
+    assert np.isnan(drawdown_index(panel).maximum_drawdown(2030, 2031)).all()
@@ -0,0 +1,93 @@
+import asyncio
+import shutil
+import threading
+
+import pandas as pd
+import pytest
+
+from config import RAW_DATA_DIR
+from scripts.fetch_data import fetch_pairs, raw_path
+from scripts.mock_fx_server import create_server
+from scripts.schema import read_raw
+
+aiohttp = pytest.importorskip("aiohttp")
+
+PAIRS = ["CHF_AUD", "CHF_EUR", "CHF_USD"]
+
+
+@pytest.fixture
+def source_dir(tmp_path):
+    """
+    Raw files served by the mock server.
+    """
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    for pair in PAIRS:
+        shutil.copy(raw_path(pair, RAW_DATA_DIR), source_dir)
+    return source_dir
+
+
+def _serve(source_dir, **options):
+    server = create_server(port=0, source_dir=source_dir, **options)
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+@pytest.fixture
+def fetch(source_dir, tmp_path):
+    """
+    Fetch pairs from a mock server serving source_dir into tmp_path / "raw".
+    """
+    servers = []
+
+    def fetch(pairs=PAIRS, data_format="csv", **options):
+        server_options = {name: options.pop(name) for name in ("latency", "failure_rate") if name in options}
+        server, base_url = _serve(source_dir, **server_options)
+        servers.append(server)
+        return asyncio.run(fetch_pairs(
+            pairs, base_url, tmp_path / "raw", data_format, state_path=tmp_path / "fetch_state.json", **options
+        ))
+
+    yield fetch
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_unchanged_pairs_are_not_downloaded_again(fetch, source_dir, tmp_path):
+    assert fetch() == dict.fromkeys(PAIRS, "updated")
+    for pair in PAIRS:
+        assert raw_path(pair, tmp_path / "raw").read_bytes() == raw_path(pair, source_dir).read_bytes()
+
+    assert fetch() == dict.fromkeys(PAIRS, "not modified")
+
+    changed = raw_path(PAIRS[0], source_dir)
+    changed.write_bytes(changed.read_bytes() + b"\n")
+    assert fetch()[PAIRS[0]] == "updated"
+    assert raw_path(PAIRS[0], tmp_path / "raw").read_bytes() == changed.read_bytes()
+
+
+def test_json_downloads_are_written_as_raw_files(fetch, source_dir, tmp_path):
+    assert fetch(data_format="json") == dict.fromkeys(PAIRS, "updated")
+
+    for pair in PAIRS:
+        pd.testing.assert_frame_equal(read_raw(raw_path(pair, tmp_path / "raw")), read_raw(raw_path(pair, source_dir)))
+    # The state of one format is not used for the other
+    assert fetch(data_format="csv") == dict.fromkeys(PAIRS, "updated")
+
+
+def test_failed_requests_are_retried(fetch, source_dir, tmp_path):
+    results = fetch(failure_rate=0.3, retries=20, backoff=0.001, concurrency=2)
+
+    assert results == dict.fromkeys(PAIRS, "updated")
+    for pair in PAIRS:
+        assert raw_path(pair, tmp_path / "raw").read_bytes() == raw_path(pair, source_dir).read_bytes()
+
+
+def test_unknown_pairs_fail_without_retries(fetch, tmp_path):
+    results = fetch(["CHF_USD", "CHF_XXX"], retries=3, backoff=10)
+
+    assert results["CHF_USD"] == "updated"
+    assert isinstance(results["CHF_XXX"], aiohttp.ClientResponseError)
+    assert results["CHF_XXX"].status == 404
+    assert not raw_path("CHF_XXX", tmp_path / "raw").exists()
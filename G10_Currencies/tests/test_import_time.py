@@ -0,0 +1,15 @@
+import pytest
+
+from benchmarks.import_time import IMPORT_BUDGETS_MS, measure_import
+
+# Imports per module, the fastest is compared with the budget as in the command line check
+REPEAT = 3
+
+
+@pytest.mark.parametrize("module", list(IMPORT_BUDGETS_MS))
+def test_import_within_budget(module):
+    measurements = [measure_import(module) for _ in range(REPEAT)]
+    milliseconds = min(ms for ms, _ in measurements)
+
+    assert milliseconds <= IMPORT_BUDGETS_MS[module], f"{module} takes {milliseconds:.1f} ms to import"
+    assert measurements[0][1] == [], f"{module} imports {', '.join(measurements[0][1])} eagerly"
@@ -0,0 +1,15 @@
+import pandas as pd
+
+from scripts.metrics import METRICS, compute_metrics, date_window
+
+
+def test_compute_metrics_leaves_the_panel_alone(panel):
+    window = date_window(panel, 2007, 2009)
+    before = window.copy()
+    results = compute_metrics(window)
+
+    assert results.index.name == "Currency"
+    assert list(results.columns) == METRICS
+    assert list(results.index) == list(panel.columns)
+    assert panel.columns.name is None
+    pd.testing.assert_frame_equal(window, before)
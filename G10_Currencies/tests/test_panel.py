@@ -0,0 +1,62 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from config import PROCESSED_DATA_DIR
+from scripts.panel import load_panel, load_panel_arrays, write_panel_arrays
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """
+    A copy of the shipped processed files, free to be modified.
+    """
+    for csv_file in sorted(PROCESSED_DATA_DIR.glob("*.csv")):
+        shutil.copy(csv_file, tmp_path)
+    return tmp_path
+
+
+def _rewrite_prices(csv_file, factor):
+    # Scale the prices and move the modification time on, so the change is seen even on coarse clocks
+    df = pd.read_csv(csv_file, dtype=str)
+    df["Price"] = (df["Price"].astype("float64") * factor).astype(str)
+    df.to_csv(csv_file, index=False)
+    mtime_ns = csv_file.stat().st_mtime_ns + 10**9
+    os.utime(csv_file, ns=(mtime_ns, mtime_ns))
+
+
+def test_panel_aligns_every_processed_file(data_dir, panel):
+    loaded = load_panel(data_dir)
+
+    assert list(loaded.columns) == sorted(csv_file.stem for csv_file in data_dir.glob("*.csv"))
+    assert loaded.index.is_monotonic_increasing
+    pd.testing.assert_frame_equal(loaded, panel)
+
+
+def test_panel_is_shared_until_a_file_changes(data_dir):
+    panel = load_panel(data_dir)
+    assert load_panel(data_dir) is panel
+
+    changed, unchanged = sorted(data_dir.glob("*.csv"))[:2]
+    _rewrite_prices(changed, 2)
+    reloaded = load_panel(data_dir)
+
+    assert reloaded is not panel
+    np.testing.assert_allclose(reloaded[changed.stem], panel[changed.stem] * 2)
+    pd.testing.assert_series_equal(reloaded[unchanged.stem], panel[unchanged.stem])
+
+
+def test_arrays_are_mapped_only_while_they_match_the_files(data_dir):
+    written = write_panel_arrays(data_dir)
+    dates, prices, columns = load_panel_arrays(data_dir)
+
+    assert isinstance(prices, np.memmap)
+    assert columns == list(written.columns)
+    np.testing.assert_array_equal(prices, written.to_numpy())
+    pd.testing.assert_frame_equal(load_panel(data_dir), written)
+
+    _rewrite_prices(sorted(data_dir.glob("*.csv"))[0], 2)
+    assert load_panel_arrays(data_dir) is None
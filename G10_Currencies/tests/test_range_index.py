@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from scripts.metrics import compute_metrics, date_window
+from scripts.range_index import prefix_index
+
+WINDOWS = [(2000, 2024), (2007, 2009), (2015, 2015), (2003, 2019), ("2010-03-01", "2012-07-31")]
+
+
+@pytest.mark.parametrize("START, END", WINDOWS)
+def test_prefix_index_matches_compute_metrics(panel, START, END):
+    expected = compute_metrics(date_window(panel, START, END))
+    index = prefix_index(panel)
+
+    np.testing.assert_allclose(index.depreciation(START, END), expected["depreciation"], rtol=1e-9)
+    np.testing.assert_allclose(index.volatility(START, END), expected["volatility"], rtol=1e-9)
+
+
+def test_prefix_index_skips_missing_prices(panel):
+    gappy = panel.copy()
+    gappy.iloc[::5, 1] = np.nan
+    gappy.iloc[:40, 2] = np.nan
+    expected = compute_metrics(date_window(gappy, 2001, 2012))
+    index = prefix_index(gappy)
+
+    np.testing.assert_allclose(index.depreciation(2001, 2012), expected["depreciation"], rtol=1e-9)
+    np.testing.assert_allclose(index.volatility(2001, 2012), expected["volatility"], rtol=1e-9)
+
+
+def test_prefix_index_is_built_once_per_panel(panel):
+    assert prefix_index(panel) is prefix_index(panel)
+    assert prefix_index(panel.copy()) is not prefix_index(panel)
+
+
+def test_empty_windows_have_no_values(panel):
+    index = prefix_index(panel)
+
+    assert np.isnan(index.depreciation(2030, 2031)).all()
+    assert np.isnan(index.volatility(2030, 2031)).all()
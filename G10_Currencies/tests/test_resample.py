@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.metrics import compute_metrics, date_window
+from scripts.range_index import prefix_index
+from scripts.resample import (
+    canonical_frequency, ewma_decay, horizon_periods, infer_frequency, periods_per_year, resample_ohlc,
+    resample_prices,
+)
+
+
+@pytest.mark.parametrize("dates, frequency", [
+    (pd.bdate_range("2024-01-01", periods=60), "B"),
+    (pd.date_range("2024-01-01", periods=60, freq="D"), "B"),
+    (pd.date_range("2024-01-01", periods=60, freq="h"), "h"),
+    (pd.date_range("2024-01-01", periods=60, freq="min"), "min"),
+    (pd.date_range("2024-01-05", periods=60, freq="W-FRI"), "W"),
+    (pd.date_range("2000-01-01", periods=60, freq="MS"), "MS"),
+    (pd.date_range("2000-01-01", periods=20, freq="QS"), "QS"),
+    (pd.date_range("2000-01-01", periods=20, freq="YS"), "YS"),
+])
+def test_infer_frequency(dates, frequency):
+    assert infer_frequency(dates) == frequency
+    assert infer_frequency(dates[::-1]) == frequency
+
+
+def test_gaps_do_not_change_the_frequency():
+    # Holidays and missing days only widen some gaps
+    dates = pd.bdate_range("2024-01-01", periods=250).delete([10, 11, 12, 50, 120, 121])
+
+    assert infer_frequency(dates) == "B"
+    with pytest.raises(ValueError, match="At least two dates"):
+        infer_frequency(dates[:1])
+
+
+@pytest.mark.parametrize("frequency, canonical, periods, decay", [
+    ("D", "B", 252, 0.94),
+    ("W-FRI", "W", 52, 0.955),
+    ("ME", "MS", 12, 0.97),
+    ("MS", "MS", 12, 0.97),
+    ("h", "h", 252 * 24, 0.94),
+])
+def test_frequency_aliases(frequency, canonical, periods, decay):
+    assert canonical_frequency(frequency) == canonical
+    assert periods_per_year(frequency) == periods
+    assert ewma_decay(frequency) == decay
+
+
+def test_unsupported_frequency():
+    with pytest.raises(ValueError, match="Unsupported frequency: 2s"):
+        canonical_frequency("2s")
+
+
+@pytest.mark.parametrize("horizon, frequency, periods", [
+    (10, "B", 10),
+    ("10D", "B", 10),
+    ("1W", "B", 5),
+    ("1MS", "B", 21),
+    ("1D", "h", 24),
+    ("3MS", "MS", 3),
+    ("1YS", "MS", 12),
+])
+def test_horizon_periods(horizon, frequency, periods):
+    assert horizon_periods(horizon, frequency) == periods
+
+
+def test_horizons_shorter_than_a_period():
+    with pytest.raises(ValueError, match="shorter than one period of MS data"):
+        horizon_periods("1W", "MS")
+    with pytest.raises(ValueError):
+        horizon_periods(0, "B")
+
+
+def test_resample_keeps_the_last_price_of_every_period():
+    dates = pd.bdate_range("2024-01-01", "2024-03-29")
+    panel = pd.DataFrame({"a": np.arange(len(dates), dtype="float64")}, index=dates)
+    monthly = resample_prices(panel, "MS")
+
+    assert list(monthly.index) == list(pd.date_range("2024-01-01", periods=3, freq="MS"))
+    month_ends = [panel.loc[month, "a"].iloc[-1] for month in ("2024-01", "2024-02", "2024-03")]
+    assert monthly["a"].tolist() == month_ends
+    with pytest.raises(ValueError, match="Cannot resample MS data to the finer frequency B"):
+        resample_prices(monthly, "B")
+
+
+def test_resample_ohlc():
+    dates = pd.date_range("2024-01-01", periods=4 * 24, freq="h")
+    bars = pd.DataFrame({
+        "Date": dates[::-1], "Open": 1.0, "High": np.arange(96.0)[::-1] + 1, "Low": np.arange(96.0)[::-1] - 1,
+        "Price": np.arange(96.0)[::-1], "Vol.": np.nan,
+    })
+    daily = resample_ohlc(bars, "D")
+
+    assert daily["Date"].tolist() == list(pd.date_range("2024-01-01", periods=4))
+    assert daily["High"].tolist() == [24.0, 48.0, 72.0, 96.0]
+    assert daily["Low"].tolist() == [-1.0, 23.0, 47.0, 71.0]
+    assert daily["Price"].tolist() == [23.0, 47.0, 71.0, 95.0]
+    assert daily["Vol."].isna().all()
+    np.testing.assert_allclose(daily["Change %"].iloc[1:], [100 * 24 / 23, 100 * 24 / 47, 100 * 24 / 71])
+
+
+def test_volatility_uses_the_frequency_of_the_window():
+    # Monthly prices, then business days, so the frequency depends on the window
+    dates = pd.date_range("2000-01-01", "2009-12-01", freq="MS").append(pd.bdate_range("2010-01-01", "2011-12-30"))
+    prices = np.exp(np.cumsum(np.random.default_rng(2).normal(0, 0.01, (len(dates), 3)), axis=0))
+    mixed = pd.DataFrame(prices, index=pd.DatetimeIndex(dates, name="Date"), columns=["a", "b", "c"])
+
+    for START, END in [(2000, 2005), (2010, 2011), (2008, 2011)]:
+        expected = compute_metrics(date_window(mixed, START, END))["volatility"]
+        np.testing.assert_allclose(prefix_index(mixed).volatility(START, END), expected, rtol=1e-9)
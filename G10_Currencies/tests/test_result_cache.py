@@ -0,0 +1,96 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from config import PROCESSED_DATA_DIR
+from scripts import result_cache
+from scripts import result_store as result_store_module
+from scripts.metrics import compute_metrics, date_window
+from scripts.panel import panel_signature
+from scripts.result_store import result_store
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """
+    An empty result store behind an empty cache.
+    """
+    store = result_store(tmp_path / "results.npz")
+    monkeypatch.setattr(result_cache, "result_store", lambda: store)
+    result_cache.clear_cache()
+    yield store
+    result_cache.clear_cache()
+
+
+@pytest.fixture
+def computed(monkeypatch):
+    """
+    Replace the metric computation with one that records its calls.
+    """
+    calls = []
+
+    def compute_metric(metric, START, END, confidence_level=0.95, panel=None, horizon=1, base="CHF"):
+        calls.append((metric, START, END))
+        return {"CHF_USD Historical Data": float(len(calls))}
+
+    monkeypatch.setattr(result_cache, "compute_metric", compute_metric)
+    return calls
+
+
+@pytest.mark.parametrize("metric", ["depreciation", "volatility", "var", "maximum_drawdown"])
+def test_cached_metric_matches_compute_metrics(panel, store, metric):
+    expected = compute_metrics(date_window(panel, 2007, 2009), 0.99)[metric].dropna()
+    results = result_cache.cached_metric(metric, 2007, 2009, 0.99, version="test")
+
+    assert list(results) == list(expected.index)
+    np.testing.assert_allclose(list(results.values()), expected.to_numpy(), rtol=1e-9)
+
+
+def test_results_are_computed_once_per_data_version(store, computed):
+    first = result_cache.cached_metric("volatility", 2007, 2009, version="a")
+    first["CHF_USD Historical Data"] = -1.0
+    assert result_cache.cached_metric("volatility", 2007, 2009, version="a") == {"CHF_USD Historical Data": 1.0}
+    # The confidence level only matters for VaR
+    assert result_cache.cached_metric("volatility", 2007, 2009, 0.99, version="a") == {"CHF_USD Historical Data": 1.0}
+    assert len(computed) == 1
+
+    # New processed data, e.g. after clean_data ran again
+    assert result_cache.cached_metric("volatility", 2007, 2009, version="b") == {"CHF_USD Historical Data": 2.0}
+    assert len(computed) == 2
+
+
+def test_stored_results_outlive_the_cache(store, computed):
+    result_cache.cached_metric("depreciation", 2000, 2024, version="a")
+    result_cache.clear_cache()
+
+    assert result_cache.cached_metric("depreciation", 2000, 2024, version="a") == {"CHF_USD Historical Data": 1.0}
+    assert len(computed) == 1
+
+
+def test_results_that_are_not_persisted_stay_out_of_the_store(store, computed):
+    result_cache.cached_metric("var", "2001-03-05", "2004-02-01", 0.973, version="a", persist=False)
+    store.flush()
+
+    assert store.query().empty
+    result_cache.cached_metric("var", "2001-03-05", "2004-02-01", 0.973, version="a", persist=False)
+    assert len(computed) == 1
+
+
+def test_rewriting_a_processed_file_changes_the_data_version(tmp_path, monkeypatch, store, computed):
+    for csv_file in sorted(PROCESSED_DATA_DIR.glob("*.csv"))[:2]:
+        shutil.copy(csv_file, tmp_path)
+    monkeypatch.setattr(result_store_module, "panel_signature", lambda: panel_signature(tmp_path))
+
+    result_cache.cached_metric("volatility", 2007, 2009)
+    result_cache.cached_metric("volatility", 2007, 2009)
+    assert len(computed) == 1
+
+    csv_file = sorted(tmp_path.glob("*.csv"))[0]
+    csv_file.write_bytes(csv_file.read_bytes() + b"\n")
+    mtime_ns = csv_file.stat().st_mtime_ns + 10**9
+    os.utime(csv_file, ns=(mtime_ns, mtime_ns))
+
+    result_cache.cached_metric("volatility", 2007, 2009)
+    assert len(computed) == 2
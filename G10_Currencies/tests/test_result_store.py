@@ -0,0 +1,106 @@
+import multiprocessing
+
+import pandas as pd
+import pytest
+
+from scripts import result_store as result_store_module
+from scripts.result_store import ResultStore, metric_params, result_store
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "results.npz"
+
+
+def _put_windows(path, worker, flush):
+    # A few windows per worker, e.g. from a sweep
+    store = result_store(path)
+    for year in range(2000, 2005):
+        store.put("volatility", year, year + worker, {f"CHF_{worker}": float(year)}, version="a", flush=flush)
+    return worker
+
+
+def test_results_are_read_back(path):
+    store = ResultStore(path)
+    store.put("var", 2007, 2009, {"CHF_USD": -1.5, "CHF_EUR": -1.2}, metric_params("var", 0.99), version="a")
+
+    # Queued results are served right away, and by any store once written
+    assert store.get("var", 2007, 2009, metric_params("var", 0.99), version="a") == {"CHF_USD": -1.5, "CHF_EUR": -1.2}
+    store.flush()
+    reader = ResultStore(path)
+    assert reader.get("var", 2007, 2009, metric_params("var", 0.99), version="a") == {"CHF_USD": -1.5, "CHF_EUR": -1.2}
+    assert reader.get("var", 2007, 2009, metric_params("var", 0.95), version="a") is None
+    assert reader.get("var", 2007, 2009, metric_params("var", 0.99), version="b") is None
+    assert reader.get("var", "2007-01-01", "2009-12-31", metric_params("var", 0.99), version="a") is not None
+
+
+def test_later_results_replace_earlier_ones(path):
+    store = ResultStore(path)
+    store.put("depreciation", 2007, 2009, {"CHF_USD": 1.0, "CHF_EUR": 2.0}, version="a", flush=True)
+    store.put("depreciation", 2007, 2009, {"CHF_USD": 3.0}, version="a")
+    assert store.get("depreciation", 2007, 2009, version="a") == {"CHF_USD": 3.0}
+
+    store.flush()
+    assert ResultStore(path).get("depreciation", 2007, 2009, version="a") == {"CHF_USD": 3.0}
+    assert len(ResultStore(path).query(version="a")) == 1
+
+
+def test_query_and_top(path):
+    store = ResultStore(path)
+    store.put("volatility", 2007, 2009, {"CHF_USD": 9.0, "CHF_JPY": 12.0, "CHF_EUR": 5.0}, version="a")
+    store.put("volatility", 2010, 2012, {"CHF_JPY": 10.0}, version="a")
+    store.put("depreciation", 2007, 2009, {"CHF_JPY": -3.0}, version="a")
+    store.put("volatility", 2007, 2009, {"CHF_JPY": 1.0}, version="b")
+
+    yen = store.query(currency="CHF_JPY", metric="volatility", version="a")
+    assert list(yen["value"]) == [12.0, 10.0]
+    assert list(yen["start"]) == [pd.Timestamp("2007-01-01"), pd.Timestamp("2010-01-01")]
+    assert len(store.query(currency="CHF_JPY", version="all")) == 4
+    assert len(store.query(START=2007, END=2009, version="a")) == 4
+
+    assert list(store.top("volatility", 2007, 2009, n=2, version="a").index) == ["CHF_JPY", "CHF_USD"]
+    assert list(store.top("depreciation", 2007, 2009, version="a").index) == ["CHF_JPY"]
+
+
+def test_segments_are_merged_into_the_table(path, monkeypatch):
+    monkeypatch.setattr(result_store_module, "MAX_SEGMENTS", 2)
+    store = ResultStore(path)
+    for year in range(2000, 2006):
+        store.put("volatility", year, year, {"CHF_USD": float(year)}, version="a", flush=True)
+
+    assert len(store._segments()) <= 2
+    assert path.exists()
+    reader = ResultStore(path)
+    assert [reader.get("volatility", year, year, version="a") for year in range(2000, 2006)] == [
+        {"CHF_USD": float(year)} for year in range(2000, 2006)
+    ]
+
+
+def test_prune_keeps_one_version(path):
+    store = ResultStore(path)
+    store.put("volatility", 2007, 2009, {"CHF_USD": 1.0}, version="a", flush=True)
+    store.put("volatility", 2007, 2009, {"CHF_USD": 2.0}, version="b", flush=True)
+    store.put("volatility", 2010, 2012, {"CHF_USD": 3.0}, version="a")
+
+    store.prune("b")
+
+    assert store.get("volatility", 2007, 2009, version="a") is None
+    assert store.get("volatility", 2010, 2012, version="a") is None
+    assert ResultStore(path).get("volatility", 2007, 2009, version="b") == {"CHF_USD": 2.0}
+    assert not store._segments()
+
+
+@pytest.mark.parametrize("flush", [True, False])
+def test_concurrent_processes_keep_every_result(path, flush):
+    # Without flush the results queued in a worker are written when the worker exits
+    with multiprocessing.get_context("fork").Pool(4) as pool:
+        assert pool.starmap(_put_windows, [(path, worker, flush) for worker in range(1, 9)]) == list(range(1, 9))
+        pool.close()
+        pool.join()
+
+    stored = ResultStore(path).query(version="a")
+    assert len(stored) == 8 * 5
+    reader = ResultStore(path)
+    for worker in range(1, 9):
+        for year in range(2000, 2005):
+            assert reader.get("volatility", year, year + worker, version="a") == {f"CHF_{worker}": float(year)}
@@ -0,0 +1,162 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from scripts import result_cache, risk_service
+from scripts.metrics import compute_metrics, date_window
+from scripts.result_store import result_store
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """
+    Keep computed results out of the shipped result store.
+    """
+    store = result_store(tmp_path / "results.npz")
+    monkeypatch.setattr(result_cache, "result_store", lambda: store)
+    result_cache.clear_cache()
+    yield store
+    result_cache.clear_cache()
+
+
+@pytest.fixture
+def get(store):
+    """
+    Serve on a free port and return a function requesting a path, as (status, payload).
+    """
+    server = risk_service.create_server(port=0)
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def get(path, headers=None):
+        request = urllib.request.Request(base_url + path, headers=headers or {})
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    yield get
+    server.shutdown()
+    server.server_close()
+
+
+def test_metrics(get, panel):
+    status, payload = get("/metrics/volatility?start=2007&end=2009")
+    expected = compute_metrics(date_window(panel, 2007, 2009))["volatility"].dropna()
+
+    assert status == 200
+    assert (payload["metric"], payload["start"], payload["end"], payload["base"]) == ("volatility", "2007", "2009", "CHF")
+    assert payload["results"] == pytest.approx(expected.to_dict(), rel=1e-9)
+
+    status, payload = get("/metrics/var?start=2007-03-01&end=2009-06-30&confidence=0.99&horizon=5")
+    assert status == 200
+    assert (payload["confidence_level"], payload["horizon"]) == (0.99, 5)
+
+
+def test_other_routes(get, panel):
+    assert get("/metrics") == (200, ["depreciation", "volatility", "var", "maximum_drawdown"])
+    assert get("/pairs") == (200, list(panel.columns))
+
+    status, payload = get("/rates/CHF_USD?start=2020&end=2020")
+    assert status == 200
+    assert payload["pair"] == "CHF_USD Historical Data"
+    prices = date_window(panel, 2020, 2020)["CHF_USD Historical Data"].dropna()
+    assert payload["prices"] == pytest.approx(prices.tolist())
+    assert len(payload["dates"]) == len(prices)
+
+    status, payload = get("/health")
+    assert (status, payload["status"], payload["pairs"]) == (200, "ok", len(panel.columns))
+
+
+@pytest.mark.parametrize("path, status, message", [
+    ("/metrics/volatility?end=2009", 400, "Missing query parameter: start"),
+    ("/metrics/volatility?start=2007&end=later", 400, "Invalid end: later"),
+    ("/metrics/var?start=2007&end=2009&confidence=high", 400, "could not convert"),
+    ("/metrics/var?start=2007&end=2009&horizon=1X", 400, ""),
+    ("/metrics/sharpe?start=2007&end=2009", 404, "Unknown metric: sharpe"),
+    ("/metrics/volatility?start=2007&end=2009&base=XXX", 404, "XXX"),
+    ("/rates/CHF_XXX", 404, "Unknown pair: CHF_XXX"),
+    ("/rates/CHFUSD", 404, "Unknown pair: CHFUSD"),
+    ("/nothing", 404, "Not found: /nothing"),
+])
+def test_errors(get, path, status, message):
+    response_status, payload = get(path)
+
+    assert response_status == status
+    assert message in payload["error"]
+
+
+def test_arrow_needs_pyarrow(get):
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        pass
+    else:
+        pytest.skip("pyarrow is installed")
+
+    assert get("/metrics/volatility?start=2007&end=2009&format=arrow")[0] == 406
+    assert get("/rates/CHF_USD", {"Accept": risk_service.ARROW_CONTENT_TYPE})[0] == 406
+
+
+def test_responses_are_cached(get, monkeypatch):
+    calls = []
+    metric_response = risk_service.metric_response
+
+    def counting(name, query, arrow=False):
+        calls.append(name)
+        return metric_response(name, query, arrow)
+
+    monkeypatch.setattr(risk_service, "metric_response", counting)
+
+    first = get("/metrics/depreciation?start=2001&end=2003")
+    assert get("/metrics/depreciation?end=2003&start=2001") == first
+    assert calls == ["depreciation"]
+    # Errors are not cached
+    get("/metrics/depreciation?start=2001")
+    get("/metrics/depreciation?start=2001")
+    assert len(calls) == 3
+
+
+def test_the_data_version_is_looked_up_once_per_ttl(monkeypatch):
+    versions = []
+
+    def data_version():
+        versions.append(len(versions))
+        return f"v{len(versions)}"
+
+    clock = [100.0]
+    monkeypatch.setattr(risk_service, "data_version", data_version)
+    monkeypatch.setattr(risk_service.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(risk_service, "_VERSION", [None, 0.0])
+
+    assert risk_service.current_version() == "v1"
+    clock[0] += risk_service.VERSION_TTL / 2
+    assert risk_service.current_version() == "v1"
+    clock[0] += risk_service.VERSION_TTL
+    assert risk_service.current_version() == "v2"
+    assert len(versions) == 2
+
+
+@pytest.mark.parametrize("query, persist", [
+    ("metrics/volatility?start=2007&end=2009", True),
+    ("metrics/var?start=2007&end=2009&confidence=0.99", True),
+    ("metrics/volatility?start=2007-02-01&end=2009", False),
+    ("metrics/var?start=2007&end=2009&confidence=0.973", False),
+    ("metrics/var?start=2007&end=2009&horizon=10", False),
+])
+def test_only_usual_queries_are_stored(store, monkeypatch, query, persist):
+    calls = []
+
+    def cached_metric(*args):
+        calls.append(args)
+        return {}
+
+    monkeypatch.setattr(risk_service, "cached_metric", cached_metric)
+    path, _, parameters = query.partition("?")
+    risk_service.metric_response(path.split("/")[1], dict(item.split("=") for item in parameters.split("&")))
+
+    assert calls[0][-1] is persist
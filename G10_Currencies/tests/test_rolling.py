@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from scripts.metrics import METRICS, compute_metrics
+from scripts.rolling import rolling_metric
+
+# Prices per rolling window
+WINDOW = 24
+
+
+@pytest.mark.parametrize("metric", METRICS)
+def test_expanding_matches_compute_metrics(panel, metric):
+    rolling = rolling_metric(panel, metric)
+
+    for end in (WINDOW, len(panel) // 2, len(panel) - 1):
+        expected = compute_metrics(panel.iloc[:end + 1])[metric]
+        np.testing.assert_allclose(rolling.iloc[end], expected, rtol=1e-9, atol=1e-12)
+
+
+@pytest.mark.parametrize("metric", METRICS)
+def test_rolling_matches_compute_metrics(panel, metric):
+    rolling = rolling_metric(panel, metric, window=WINDOW)
+
+    # Rows before the first full window have no value
+    assert rolling.iloc[:WINDOW - 1].isna().all().all()
+
+    # Every window end, so the quantile heaps and drawdown stacks see many removals
+    for end in range(WINDOW - 1, len(panel)):
+        expected = compute_metrics(panel.iloc[end - WINDOW + 1:end + 1])[metric]
+        np.testing.assert_allclose(rolling.iloc[end], expected, rtol=1e-9, atol=1e-12)
@@ -0,0 +1,95 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.schema import (
+    SchemaError, parse_dates, parse_percent, parse_volume, read_processed, read_raw, sniff_date_format,
+    validate_dates,
+)
+
+RAW = '''"Date","Price","Open","High","Low","Vol.","Change %"
+"03/04/2024","1,234.50","1,230.00","1,240.00","1,229.00","12.5K","-0.92%"
+"03/01/2024","1,245.95","1,250.00","1,251.00","1,240.00","","1.05%"
+"02/29/2024","1,233.00","1,233.00","1,233.00","1,233.00","2.1M","0.00%"'''
+
+
+@pytest.mark.parametrize("value, date_format", [
+    ("03/04/2024", "%m/%d/%Y"),
+    (" 03/04/2024 17:30 ", "%m/%d/%Y %H:%M"),
+    ("03/04/2024 17:30:05", "%m/%d/%Y %H:%M:%S"),
+])
+def test_date_formats_are_sniffed(value, date_format):
+    assert sniff_date_format(value) == date_format
+
+
+def test_unknown_date_formats_are_errors():
+    with pytest.raises(SchemaError, match="Unknown date format"):
+        sniff_date_format("2024-03-04")
+    # The format of the first date holds for the whole column
+    with pytest.raises(SchemaError, match="Dates do not match %m/%d/%Y"):
+        parse_dates(pd.Series(["03/04/2024", "2024-03-01"]))
+
+
+def test_dates_of_every_representation():
+    expected = pd.Series(pd.to_datetime(["2024-03-04", "2024-03-01"]))
+
+    pd.testing.assert_series_equal(parse_dates(pd.Series(["03/04/2024", "03/01/2024"])), expected)
+    pd.testing.assert_series_equal(parse_dates(pd.Series(["2024-03-04", "2024-03-01"]), "ISO8601"), expected)
+    pd.testing.assert_series_equal(parse_dates(pd.Series(expected.to_numpy().view("int64"))), expected)
+    pd.testing.assert_series_equal(parse_dates(expected), expected)
+
+
+def test_percent_and_volume():
+    np.testing.assert_array_equal(parse_percent(pd.Series(["-0.92%", "1,005.00%", "0.00%"])), [-0.92, 1005.0, 0.0])
+    np.testing.assert_array_equal(parse_volume(pd.Series(["12.5K", "2.1M", "1B", "300", "1,200"])),
+                                  [12_500.0, 2_100_000.0, 1e9, 300.0, 1_200.0])
+    assert np.isnan(parse_volume(pd.Series([None, "1K"]))[0])
+
+    with pytest.raises(SchemaError, match="Invalid percentage"):
+        parse_percent(pd.Series(["high"]))
+    with pytest.raises(SchemaError, match="Invalid volume"):
+        parse_volume(pd.Series(["12.5X"]))
+
+
+@pytest.mark.parametrize("dates, message", [
+    (["2024-03-04", "2024-03-01", "2024-03-01"], "CHF_USD.csv: duplicate date 2024-03-01"),
+    (["2024-03-04", "2024-03-01", "2024-03-05"], "CHF_USD.csv: dates are not sorted at 2024-03-05"),
+    (["2024-03-01", "2024-03-04", "2024-03-02"], "CHF_USD.csv: dates are not sorted at 2024-03-02"),
+])
+def test_dates_must_be_unique_and_sorted(dates, message):
+    with pytest.raises(SchemaError, match=message):
+        validate_dates(pd.Series(pd.to_datetime(dates)), "CHF_USD.csv")
+
+
+def test_sorted_dates_pass_in_either_direction():
+    dates = pd.Series(pd.date_range("2024-01-01", periods=5))
+
+    validate_dates(dates)
+    validate_dates(dates[::-1])
+    validate_dates(dates[:1])
+
+
+def test_raw_files_are_typed():
+    df = read_raw(io.StringIO(RAW))
+
+    assert list(df.dtypes.astype(str)) == ["datetime64[ns]"] + ["float64"] * 6
+    assert df["Price"].tolist() == [1234.5, 1245.95, 1233.0]
+    assert df["Vol."].iloc[0] == 12_500.0 and np.isnan(df["Vol."].iloc[1])
+    assert df["Change %"].tolist() == [-0.92, 1.05, 0.0]
+
+
+def test_processed_files_round_trip(tmp_path):
+    df = read_raw(io.StringIO(RAW))
+    df.to_csv(tmp_path / "CHF_USD Historical Data.csv", index=False)
+
+    pd.testing.assert_frame_equal(read_processed(tmp_path / "CHF_USD Historical Data.csv"), df)
+    assert read_processed(tmp_path / "CHF_USD Historical Data.csv", columns=["Date", "Price"]).shape == (3, 2)
+
+
+def test_errors_name_the_file():
+    unsorted = RAW.replace("03/01/2024", "03/05/2024")
+
+    with pytest.raises(SchemaError, match="CHF_USD Historical Data.csv: dates are not sorted"):
+        read_raw(io.StringIO(unsorted), name="CHF_USD Historical Data.csv")
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from config import PROCESSED_DATA_DIR
+from scripts.metrics import compute_metrics, date_window, depreciation, maximum_drawdown, value_at_risk, volatility
+from scripts.series import CurrencySeries, load_series, read_series
+
+COLUMN = "CHF_JPY Historical Data"
+
+
+@pytest.fixture(scope="module")
+def series():
+    return read_series(PROCESSED_DATA_DIR / f"{COLUMN}.csv")
+
+
+def test_series_match_the_panel(panel, series):
+    prices = panel[COLUMN].dropna()
+
+    assert series.name == COLUMN
+    np.testing.assert_array_equal(series.datetimes, prices.index.to_numpy())
+    np.testing.assert_array_equal(series.prices, prices.to_numpy())
+    pd.testing.assert_series_equal(series.to_series(), prices, check_freq=False)
+    assert series.nbytes == 16 * len(series)
+    assert CurrencySeries.from_panel(panel, COLUMN).prices.tolist() == series.prices.tolist()
+    assert list(load_series()) == list(panel.columns)
+
+
+def test_slices_are_views(series):
+    # Returns known before slicing are shared with the slice
+    assert len(series.returns) == len(series) - 1
+    sliced = series.slice(2007, 2009)
+
+    assert np.shares_memory(sliced.prices, series.prices)
+    assert np.shares_memory(sliced.dates, series.dates)
+    assert np.shares_memory(sliced.returns, series.returns)
+    np.testing.assert_array_equal(sliced.returns, sliced.prices[1:] / sliced.prices[:-1] - 1)
+    assert sliced.datetimes[0] >= np.datetime64("2007-01-01") and sliced.datetimes[-1] <= np.datetime64("2009-12-31")
+
+    empty = series.slice(2030, 2031)
+    assert len(empty) == 0 and len(empty.returns) == 0
+    assert "empty" in repr(empty)
+
+
+@pytest.mark.parametrize("START, END", [(2000, 2024), (2007, 2009), ("2010-03-01", "2012-07-31")])
+def test_metrics_match_the_array_path(panel, series, START, END):
+    expected = compute_metrics(date_window(panel, START, END), 0.99).loc[COLUMN]
+    sliced = series.slice(START, END)
+
+    assert depreciation(sliced) == pytest.approx(expected["depreciation"], rel=1e-12)
+    assert volatility(sliced) == pytest.approx(expected["volatility"], rel=1e-12)
+    assert value_at_risk(sliced, 0.99) == pytest.approx(expected["var"], rel=1e-12)
+    assert maximum_drawdown(sliced) == pytest.approx(expected["maximum_drawdown"], rel=1e-12)
+    # Longer horizons fall back to the prices
+    assert value_at_risk(sliced, 0.95, 3) == pytest.approx(value_at_risk(sliced.as_column(), 0.95, 3)[0], rel=1e-12)
+
+
+def test_periods_per_year_follow_the_slice():
+    # Monthly prices, then business days
+    dates = pd.date_range("2000-01-01", "2009-12-01", freq="MS").append(pd.bdate_range("2010-01-01", "2011-12-30"))
+    series = CurrencySeries("mixed", dates.to_numpy(), np.linspace(1, 2, len(dates)))
+
+    monthly = series.slice(2000, 2005)
+    assert monthly.periods_per_year == 12
+    assert monthly._periods_per_year == 12
+    assert series.slice(2010, 2011).periods_per_year == 252
+    assert monthly.slice(2001, 2002)._periods_per_year is None
+    log_returns = np.log(monthly.prices[1:] / monthly.prices[:-1])
+    assert volatility(monthly) == pytest.approx(log_returns.std(ddof=1) * np.sqrt(12))
+
+
+def test_dates_and_prices_must_match():
+    with pytest.raises(ValueError, match="Dates and prices must be 1-D arrays of the same length"):
+        CurrencySeries("a", np.arange(3), np.ones(4))
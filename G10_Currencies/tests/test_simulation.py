@@ -0,0 +1,76 @@
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts import simulation
+from scripts.simulation import METHODS, ewma_volatility, simulate_var, tail_statistics
+
+
+@pytest.fixture(scope="module")
+def returns():
+    rng = np.random.default_rng(5)
+    return {"a": rng.normal(0.001, 0.01, 500), "b": rng.standard_t(4, 300) * 0.005, "c": np.array([0.01])}
+
+
+def _ewma_loop(returns, decay):
+    variance = [returns.var()]
+    for value in returns:
+        variance.append(decay * variance[-1] + (1 - decay) * value ** 2)
+    return np.sqrt(variance)
+
+
+@pytest.mark.parametrize("decay", [0.5, 0.94, 0.97, 1.0])
+@pytest.mark.parametrize("max_exponent", [1, simulation.MAX_EXPONENT])
+def test_ewma_volatility_matches_the_recursion(returns, monkeypatch, decay, max_exponent):
+    # A small exponent splits the returns into many short blocks
+    monkeypatch.setattr(simulation, "MAX_EXPONENT", max_exponent)
+
+    np.testing.assert_allclose(ewma_volatility(returns["a"], decay), _ewma_loop(returns["a"], decay), rtol=1e-10)
+
+
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+def test_ewma_volatility_of_no_returns_is_unknown():
+    volatility = ewma_volatility(np.empty(0), 0.94)
+
+    assert len(volatility) == 1 and np.isnan(volatility[0])
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_results_do_not_depend_on_the_workers(returns, monkeypatch, method):
+    monkeypatch.setattr(simulation, "CHUNK_PATHS", 1_000)
+    serial = simulate_var(returns, method, paths=2_500, horizon=5, workers=1)
+    parallel = simulate_var(returns, method, paths=2_500, horizon=5, workers=2)
+
+    # Currencies with fewer than two returns are left out
+    assert list(serial.index) == ["a", "b"]
+    pd.testing.assert_frame_equal(serial, parallel)
+    assert not serial.equals(simulate_var(returns, method, paths=2_500, horizon=5, seed=1))
+
+
+def test_parametric_var_approaches_the_normal_quantile(returns):
+    results = simulate_var(returns, "parametric", 0.99, paths=400_000, seed=2)
+    expected = NormalDist(returns["a"].mean(), returns["a"].std(ddof=1)).inv_cdf(0.01) * 100
+
+    assert results.loc["a", "var"] == pytest.approx(expected, rel=0.01)
+    assert results.loc["a", "var_lower"] <= results.loc["a", "var"] <= results.loc["a", "var_upper"]
+    assert results.loc["a", "expected_shortfall"] < results.loc["a", "var"]
+
+
+def test_tail_statistics():
+    statistics = tail_statistics(np.arange(1, 101) / 100, 0.9)
+
+    assert statistics["var"] == pytest.approx(np.percentile(np.arange(1, 101), 10))
+    assert statistics["expected_shortfall"] == pytest.approx(np.arange(1, 11).mean())
+
+
+@pytest.mark.parametrize("horizon", [0, -1, 1.5, True, "2"])
+def test_horizon_must_be_a_whole_number_of_periods(returns, horizon):
+    with pytest.raises(ValueError, match="The horizon must be a whole number"):
+        simulate_var(returns, "parametric", paths=100, horizon=horizon)
+
+
+def test_unknown_method(returns):
+    with pytest.raises(ValueError, match="Unknown method: historical"):
+        simulate_var(returns, "historical", paths=100)
@@ -0,0 +1,81 @@
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from config import RAW_DATA_DIR
+from scripts import clean_data
+from scripts.metrics import compute_metrics, date_window
+from scripts.schema import SchemaError, read_processed, read_raw
+from scripts.streaming import QuantileSketch, stream_all_metrics
+
+
+def test_sketch_quantiles_within_relative_accuracy():
+    values = np.random.default_rng(0).normal(0, 0.02, 10_000)
+    sketch = QuantileSketch(relative_accuracy=0.001)
+    sketch.add(values)
+
+    for q in (0.01, 0.05, 0.5, 0.95):
+        assert sketch.quantile(q) == pytest.approx(np.percentile(values, q * 100), rel=0.002)
+
+
+def test_merged_sketches_match_one_sketch():
+    values = np.random.default_rng(1).normal(0, 0.02, 5_000)
+    whole, merged = QuantileSketch(), QuantileSketch()
+    whole.add(values)
+    for chunk in np.array_split(values, 7):
+        part = QuantileSketch()
+        part.add(chunk)
+        merged.merge(part)
+
+    assert merged.quantile(0.05) == whole.quantile(0.05)
+
+
+@pytest.mark.parametrize("chunksize", [17, 1000])
+def test_stream_matches_compute_metrics(panel, chunksize):
+    streamed = stream_all_metrics(2005, 2020, chunksize=chunksize, data_dir=RAW_DATA_DIR)
+    expected = compute_metrics(date_window(panel, 2005, 2020)).loc[streamed.index]
+
+    for metric in ("depreciation", "volatility", "maximum_drawdown"):
+        np.testing.assert_allclose(streamed[metric], expected[metric], rtol=1e-9)
+    # The VaR comes from the sketch, within its relative accuracy
+    np.testing.assert_allclose(streamed["var"], expected["var"], rtol=0.002)
+
+
+def test_chunked_read_matches_a_whole_read():
+    csv_file = sorted(RAW_DATA_DIR.glob("*.csv"))[0]
+    chunks = list(read_raw(csv_file, chunksize=100))
+
+    assert len(chunks) > 1
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), read_raw(csv_file))
+
+
+def test_duplicate_dates_across_chunks_are_found(tmp_path):
+    lines = sorted(RAW_DATA_DIR.glob("*.csv"))[0].read_text(encoding="utf-8").split("\n")
+    # The last row of the first chunk is repeated as the first row of the second
+    csv_file = tmp_path / "CHF_AUD Historical Data.csv"
+    csv_file.write_text("\n".join(lines[:11] + lines[10:30]), encoding="utf-8")
+
+    with pytest.raises(SchemaError, match=f"{csv_file.name}: duplicate date"):
+        list(read_raw(csv_file, chunksize=10))
+
+
+def test_chunked_ingest_matches_a_whole_one(tmp_path, monkeypatch):
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    for csv_file in sorted(RAW_DATA_DIR.glob("*.csv"))[:3]:
+        shutil.copy(csv_file, raw_dir)
+    monkeypatch.setattr(clean_data, "RAW_DATA_DIR", raw_dir)
+    monkeypatch.setattr(clean_data, "MANIFEST_PATH", tmp_path / "ingest_manifest.json")
+
+    written = {}
+    for chunksize in (None, 50):
+        processed_dir = tmp_path / f"processed_{chunksize}"
+        monkeypatch.setattr(clean_data, "PROCESSED_DATA_DIR", processed_dir)
+        assert clean_data.ingest(chunksize=chunksize)
+        written[chunksize] = {csv_file.name: read_processed(csv_file) for csv_file in sorted(processed_dir.glob("*.csv"))}
+
+    assert list(written[50]) == list(written[None]) == sorted(csv_file.name for csv_file in raw_dir.glob("*.csv"))
+    for name, df in written[None].items():
+        pd.testing.assert_frame_equal(written[50][name], df)
@@ -0,0 +1,108 @@
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from config import PROCESSED_DATA_DIR
+from scripts import sweep
+from scripts.backends import ProcessBackend, SerialBackend
+from scripts.metrics import compute_metrics, date_window
+from scripts.panel import load_panel_arrays, write_panel_arrays
+from scripts.sweep import run_sweep, year_windows
+
+WINDOWS = year_windows(2006, 2009)
+
+
+@pytest.fixture(scope="module")
+def serial():
+    return run_sweep(WINDOWS, confidence_levels=(0.95, 0.99))
+
+
+def test_serial_matches_compute_metrics(panel, serial):
+    for START, END in [(2006, 2009), (2008, 2008)]:
+        for confidence_level in (0.95, 0.99):
+            expected = compute_metrics(date_window(panel, START, END), confidence_level)
+            rows = serial[(serial["start"] == START) & (serial["end"] == END)]
+            for metric in expected.columns:
+                selected = rows[rows["metric"] == metric]
+                if metric == "var":
+                    selected = selected[selected["confidence_level"] == confidence_level]
+                values = selected.set_index("currency")["value"]
+                np.testing.assert_allclose(values[expected.index], expected[metric], rtol=1e-12)
+
+
+@pytest.mark.parametrize("backend, workers, currency_block, date_block", [
+    ("serial", 1, 4, 24),
+    ("thread", 2, 3, None),
+    ("process", 2, 4, 36),
+])
+def test_backends_are_identical(serial, backend, workers, currency_block, date_block):
+    result = run_sweep(WINDOWS, confidence_levels=(0.95, 0.99), backend=backend, workers=workers,
+                       currency_block=currency_block, date_block=date_block)
+
+    key = ["currency", "metric", "confidence_level", "start", "end"]
+    pd.testing.assert_frame_equal(
+        result.sort_values(key).reset_index(drop=True),
+        serial.sort_values(key).reset_index(drop=True),
+        check_exact=True,
+    )
+
+
+def test_dask_backend_is_identical(serial):
+    pytest.importorskip("dask.distributed")
+    result = run_sweep(WINDOWS, confidence_levels=(0.95, 0.99), backend="dask", workers=2)
+
+    key = ["currency", "metric", "confidence_level", "start", "end"]
+    pd.testing.assert_frame_equal(
+        result.sort_values(key).reset_index(drop=True),
+        serial.sort_values(key).reset_index(drop=True),
+        check_exact=True,
+    )
+
+
+def _column_sums(block, scale):
+    return block.sum(axis=0) * scale
+
+
+@pytest.mark.parametrize("view", [False, True])
+def test_process_backend_reads_memory_mapped_files(tmp_path, view):
+    values = np.asfortranarray(np.random.default_rng(7).normal(size=(500, 12)))
+    np.save(tmp_path / "values.npy", values)
+    array = np.load(tmp_path / "values.npy", mmap_mode="r")
+    # A view no longer describes its file and is copied to shared memory instead
+    if view:
+        array, values = array[100:], values[100:]
+    tasks = [
+        (slice(rows, rows + 150), slice(cols, cols + 5), (2.0,)) for rows in (0, 150, 300) for cols in (0, 5, 10)
+    ]
+
+    results = ProcessBackend(2).run(_column_sums, array, tasks)
+
+    for result, expected in zip(results, SerialBackend().run(_column_sums, values, tasks)):
+        np.testing.assert_array_equal(result, expected)
+
+
+def test_process_sweep_on_the_binary_panel(serial, tmp_path, monkeypatch):
+    for csv_file in sorted(PROCESSED_DATA_DIR.glob("*.csv")):
+        shutil.copy(csv_file, tmp_path)
+    write_panel_arrays(tmp_path)
+    monkeypatch.setattr(sweep, "load_panel_arrays", lambda: load_panel_arrays(tmp_path))
+
+    arrays = []
+    run = ProcessBackend.run
+
+    def recording(self, func, array, tasks):
+        arrays.append(array)
+        return run(self, func, array, tasks)
+
+    monkeypatch.setattr(ProcessBackend, "run", recording)
+    result = run_sweep(WINDOWS, confidence_levels=(0.95, 0.99), backend="process", workers=2)
+
+    assert isinstance(arrays[0], np.memmap)
+    key = ["currency", "metric", "confidence_level", "start", "end"]
+    pd.testing.assert_frame_equal(
+        result.sort_values(key).reset_index(drop=True),
+        serial.sort_values(key).reset_index(drop=True),
+        check_exact=True,
+    )